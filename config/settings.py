@@ -44,7 +44,16 @@ class Settings:
             "diretorio": "~/Desktop/DEV/planka-personalizado",
             "porta": 3001,
             "url": "http://localhost:3001",
-            "docker_compose_file": "docker-compose.yml"
+            "docker_compose_file": "docker-compose.yml",
+            "ingestao_logs": True,
+            "build_incremental": True,
+            "timeout_inatividade_build": 300,
+            "timeout_total_build": 0,
+            "timeout_inatividade_up": 60,
+            "timeout_prontidao": 180,
+            "intervalo_prontidao_inicial": 0.5,
+            "intervalo_prontidao_maximo": 5,
+            "indice_ignorar": [".git", "node_modules", ".venv", "venv", "__pycache__", ".cache", "dist", "build", "coverage", "*.pyc", "*.log", ".DS_Store"]
         },
             "database": {
                 "arquivo": "~/Desktop/DEV/dashboard-tarefas/database/dashboard.db",
@@ -58,6 +67,10 @@ class Settings:
                 "nivel": "INFO",
                 "max_arquivos": 10,
                 "tamanho_maximo_mb": 10,
+                "tamanho_fila": 10000,
+                "niveis_origem": {},
+                "retencao_dias": 30,
+                "arquivar_antes_limpar": False,
                 "diretorio_sistema": "~/Desktop/DEV/dashboard-tarefas/logs/sistema",
                 "diretorio_tarefas": "~/Desktop/DEV/dashboard-tarefas/logs/tarefas",
                 "diretorio_servidores": "~/Desktop/DEV/dashboard-tarefas/logs/servidores"
@@ -65,12 +78,54 @@ class Settings:
             "servidores": {
                 "timeout_conexao": 30,
                 "max_conexoes": 5,
+                "timeout_espera_conexao": 30,
+                "max_canais_por_host": 8,
+                "max_paralelo_lote": 5,
+                "timeout_comando_lote": 300,
+                "limite_saida_kb": 1024,
+                "saida_excedente_em_arquivo": True,
+                "keepalive": 30,
+                "pre_aquecer_conexoes": False,
+                "bloco_transferencia_mb": 8,
+                "canais_transferencia": 4,
+                "intervalo_historico": 2,
+                "coletar_metricas": False,
+                "intervalo_metricas": 60,
+                "max_paralelo_metricas": 5,
+                "timeout_metricas": 20,
+                "retencao_metricas_dias": 7,
+                "url_planka_remoto": "http://127.0.0.1:3000",
+                "ttl_status_remoto": 30,
+                "timeout_status_remoto": 15,
+                "timeout_http_status_remoto": 3,
+                "max_paralelo_status_remoto": 5,
+                "cache_comandos": False,
+                "cache_comandos_max": 256,
+                "cache_comandos_ttl": {
+                    "uname*": 3600,
+                    "hostname": 3600,
+                    "hostname -f": 3600,
+                    "hostname -I": 3600,
+                    "cat /etc/os-release": 86400,
+                    "lsb_release*": 86400,
+                    "nproc": 3600,
+                    "df*": 60,
+                    "free*": 30,
+                    "uptime*": 30,
+                    "docker version*": 3600,
+                    "docker ps*": 15,
+                    "docker images*": 60
+                },
                 "criptografia": "AES-256"
             },
             "tarefas": {
                 "execucao_paralela": False,
                 "max_tarefas_simultaneas": 1,
                 "timeout_execucao": 300
+            },
+            "diagnostico": {
+                "linhas_analise_logs": 5000,
+                "assinaturas_erros": []
             }
         }
         
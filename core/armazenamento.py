@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Camada de acesso partilhada às bases SQLite.
+Uma conexão por thread e por base, configurada uma única vez (WAL, busy_timeout,
+mmap, cache), com cache de instruções preparadas, transações explícitas e
+contagem/duração das consultas.
+"""
+
+import time
+import atexit
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """Cursor que mede o tempo de execução de cada instrução."""
+
+    def execute(self, sql, parametros=()):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self.connection.banco._registrar_consulta(sql, time.perf_counter() - inicio)
+
+    def executemany(self, sql, sequencia):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, sequencia)
+        finally:
+            self.connection.banco._registrar_consulta(sql, time.perf_counter() - inicio)
+
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    """Conexão cujos cursores (incluindo os de execute/executemany) são instrumentados."""
+
+    banco = None
+
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, sequencia):
+        return self.cursor().executemany(sql, sequencia)
+
+
+class BancoSQLite:
+    """
+    Acesso a um arquivo SQLite partilhado entre managers e threads.
+
+    Cada thread recebe sempre a mesma conexão (as conexões SQLite não devem ser
+    partilhadas entre threads), aberta em modo autocommit; as escritas agrupam-se
+    com transacao(), que usa BEGIN IMMEDIATE para obter o lock de escrita logo
+    no início em vez de falhar a meio com "database is locked".
+    """
+
+    def __init__(self, caminho: Union[str, Path], busy_timeout_ms: int = 10000,
+                 mmap_mb: int = 64, cache_kb: int = 8192, instrucoes_em_cache: int = 256):
+        """
+        Inicializa o acesso à base.
+
+        Args:
+            caminho: Arquivo da base de dados
+            busy_timeout_ms: Espera máxima por um lock antes de desistir
+            mmap_mb: Tamanho do mapeamento em memória (0 desativa)
+            cache_kb: Cache de páginas por conexão
+            instrucoes_em_cache: Instruções preparadas guardadas por conexão
+        """
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_mb = mmap_mb
+        self.cache_kb = cache_kb
+        self.instrucoes_em_cache = instrucoes_em_cache
+
+        self._local = threading.local()
+        self._conexoes = weakref.WeakSet()
+        self._conexoes_lock = threading.Lock()
+
+        # sql -> [execuções, tempo total, tempo máximo]
+        self._consultas = {}
+        self._consultas_lock = threading.Lock()
+
+    def conexao(self) -> sqlite3.Connection:
+        """
+        Devolve a conexão desta thread, abrindo-a e configurando-a na primeira chamada.
+
+        Returns:
+            Conexão em modo autocommit
+        """
+        conn = getattr(self._local, "conexao", None)
+        if conn is not None:
+            return conn
+
+        conn = sqlite3.connect(
+            self.caminho,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.instrucoes_em_cache,
+            factory=ConexaoInstrumentada
+        )
+        conn.banco = self
+        self._configurar(conn)
+
+        self._local.conexao = conn
+        with self._conexoes_lock:
+            self._conexoes.add(conn)
+        return conn
+
+    def _configurar(self, conn: sqlite3.Connection):
+        """Aplica os PRAGMA de desempenho a uma conexão nova."""
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode = WAL").fetchone()
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_kb)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_mb) * 1024 * 1024}").fetchone()
+        conn.execute("PRAGMA temp_store = MEMORY")
+
+    @contextmanager
+    def transacao(self, imediata: bool = True) -> Iterator[sqlite3.Connection]:
+        """
+        Executa um bloco numa transação; faz commit no fim ou rollback em caso de erro.
+
+        Transações aninhadas juntam-se à transação exterior.
+
+        Args:
+            imediata: Obter já o lock de escrita (BEGIN IMMEDIATE)
+
+        Yields:
+            Conexão desta thread
+        """
+        conn = self.conexao()
+        if conn.in_transaction:
+            yield conn
+            return
+
+        conn.execute("BEGIN IMMEDIATE" if imediata else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        else:
+            if conn.in_transaction:
+                conn.commit()
+
+    def executar(self, sql: str, parametros=()) -> sqlite3.Cursor:
+        """Executa uma instrução na conexão desta thread."""
+        return self.conexao().execute(sql, parametros)
+
+    def consultar(self, sql: str, parametros=()) -> List[tuple]:
+        """Executa uma consulta e devolve todas as linhas."""
+        return self.conexao().execute(sql, parametros).fetchall()
+
+    def consultar_um(self, sql: str, parametros=()) -> Optional[tuple]:
+        """Executa uma consulta e devolve a primeira linha (ou None)."""
+        return self.conexao().execute(sql, parametros).fetchone()
+
+    def _registrar_consulta(self, sql: str, duracao: float):
+        # O texto só é normalizado no relatório, para não pesar em cada consulta
+        with self._consultas_lock:
+            dados = self._consultas.get(sql)
+            if dados is None:
+                self._consultas[sql] = [1, duracao, duracao]
+            else:
+                dados[0] += 1
+                dados[1] += duracao
+                if duracao > dados[2]:
+                    dados[2] = duracao
+
+    def obter_estatisticas(self, limite: int = 10) -> Dict[str, Any]:
+        """
+        Obtém a contagem e duração das consultas executadas.
+
+        Args:
+            limite: Número de consultas mais custosas a incluir
+
+        Returns:
+            Dict com totais e as consultas com maior tempo acumulado
+        """
+        agrupadas = {}
+        with self._consultas_lock:
+            for sql, (execucoes, total, maximo) in self._consultas.items():
+                chave = " ".join(sql.split())
+                anterior = agrupadas.get(chave, (0, 0.0, 0.0))
+                agrupadas[chave] = (anterior[0] + execucoes, anterior[1] + total, max(anterior[2], maximo))
+        consultas = [(sql,) + dados for sql, dados in agrupadas.items()]
+        with self._conexoes_lock:
+            conexoes = len(self._conexoes)
+
+        consultas.sort(key=lambda c: c[2], reverse=True)
+        return {
+            "arquivo": str(self.caminho),
+            "conexoes": conexoes,
+            "total_consultas": sum(c[1] for c in consultas),
+            "tempo_total_ms": round(sum(c[2] for c in consultas) * 1000, 2),
+            "mais_custosas": [
+                {
+                    "sql": sql[:200],
+                    "execucoes": execucoes,
+                    "tempo_total_ms": round(total * 1000, 2),
+                    "tempo_medio_ms": round(total / execucoes * 1000, 3),
+                    "tempo_maximo_ms": round(maximo * 1000, 2),
+                }
+                for sql, execucoes, total, maximo in consultas[:limite]
+            ]
+        }
+
+    def limpar_estatisticas(self):
+        """Reinicia as contagens de consultas."""
+        with self._consultas_lock:
+            self._consultas.clear()
+
+    def fechar(self):
+        """Fecha as conexões de todas as threads."""
+        with self._conexoes_lock:
+            conexoes = list(self._conexoes)
+            self._conexoes = weakref.WeakSet()
+        for conn in conexoes:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+
+_bancos = {}
+_bancos_lock = threading.Lock()
+
+
+def obter_banco(caminho: Union[str, Path]) -> BancoSQLite:
+    """
+    Devolve o acesso partilhado a uma base (um por arquivo no processo).
+
+    Args:
+        caminho: Arquivo da base de dados
+
+    Returns:
+        Instância partilhada de BancoSQLite
+    """
+    chave = str(Path(caminho).expanduser().resolve())
+    with _bancos_lock:
+        banco = _bancos.get(chave)
+        if banco is None:
+            banco = _bancos[chave] = BancoSQLite(chave)
+        return banco
+
+
+def estatisticas_bancos() -> List[Dict[str, Any]]:
+    """Estatísticas de consultas de todas as bases abertas no processo."""
+    with _bancos_lock:
+        bancos = list(_bancos.values())
+    return [banco.obter_estatisticas() for banco in bancos]
+
+
+def fechar_bancos():
+    """Fecha todas as conexões de todas as bases."""
+    with _bancos_lock:
+        bancos = list(_bancos.values())
+    for banco in bancos:
+        banco.fechar()
+
+
+# Fecha as conexões (e faz o checkpoint do WAL) ao terminar o processo
+atexit.register(fechar_bancos)
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Deteção de assinaturas de erro em logs.
+Os termos de todas as assinaturas são compilados numa única alternância de
+literais (pré-filtro rápido sobre a linha em minúsculas); só as linhas candidatas
+passam pela expressão de confirmação da assinatura. Cada ocorrência é normalizada
+numa impressão digital (ids, datas, caminhos e números substituídos) para agrupar
+erros repetidos com contagens e primeira/última ocorrência.
+"""
+
+import re
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# (nome, gravidade, termos literais, expressão de confirmação opcional)
+# A ordem define a prioridade: as mais específicas primeiro
+ASSINATURAS_PADRAO = [
+    ("autenticacao_postgres", "critico", ["password authentication failed"], None),
+    ("tabela_inexistente", "critico", ["does not exist"], r"relation \S+ does not exist"),
+    ("base_inexistente", "critico", ["does not exist"], r"database \S+ does not exist"),
+    ("memoria_esgotada", "critico", ["out of memory", "oom"], r"out of memory|\boom\b"),
+    ("porta_em_uso", "critico", ["eaddrinuse", "address already in use"], None),
+    ("conexao_recusada", "erro", ["econnrefused", "connection refused"], None),
+    ("timeout", "erro", ["etimedout", "timed out"], None),
+    ("fatal", "critico", ["fatal", "panic"], None),
+    ("excecao", "erro", ["exception", "traceback"], None),
+    ("erro", "erro", ["erro"], None),
+    ("falha", "erro", ["failed", "falhou"], None),
+]
+
+# Tokens variáveis substituídos na impressão digital (ordem importa)
+_NORMALIZACOES = [
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<data>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<hora>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE), "<uuid>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<ip>"),
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\\/][\w.@-]+){2,}[\\/]?"), "<caminho>"),
+    (re.compile(r"\b0x[0-9a-f]+\b|\b[0-9a-f]*\d[0-9a-f]*[a-f][0-9a-f]*\b", re.IGNORECASE), "<hex>"),
+    (re.compile(r"\d+"), "<n>"),
+    (re.compile(r"\"[^\"]*\"|'[^']*'"), "<texto>"),
+    (re.compile(r"\s+"), " "),
+]
+
+# Timestamp no início da mensagem (após um eventual prefixo "servico | ")
+_PADRAO_INSTANTE = re.compile(r"(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})")
+_PADRAO_PREFIXO = re.compile(r"^\s*([\w.-]+)\s+\|\s?")
+
+
+def normalizar_mensagem(mensagem: str) -> str:
+    """
+    Substitui os tokens variáveis de uma mensagem por marcadores.
+
+    Args:
+        mensagem: Linha ou mensagem de log
+
+    Returns:
+        Mensagem normalizada
+    """
+    for padrao, marcador in _NORMALIZACOES:
+        mensagem = padrao.sub(marcador, mensagem)
+    return mensagem.strip()
+
+
+class DetectorErros:
+    """
+    Detetor de assinaturas de erro com agregação por impressão digital.
+    """
+
+    def __init__(self, assinaturas: Optional[List[Tuple[str, str, List[str], Optional[str]]]] = None):
+        """
+        Inicializa o detetor.
+
+        Args:
+            assinaturas: Lista de (nome, gravidade, termos, regex de confirmação);
+                padrão: ASSINATURAS_PADRAO
+        """
+        self.assinaturas = list(assinaturas or ASSINATURAS_PADRAO)
+        self.confirmacoes = [re.compile(padrao, re.IGNORECASE) if padrao else None
+                             for _, _, _, padrao in self.assinaturas]
+
+        # termo -> índices das assinaturas que o usam
+        self.termos = {}
+        for indice, (_, _, termos, _) in enumerate(self.assinaturas):
+            for termo in filter(None, termos):
+                self.termos.setdefault(termo.lower(), []).append(indice)
+
+        # Só literais e sem grupos: o motor de regex usa o prefixo para saltar a linha
+        self.expressao = re.compile("|".join(
+            re.escape(termo) for termo in sorted(self.termos, key=len, reverse=True)
+        ))
+        self.limpar()
+
+    def limpar(self):
+        """Descarta as contagens acumuladas."""
+        self.impressoes = {}
+        self.linhas_analisadas = 0
+        self.caracteres_analisados = 0
+        self.total_erros = 0
+
+    def classificar(self, mensagem: str) -> Optional[Tuple[str, str]]:
+        """
+        Identifica a assinatura mais específica presente numa mensagem.
+
+        Args:
+            mensagem: Linha ou mensagem de log
+
+        Returns:
+            (nome, gravidade) ou None se não for um erro
+        """
+        candidatas = set()
+        for correspondencia in self.expressao.finditer(mensagem.lower()):
+            candidatas.update(self.termos[correspondencia.group()])
+
+        for indice in sorted(candidatas):
+            confirmacao = self.confirmacoes[indice]
+            if confirmacao is None or confirmacao.search(mensagem):
+                nome, gravidade, _, _ = self.assinaturas[indice]
+                return nome, gravidade
+        return None
+
+    def analisar_linha(self, linha: str, instante: Optional[datetime] = None,
+                       origem: Optional[str] = None) -> Optional[str]:
+        """
+        Analisa uma linha, acumulando-a se corresponder a uma assinatura.
+
+        Args:
+            linha: Linha de log
+            instante: Momento da linha; extraído da própria linha se omitido
+            origem: Serviço/origem; extraído do prefixo "servico |" se omitido
+
+        Returns:
+            Impressão digital do erro ou None
+        """
+        self.linhas_analisadas += 1
+        self.caracteres_analisados += len(linha)
+
+        classificacao = self.classificar(linha)
+        if classificacao is None:
+            return None
+
+        mensagem = linha.strip()
+
+        prefixo = _PADRAO_PREFIXO.match(mensagem)
+        if prefixo:
+            origem = origem or prefixo.group(1)
+            mensagem = mensagem[prefixo.end():]
+
+        if instante is None:
+            encontrado = _PADRAO_INSTANTE.search(mensagem, 0, 40)
+            if encontrado:
+                try:
+                    instante = datetime.fromisoformat(f"{encontrado.group(1)} {encontrado.group(2)}")
+                except ValueError:
+                    pass
+
+        nome, gravidade = classificacao
+        normalizada = normalizar_mensagem(mensagem)
+        impressao = hashlib.sha1(f"{origem}|{nome}|{normalizada}".encode('utf-8')).hexdigest()[:12]
+
+        entrada = self.impressoes.get(impressao)
+        if entrada is None:
+            entrada = self.impressoes[impressao] = {
+                "impressao": impressao,
+                "assinatura": nome,
+                "gravidade": gravidade,
+                "origem": origem,
+                "padrao": normalizada,
+                "exemplo": mensagem,
+                "ocorrencias": 0,
+                "primeira": instante,
+                "ultima": instante,
+            }
+        entrada["ocorrencias"] += 1
+        if instante is not None:
+            if entrada["primeira"] is None or instante < entrada["primeira"]:
+                entrada["primeira"] = instante
+            if entrada["ultima"] is None or instante >= entrada["ultima"]:
+                entrada["ultima"] = instante
+                entrada["exemplo"] = mensagem
+
+        self.total_erros += 1
+        return impressao
+
+    def analisar_texto(self, texto: str):
+        """Analisa um bloco de texto linha a linha."""
+        for linha in texto.splitlines():
+            self.analisar_linha(linha)
+
+    def analisar_logs(self, logs: Iterable):
+        """
+        Analisa logs estruturados (objetos com timestamp, origem e mensagem).
+
+        Args:
+            logs: Iterável de LogEstruturado
+        """
+        for log in logs:
+            self.analisar_linha(log.mensagem, log.timestamp, log.origem)
+
+    def resumo(self, limite: Optional[int] = None) -> List[Dict]:
+        """
+        Devolve os erros agrupados, dos mais frequentes para os menos frequentes.
+
+        Args:
+            limite: Número máximo de impressões a devolver
+
+        Returns:
+            Lista de dicionários com impressão, assinatura, gravidade, exemplo,
+            ocorrências e primeira/última ocorrência (ISO ou None)
+        """
+        ordenadas = sorted(self.impressoes.values(),
+                           key=lambda e: (e["gravidade"] != "critico", -e["ocorrencias"]))
+        if limite is not None:
+            ordenadas = ordenadas[:limite]
+
+        resultado = []
+        for entrada in ordenadas:
+            item = dict(entrada)
+            item["primeira"] = entrada["primeira"].isoformat() if entrada["primeira"] else None
+            item["ultima"] = entrada["ultima"].isoformat() if entrada["ultima"] else None
+            resultado.append(item)
+        return resultado
+
+    def tem_criticos(self) -> bool:
+        """Indica se foi encontrado algum erro crítico."""
+        return any(entrada["gravidade"] == "critico" for entrada in self.impressoes.values())
+
+
+def criar_detector(settings=None) -> DetectorErros:
+    """
+    Cria um detetor com as assinaturas padrão e as configuradas pelo utilizador.
+
+    As assinaturas adicionais ficam em diagnostico.assinaturas_erros como lista
+    de {"nome", "termos", "padrao" (opcional), "gravidade"} e têm prioridade
+    sobre as padrão.
+
+    Args:
+        settings: Instância das configurações do sistema (opcional)
+
+    Returns:
+        Detetor pronto a usar
+    """
+    extra = []
+    if settings is not None:
+        for assinatura in settings.obter("diagnostico", "assinaturas_erros", []) or []:
+            try:
+                padrao = assinatura.get("padrao")
+                if padrao:
+                    re.compile(padrao)
+                extra.append((assinatura["nome"], assinatura.get("gravidade", "erro"),
+                              list(assinatura["termos"]), padrao))
+            except (KeyError, TypeError, re.error) as e:
+                print(f"Erro ao carregar assinatura de erro {assinatura}: {e}")
+    return DetectorErros(extra + ASSINATURAS_PADRAO)
@@ -10,6 +10,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
+from .assinaturas_erros import criar_detector
+
 
 class DiagnosticManager:
     """
@@ -257,32 +259,47 @@ class DiagnosticManager:
     
     def _analisar_logs(self) -> Dict:
         """
-        Analisa logs recentes em busca de erros.
+        Analisa o histórico de logs em busca de assinaturas de erro.
+        
+        Usa o histórico ingerido dos containers quando disponível; caso contrário,
+        as últimas linhas devolvidas pelo docker-compose.
         
         Returns:
             Dict com análise dos logs
         """
         try:
-            logs = self.planka_manager.obter_logs(linhas=20)
-            if not logs:
-                return {
-                    "disponivel": False,
-                    "erro": "Não foi possível obter logs"
-                }
+            from .planka.ingestor_logs import obter_ingestor_ativo
             
-            # Procurar por erros
-            erros_encontrados = []
-            linhas_log = logs.split('\n')
+            detector = criar_detector(self.settings)
+            limite = self.settings.obter("diagnostico", "linhas_analise_logs", 5000)
             
-            for linha in linhas_log:
-                linha_lower = linha.lower()
-                if any(palavra in linha_lower for palavra in ['error', 'erro', 'failed', 'exception', 'fatal', 'panic']):
-                    erros_encontrados.append(linha.strip())
+            ingestor = obter_ingestor_ativo()
+            if ingestor is not None:
+                detector.analisar_logs(ingestor.iterar_historico(limite=limite))
+            
+            if not detector.linhas_analisadas:
+                logs = self.planka_manager.obter_logs(linhas=limite)
+                if not logs:
+                    return {
+                        "disponivel": False,
+                        "erro": "Não foi possível obter logs"
+                    }
+                detector.analisar_texto(logs)
+            
+            resumo = detector.resumo(limite=20)
+            erros = [
+                f"{item['exemplo'][:200]} (x{item['ocorrencias']})" if item["ocorrencias"] > 1 else item["exemplo"][:200]
+                for item in resumo[:5]
+            ]
             
             return {
                 "disponivel": True,
-                "tamanho": len(logs),
-                "erros": erros_encontrados[-5:] if erros_encontrados else None  # Últimos 5 erros
+                "tamanho": detector.caracteres_analisados,
+                "linhas": detector.linhas_analisadas,
+                "total_erros": detector.total_erros,
+                "criticos": detector.tem_criticos(),
+                "assinaturas": resumo,
+                "erros": erros or None  # Erros distintos mais relevantes
             }
             
         except Exception as e:
@@ -370,4 +387,8 @@ class DiagnosticManager:
             problemas.append("Erros encontrados nos logs")
             sugestoes.append("Verifique a configuração ou reinicie o Planka")
         
+        for assinatura in logs.get("assinaturas", []):
+            if assinatura["gravidade"] == "critico":
+                problemas.append(f"Erro crítico recorrente ({assinatura['assinatura']}, {assinatura['ocorrencias']}x): {assinatura['exemplo'][:120]}")
+        
         return problemas, sugestoes 
\ No newline at end of file
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline de exportação de logs em streaming.
+Gerador de registros -> formatador -> compressão opcional -> arquivo ou entrada ZIP.
+"""
+
+import io
+import os
+import csv
+import json
+import gzip
+import zipfile
+import threading
+from typing import Dict, List, Optional, Iterable, Callable, Any
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional
+    zstandard = None
+
+
+class ExportacaoCancelada(Exception):
+    """Levantada quando uma exportação é cancelada a meio."""
+
+
+class FormatadorExportacao:
+    """
+    Formatador base: converte um registro (dict) numa string de saída.
+    """
+
+    extensao = "txt"
+
+    def __init__(self, colunas: List[str]):
+        """
+        Inicializa o formatador.
+
+        Args:
+            colunas: Chaves dos registros a exportar, pela ordem
+        """
+        self.colunas = colunas
+
+    def cabecalho(self) -> str:
+        """Texto escrito antes do primeiro registro."""
+        return ""
+
+    def formatar(self, registro: Dict[str, Any]) -> str:
+        """Formata um registro."""
+        raise NotImplementedError
+
+    def rodape(self) -> str:
+        """Texto escrito depois do último registro."""
+        return ""
+
+
+class FormatadorCSV(FormatadorExportacao):
+    """Formatador CSV com linha de títulos."""
+
+    extensao = "csv"
+
+    def __init__(self, colunas: List[str], titulos: Optional[List[str]] = None):
+        super().__init__(colunas)
+        self.titulos = titulos or colunas
+        # Buffer reutilizado para cada linha, evita acumular a saída
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _linha(self, valores: List[Any]) -> str:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(valores)
+        return self._buffer.getvalue()
+
+    def cabecalho(self) -> str:
+        return self._linha(self.titulos)
+
+    def formatar(self, registro: Dict[str, Any]) -> str:
+        return self._linha([registro.get(coluna, "") for coluna in self.colunas])
+
+
+class FormatadorNDJSON(FormatadorExportacao):
+    """Formatador NDJSON: um objeto JSON por linha."""
+
+    extensao = "ndjson"
+
+    def formatar(self, registro: Dict[str, Any]) -> str:
+        dados = {coluna: registro.get(coluna) for coluna in self.colunas}
+        return json.dumps(dados, ensure_ascii=False, default=str) + "\n"
+
+
+class FormatadorJSON(FormatadorExportacao):
+    """Formatador JSON (lista) escrito incrementalmente."""
+
+    extensao = "json"
+
+    def __init__(self, colunas: List[str]):
+        super().__init__(colunas)
+        self._primeiro = True
+
+    def cabecalho(self) -> str:
+        self._primeiro = True
+        return "["
+
+    def formatar(self, registro: Dict[str, Any]) -> str:
+        dados = {coluna: registro.get(coluna) for coluna in self.colunas}
+        separador = "\n  " if self._primeiro else ",\n  "
+        self._primeiro = False
+        return separador + json.dumps(dados, ensure_ascii=False, default=str)
+
+    def rodape(self) -> str:
+        return "\n]\n"
+
+
+class FormatadorTXT(FormatadorExportacao):
+    """Formatador de texto livre."""
+
+    extensao = "txt"
+
+    def __init__(self, colunas: List[str], modelo: Optional[Callable[[Dict[str, Any]], str]] = None):
+        """
+        Inicializa o formatador.
+
+        Args:
+            colunas: Chaves dos registros a exportar
+            modelo: Função que formata um registro; por padrão junta as colunas com " - "
+        """
+        super().__init__(colunas)
+        self.modelo = modelo
+
+    def formatar(self, registro: Dict[str, Any]) -> str:
+        if self.modelo:
+            return self.modelo(registro)
+        return " - ".join(str(registro.get(coluna, "")) for coluna in self.colunas) + "\n"
+
+
+FORMATADORES = {
+    "csv": FormatadorCSV,
+    "ndjson": FormatadorNDJSON,
+    "json": FormatadorJSON,
+    "txt": FormatadorTXT,
+}
+
+COMPRESSOES = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+
+def criar_formatador(formato: str, colunas: List[str], **kwargs) -> FormatadorExportacao:
+    """
+    Cria o formatador para um formato.
+
+    Args:
+        formato: csv, ndjson, json ou txt
+        colunas: Chaves dos registros
+        **kwargs: Argumentos específicos do formatador (titulos, modelo)
+
+    Returns:
+        Formatador configurado
+    """
+    classe = FORMATADORES.get(formato.lower())
+    if not classe:
+        raise ValueError(f"Formato não suportado: {formato}")
+
+    if classe is FormatadorCSV:
+        return classe(colunas, titulos=kwargs.get("titulos"))
+    if classe is FormatadorTXT:
+        return classe(colunas, modelo=kwargs.get("modelo"))
+    return classe(colunas)
+
+
+def compressao_disponivel(compressao: Optional[str]) -> bool:
+    """Verifica se um tipo de compressão pode ser usado neste ambiente."""
+    if not compressao:
+        return True
+    if compressao == "gzip":
+        return True
+    if compressao == "zstd":
+        return zstandard is not None
+    return False
+
+
+def _abrir_compressao(destino_binario, compressao: Optional[str]):
+    """Envolve o destino binário com o estágio de compressão pedido."""
+    if not compressao:
+        return destino_binario
+    if compressao == "gzip":
+        return gzip.GzipFile(fileobj=destino_binario, mode="wb")
+    if compressao == "zstd":
+        if zstandard is None:
+            raise ValueError("Compressão zstd requer o pacote 'zstandard'")
+        return zstandard.ZstdCompressor().stream_writer(destino_binario, closefd=False)
+    raise ValueError(f"Compressão não suportada: {compressao}")
+
+
+def exportar_stream(registros: Iterable[Dict[str, Any]], formatador: FormatadorExportacao,
+                    destino, compressao: Optional[str] = None, entrada_zip: Optional[str] = None,
+                    callback_progresso: Optional[Callable[[int], None]] = None,
+                    cancelar: Optional[threading.Event] = None,
+                    intervalo_progresso: int = 500) -> int:
+    """
+    Escreve registros no destino sem os acumular em memória.
+
+    Args:
+        registros: Gerador de registros (dicts)
+        formatador: Formatador de saída
+        destino: Caminho do arquivo, ou ZipFile aberto quando entrada_zip é usado
+        compressao: None, "gzip" ou "zstd"
+        entrada_zip: Nome da entrada dentro do ZIP
+        callback_progresso: Chamado com o número de registros escritos
+        cancelar: Evento que, quando definido, interrompe a exportação
+        intervalo_progresso: Registros entre chamadas ao callback
+
+    Returns:
+        Número de registros escritos
+    """
+    if entrada_zip is not None:
+        destino_binario = destino.open(entrada_zip, "w", force_zip64=True)
+    else:
+        destino_binario = open(destino, "wb")
+
+    processados = 0
+    concluido = False
+    try:
+        comprimido = _abrir_compressao(destino_binario, compressao)
+        texto = io.TextIOWrapper(comprimido, encoding="utf-8", newline="")
+        try:
+            texto.write(formatador.cabecalho())
+
+            for registro in registros:
+                if cancelar is not None and cancelar.is_set():
+                    raise ExportacaoCancelada(f"Exportação cancelada após {processados} registros")
+
+                texto.write(formatador.formatar(registro))
+                processados += 1
+
+                if callback_progresso and processados % intervalo_progresso == 0:
+                    callback_progresso(processados)
+
+            texto.write(formatador.rodape())
+            concluido = True
+        finally:
+            texto.flush()
+            # Fechar o wrapper fecha a compressão; o destino é fechado abaixo
+            texto.detach()
+            if comprimido is not destino_binario:
+                comprimido.close()
+    finally:
+        destino_binario.close()
+        if not concluido and entrada_zip is None:
+            try:
+                os.remove(destino)
+            except OSError:
+                pass
+
+    if callback_progresso:
+        callback_progresso(processados)
+
+    return processados
+
+
+def abrir_zip(caminho: str) -> zipfile.ZipFile:
+    """Abre um ZIP de exportação com compressão deflate por entrada."""
+    return zipfile.ZipFile(caminho, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True)
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+Índice persistente de uma árvore de arquivos.
+Guarda caminho, tamanho, mtime, inode e (quando pedido) o hash do conteúdo de
+cada arquivo no SQLite, atualizado de forma incremental com os.scandir. Cada
+atualização com alterações abre uma nova geração, e marcos com nome (ex.:
+"build", "sincronizacao") permitem saber o que mudou desde esse momento sem
+voltar a percorrer a árvore.
+"""
+
+import os
+import re
+import time
+import fnmatch
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .armazenamento import obter_banco
+
+
+# Dependências, metadados do git e resultados de builds
+IGNORAR_PADRAO = [".git", "node_modules", ".venv", "venv", "__pycache__", ".cache",
+                  "dist", "build", "coverage", "*.pyc", "*.log", ".DS_Store"]
+
+
+class IndiceArquivos:
+    """
+    Índice incremental dos arquivos de um diretório.
+    """
+
+    def __init__(self, raiz, arquivo_banco, ignorar: Optional[Iterable[str]] = None):
+        """
+        Inicializa o índice.
+
+        Args:
+            raiz: Diretório indexado
+            arquivo_banco: Base SQLite onde o índice é guardado
+            ignorar: Padrões (fnmatch) de nomes ou caminhos relativos a ignorar
+        """
+        self.raiz = Path(raiz).expanduser()
+        self.chave = str(self.raiz.resolve())
+        self.banco = obter_banco(arquivo_banco)
+        self.ignorar = list(IGNORAR_PADRAO if ignorar is None else ignorar)
+        # Todos os padrões numa única expressão (evita um fnmatch por padrão e arquivo)
+        self._ignorar_re = re.compile("|".join(fnmatch.translate(p) for p in self.ignorar)) if self.ignorar else None
+        self.lock = threading.RLock()
+
+        # caminho -> [tamanho, mtime_ns, inode, hash, geracao, removido]
+        self.entradas = None
+        self.geracao = 0
+
+        self._inicializar_tabelas()
+
+    def _inicializar_tabelas(self):
+        """Cria as tabelas do índice."""
+        try:
+            with self.banco.transacao() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS indice_arquivos (
+                        raiz TEXT NOT NULL,
+                        caminho TEXT NOT NULL,
+                        tamanho INTEGER NOT NULL,
+                        mtime_ns INTEGER NOT NULL,
+                        inode INTEGER NOT NULL,
+                        hash TEXT,
+                        geracao INTEGER NOT NULL,
+                        removido INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (raiz, caminho)
+                    ) WITHOUT ROWID
+                """)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS indice_marcos (
+                        raiz TEXT NOT NULL,
+                        nome TEXT NOT NULL,
+                        geracao INTEGER NOT NULL,
+                        instante TEXT DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (raiz, nome)
+                    ) WITHOUT ROWID
+                """)
+        except Exception as e:
+            print(f"Erro ao inicializar índice de arquivos: {e}")
+
+    def _geracao_guardada(self, conn=None) -> int:
+        """Última geração guardada no banco para esta raiz (arquivos ou marcos)."""
+        sql = """
+            SELECT MAX(g) FROM (
+                SELECT MAX(geracao) AS g FROM indice_arquivos WHERE raiz = ?
+                UNION ALL
+                SELECT MAX(geracao) FROM indice_marcos WHERE raiz = ?
+            )
+        """
+        linha = (conn.execute(sql, (self.chave, self.chave)).fetchone() if conn is not None
+                 else self.banco.consultar_um(sql, (self.chave, self.chave)))
+        return (linha[0] if linha else None) or 0
+
+    def _carregar(self, sincronizar: bool = True):
+        """
+        Carrega o índice guardado para memória.
+
+        Outras instâncias (de outros PlankaManager) podem ter gravado o mesmo
+        índice entretanto; se a geração guardada mudou, é recarregado.
+
+        Args:
+            sincronizar: Verificar a geração guardada mesmo já estando carregado
+                (False nas operações por arquivo, chamadas muitas vezes seguidas)
+        """
+        if self.entradas is not None and not sincronizar:
+            return
+        geracao = self._geracao_guardada()
+        if self.entradas is not None and geracao == self.geracao:
+            return
+        linhas = self.banco.consultar("""
+            SELECT caminho, tamanho, mtime_ns, inode, hash, geracao, removido
+            FROM indice_arquivos WHERE raiz = ?
+        """, (self.chave,))
+        self.entradas = {linha[0]: list(linha[1:]) for linha in linhas}
+        self.geracao = geracao
+
+    def _ignorado(self, relativo: str, nome: str) -> bool:
+        """Verifica se um caminho corresponde a algum padrão ignorado."""
+        if self._ignorar_re is None:
+            return False
+        return bool(self._ignorar_re.match(nome) or self._ignorar_re.match(relativo))
+
+    def _percorrer(self) -> Dict[str, os.stat_result]:
+        """Arquivos atuais da árvore (caminho relativo -> stat), sem os ignorados."""
+        arquivos = {}
+        pendentes = [""]
+        while pendentes:
+            relativo_dir = pendentes.pop()
+            try:
+                entradas = os.scandir(self.raiz / relativo_dir)
+            except OSError:
+                continue
+            with entradas:
+                for entrada in entradas:
+                    relativo = f"{relativo_dir}/{entrada.name}" if relativo_dir else entrada.name
+                    if self._ignorado(relativo, entrada.name):
+                        continue
+                    try:
+                        if entrada.is_dir(follow_symlinks=False):
+                            pendentes.append(relativo)
+                        elif entrada.is_file(follow_symlinks=False):
+                            arquivos[relativo] = entrada.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+        return arquivos
+
+    def atualizar(self) -> Dict[str, Any]:
+        """
+        Atualiza o índice com o estado atual da árvore.
+
+        Só os arquivos com tamanho, mtime ou inode diferentes são regravados
+        (e perdem o hash guardado); os que desapareceram ficam marcados como
+        removidos na nova geração.
+
+        Returns:
+            Dict com novos, alterados, removidos, total e duracao_ms
+        """
+        inicio = time.perf_counter()
+        with self.lock:
+            self._carregar()
+            atuais = self._percorrer()
+            novos, alterados, removidos = [], [], []
+            gravar = {}  # caminho -> [tamanho, mtime_ns, inode, removido]
+
+            for caminho, stat in atuais.items():
+                entrada = self.entradas.get(caminho)
+                assinatura = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+                if entrada is not None and not entrada[5] and tuple(entrada[:3]) == assinatura:
+                    continue
+                (alterados if entrada is not None and not entrada[5] else novos).append(caminho)
+                gravar[caminho] = [*assinatura, 0]
+
+            for caminho, entrada in self.entradas.items():
+                if not entrada[5] and caminho not in atuais:
+                    removidos.append(caminho)
+                    gravar[caminho] = [*entrada[:3], 1]
+
+            if gravar:
+                try:
+                    with self.banco.transacao() as conn:
+                        # A geração nova é tirada do banco dentro da transação (de escrita),
+                        # para que duas instâncias do mesmo índice nunca reutilizem uma geração
+                        geracao = self._geracao_guardada(conn) + 1
+                        conn.executemany("""
+                            INSERT OR REPLACE INTO indice_arquivos
+                            (raiz, caminho, tamanho, mtime_ns, inode, hash, geracao, removido)
+                            VALUES (?, ?, ?, ?, ?, NULL, ?, ?)
+                        """, [(self.chave, caminho, t, m, i, geracao, r) for caminho, (t, m, i, r) in gravar.items()])
+                    for caminho, (t, m, i, r) in gravar.items():
+                        self.entradas[caminho] = [t, m, i, None, geracao, r]
+                    self.geracao = geracao
+                except Exception as e:
+                    print(f"Erro ao gravar índice de arquivos: {e}")
+
+            return {
+                "novos": novos,
+                "alterados": alterados,
+                "removidos": removidos,
+                "total": len(atuais),
+                "duracao_ms": round((time.perf_counter() - inicio) * 1000, 1)
+            }
+
+    def arquivos(self, filtro: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """
+        Arquivos presentes no índice (sem voltar a percorrer a árvore).
+
+        Args:
+            filtro: Função que recebe o caminho relativo e decide se é incluído
+
+        Returns:
+            Caminhos relativos ordenados
+        """
+        with self.lock:
+            self._carregar()
+            return sorted(c for c, e in self.entradas.items() if not e[5] and (filtro is None or filtro(c)))
+
+    def obter(self, caminho: str) -> Optional[Dict[str, Any]]:
+        """Entrada de um arquivo (tamanho, mtime_ns, inode, hash) ou None."""
+        with self.lock:
+            self._carregar(sincronizar=False)
+            entrada = self.entradas.get(caminho)
+            if entrada is None or entrada[5]:
+                return None
+            return {"tamanho": entrada[0], "mtime_ns": entrada[1], "inode": entrada[2], "hash": entrada[3]}
+
+    def hash_arquivo(self, caminho: str) -> Optional[str]:
+        """
+        Hash SHA-1 do conteúdo de um arquivo, calculado só na primeira vez
+        depois de cada alteração.
+
+        Args:
+            caminho: Caminho relativo à raiz
+
+        Returns:
+            Hash em hexadecimal ou None se o arquivo não estiver no índice
+        """
+        with self.lock:
+            self._carregar(sincronizar=False)
+            entrada = self.entradas.get(caminho)
+            if entrada is None or entrada[5]:
+                return None
+            if entrada[3] is not None:
+                return entrada[3]
+
+        h = hashlib.sha1()
+        try:
+            with open(self.raiz / caminho, 'rb') as f:
+                for bloco in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(bloco)
+        except OSError:
+            return None
+
+        with self.lock:
+            entrada[3] = h.hexdigest()
+            try:
+                self.banco.executar(
+                    "UPDATE indice_arquivos SET hash = ? WHERE raiz = ? AND caminho = ? AND geracao = ?",
+                    (entrada[3], self.chave, caminho, entrada[4])
+                )
+            except Exception as e:
+                print(f"Erro ao gravar hash no índice: {e}")
+            return entrada[3]
+
+    def impressao(self, filtro: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Impressão digital (SHA-256) dos caminhos e conteúdos indexados.
+
+        Args:
+            filtro: Restringir aos caminhos para os quais devolve True
+
+        Returns:
+            Hash em hexadecimal
+        """
+        impressao = hashlib.sha256()
+        for caminho in self.arquivos(filtro):
+            hash_arquivo = self.hash_arquivo(caminho)
+            if hash_arquivo is not None:
+                impressao.update(f"{caminho}\0{hash_arquivo}\n".encode('utf-8'))
+        return impressao.hexdigest()
+
+    def marcar(self, nome: str):
+        """
+        Regista a geração atual com um nome (ex.: "build" ou "sincronizacao").
+
+        Args:
+            nome: Nome do marco
+        """
+        with self.lock:
+            self._carregar()
+            try:
+                with self.banco.transacao() as conn:
+                    conn.execute("""
+                        INSERT OR REPLACE INTO indice_marcos (raiz, nome, geracao, instante)
+                        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    """, (self.chave, nome, self._geracao_guardada(conn)))
+
+                    # As remoções anteriores a todos os marcos já não são necessárias
+                    minimo = conn.execute(
+                        "SELECT MIN(geracao) FROM indice_marcos WHERE raiz = ?", (self.chave,)
+                    ).fetchone()[0]
+                    conn.execute(
+                        "DELETE FROM indice_arquivos WHERE raiz = ? AND removido = 1 AND geracao <= ?",
+                        (self.chave, minimo)
+                    )
+                for caminho in [c for c, e in self.entradas.items() if e[5] and e[4] <= minimo]:
+                    del self.entradas[caminho]
+            except Exception as e:
+                print(f"Erro ao registrar marco do índice: {e}")
+
+    def alteracoes_desde(self, nome: str) -> Optional[Dict[str, Any]]:
+        """
+        Arquivos alterados desde um marco.
+
+        Args:
+            nome: Nome do marco
+
+        Returns:
+            Dict com alterados (novos ou modificados), removidos e instante do
+            marco, ou None se o marco não existir
+        """
+        marco = self.banco.consultar_um(
+            "SELECT geracao, instante FROM indice_marcos WHERE raiz = ? AND nome = ?", (self.chave, nome)
+        )
+        if marco is None:
+            return None
+        geracao, instante = marco
+        with self.lock:
+            self._carregar()
+            alterados = sorted(c for c, e in self.entradas.items() if e[4] > geracao and not e[5])
+            removidos = sorted(c for c, e in self.entradas.items() if e[4] > geracao and e[5])
+        return {"alterados": alterados, "removidos": removidos, "instante": instante}
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Leitura eficiente de arquivos de log.
+Leitura das últimas linhas a partir do fim do arquivo e acompanhamento (follow) de novas linhas.
+"""
+
+import os
+import gzip
+import time
+import threading
+from collections import deque
+from pathlib import Path
+from typing import List, Iterator, Callable, Optional, Union
+
+
+def abrir_log(caminho: Union[str, Path], encoding: str = 'utf-8'):
+    """
+    Abre um arquivo de log em modo texto, descomprimindo segmentos .gz.
+
+    Args:
+        caminho: Arquivo de log
+        encoding: Codificação do arquivo
+
+    Returns:
+        Arquivo aberto para leitura
+    """
+    if str(caminho).endswith(".gz"):
+        return gzip.open(caminho, 'rt', encoding=encoding, errors='replace')
+    return open(caminho, 'r', encoding=encoding, errors='replace')
+
+
+def ler_ultimas_linhas(caminho: Union[str, Path], quantidade: int,
+                       tamanho_bloco: int = 8192, encoding: str = 'utf-8') -> List[str]:
+    """
+    Lê as últimas linhas de um arquivo recuando a partir do fim em blocos.
+
+    O custo é proporcional ao número de linhas pedidas e não ao tamanho do arquivo
+    (exceto em segmentos .gz, limitados pelo tamanho máximo de rotação).
+
+    Args:
+        caminho: Arquivo a ler
+        quantidade: Número de linhas a devolver
+        tamanho_bloco: Bytes lidos por cada recuo
+        encoding: Codificação do arquivo
+
+    Returns:
+        Lista de linhas (com quebra de linha), da mais antiga para a mais recente
+    """
+    if quantidade <= 0:
+        return []
+
+    # Segmentos comprimidos não permitem recuar; lê-se em streaming guardando só o fim
+    if str(caminho).endswith(".gz"):
+        with abrir_log(caminho, encoding) as f:
+            return list(deque(f, maxlen=quantidade))
+
+    with open(caminho, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        posicao = f.tell()
+        blocos = []
+        quebras = 0
+
+        # Precisamos de quantidade + 1 quebras para garantir que a primeira linha está completa
+        while posicao > 0 and quebras <= quantidade:
+            ler = min(tamanho_bloco, posicao)
+            posicao -= ler
+            f.seek(posicao)
+            bloco = f.read(ler)
+            blocos.append(bloco)
+            quebras += bloco.count(b'\n')
+
+    dados = b''.join(reversed(blocos))
+    linhas = dados.splitlines(keepends=True)
+
+    # A primeira linha pode ter começado antes do último bloco lido
+    if posicao > 0 and linhas:
+        linhas = linhas[1:]
+
+    return [linha.decode(encoding, errors='replace') for linha in linhas[-quantidade:]]
+
+
+def seguir_arquivo(obter_caminho: Callable[[], Union[str, Path]], parar: Optional[threading.Event] = None,
+                   intervalo: float = 0.5, desde_o_inicio: bool = False,
+                   encoding: str = 'utf-8') -> Iterator[str]:
+    """
+    Gera novas linhas à medida que são acrescentadas ao arquivo (modo follow).
+
+    Usa polling de tamanho/mtime, que funciona igual em Windows e Linux. O caminho é
+    reavaliado a cada ciclo, por isso a troca do arquivo diário à meia-noite
+    ou uma rotação são seguidas automaticamente. Antes de passar ao arquivo
+    novo, o anterior é lido até ao fim, para não perder as linhas escritas
+    desde a última verificação.
+
+    Args:
+        obter_caminho: Função que devolve o arquivo atual
+        parar: Evento que termina o gerador quando definido
+        intervalo: Segundos entre verificações
+        desde_o_inicio: Ler o arquivo inicial desde o início em vez do fim
+        encoding: Codificação do arquivo
+
+    Yields:
+        Linhas completas (com quebra de linha)
+    """
+    caminho_atual = None
+    identidade = None
+    posicao = 0
+    pendente = b''
+    primeiro = True
+
+    # Em POSIX o arquivo fica aberto entre verificações e o descritor continua
+    # a ler o arquivo antigo depois de renomeado. Em Windows um arquivo aberto
+    # impediria a rotação (os.replace), por isso é reaberto a cada ciclo e,
+    # numa troca, o anterior é procurado pela identidade.
+    manter_aberto = os.name != 'nt'
+    arquivo = None
+
+    def abrir_anterior():
+        """Arquivo seguido até à troca, ou None se já não existir."""
+        if arquivo is not None:
+            return arquivo
+        for candidato in [caminho_atual, *caminho_atual.parent.iterdir()]:
+            try:
+                estado_candidato = os.stat(candidato)
+            except OSError:
+                continue
+            if (estado_candidato.st_dev, estado_candidato.st_ino) == identidade:
+                return open(candidato, 'rb')
+        return None
+
+    try:
+        while parar is None or not parar.is_set():
+            try:
+                caminho = Path(obter_caminho())
+                estado = os.stat(caminho) if caminho.exists() else None
+
+                if estado is None:
+                    time.sleep(intervalo)
+                    continue
+
+                # Novo arquivo (troca de dia/rotação) ou arquivo truncado: recomeçar do início
+                nova_identidade = (estado.st_dev, estado.st_ino)
+                trocou = caminho != caminho_atual or nova_identidade != identidade
+                if trocou or estado.st_size < posicao:
+                    if trocou and identidade is not None:
+                        # Acabar de ler o arquivo anterior antes de passar ao novo
+                        anterior = abrir_anterior()
+                        arquivo = None
+                        if anterior is not None:
+                            with anterior:
+                                anterior.seek(posicao)
+                                pendente += anterior.read()
+                            *completas, pendente = pendente.split(b'\n')
+                            if pendente:
+                                completas.append(pendente)
+                            for linha in completas:
+                                yield (linha + b'\n').decode(encoding, errors='replace')
+                    if primeiro and not desde_o_inicio:
+                        posicao = estado.st_size
+                    else:
+                        posicao = 0
+                    caminho_atual = caminho
+                    identidade = nova_identidade
+                    pendente = b''
+                primeiro = False
+
+                if estado.st_size > posicao:
+                    f = arquivo if arquivo is not None else open(caminho, 'rb')
+                    if arquivo is None and manter_aberto:
+                        aberto = os.fstat(f.fileno())
+                        if (aberto.st_dev, aberto.st_ino) != identidade:
+                            # Trocado entre o stat e a abertura: tratado no próximo ciclo
+                            f.close()
+                            continue
+                        arquivo = f
+                    try:
+                        f.seek(posicao)
+                        dados = f.read(estado.st_size - posicao)
+                    finally:
+                        if not manter_aberto:
+                            f.close()
+                    posicao += len(dados)
+
+                    pendente += dados
+                    *completas, pendente = pendente.split(b'\n')
+                    for linha in completas:
+                        yield (linha + b'\n').decode(encoding, errors='replace')
+                    continue
+
+            except OSError:
+                pass
+
+            time.sleep(intervalo)
+    finally:
+        if arquivo is not None:
+            arquivo.close()
@@ -4,15 +4,53 @@ Sistema de logs do Dashboard de Tarefas.
 """
 
 import os
+import time
+import queue
+import atexit
 import logging
 import datetime
+import threading
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Iterator, Callable
+
+from .leitor_logs import ler_ultimas_linhas, seguir_arquivo, abrir_log
+from .rotacao_logs import (
+    ManipuladorRotativoDiario, CompressorSegmentos, IndiceSegmentos,
+    analisar_nome_log, listar_arquivos_log
+)
+from .exportacao_logs import (
+    ExportacaoCancelada, COMPRESSOES, criar_formatador, compressao_disponivel, exportar_stream
+)
+
+
+# Mapear níveis customizados para níveis padrão
+NIVEIS_LOGGING = {
+    "SUCCESS": logging.INFO,
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL
+}
+
+# Prefixos usados na saída de console
+PREFIXOS_CONSOLE = {
+    "SUCCESS": "✅",
+    "ERROR": "❌",
+    "WARNING": "⚠️"
+}
+
+# Marca de fim para a thread de escrita
+_FIM_FILA = None
 
 
 class LogManager:
     """
     Gerenciador de logs do sistema.
+    
+    Quem regista um log apenas coloca o registro numa fila limitada; uma única
+    thread de escrita formata, grava em arquivo, escreve no console e repassa
+    ao LogsAvancadoManager, para que a thread da interface nunca espere pelo disco.
     """
     
     def __init__(self, settings=None):
@@ -24,7 +62,62 @@ class LogManager:
         """
         self.settings = settings
         self.loggers = {}
+        self.logs_avancado = None
+        self.compressor = CompressorSegmentos()
         self._configurar_loggers()
+        self._configurar_niveis()
+        
+        # Fila limitada entre quem regista e a thread de escrita
+        tamanho_fila = self._obter_config("tamanho_fila", 10000)
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.contadores_fila = {
+            "enfileirados": 0,
+            "descartados": 0,
+            "filtrados": 0,
+            "processados": 0
+        }
+        self.contadores_lock = threading.Lock()
+        self._descartados_reportados = 0
+        
+        self.thread_escrita = threading.Thread(target=self._loop_escrita, daemon=True)
+        self.thread_escrita.start()
+        
+        # Garantir que a fila é escrita ao sair
+        atexit.register(self.parar)
+    
+    def _obter_config(self, chave: str, valor_padrao=None):
+        """Obtém uma configuração da secção de logs."""
+        if not self.settings:
+            return valor_padrao
+        return self.settings.obter("logs", chave, valor_padrao)
+    
+    def _configurar_niveis(self):
+        """Configura o nível mínimo global e por origem."""
+        nivel_global = str(self._obter_config("nivel", "INFO")).upper()
+        self.nivel_minimo = NIVEIS_LOGGING.get(nivel_global, logging.INFO)
+        
+        self.niveis_por_origem = {}
+        for origem, nivel in (self._obter_config("niveis_origem", {}) or {}).items():
+            self.niveis_por_origem[origem] = NIVEIS_LOGGING.get(str(nivel).upper(), self.nivel_minimo)
+    
+    def definir_nivel_origem(self, origem: str, nivel: str):
+        """
+        Define o nível mínimo de uma origem.
+        
+        Args:
+            origem: Origem do log (sistema, tarefas, servidores, planka)
+            nivel: Nível mínimo (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        """
+        self.niveis_por_origem[origem] = NIVEIS_LOGGING.get(nivel.upper(), self.nivel_minimo)
+    
+    def conectar_logs_avancado(self, logs_avancado):
+        """
+        Repassa os logs registados ao gerenciador avançado (base de dados).
+        
+        Args:
+            logs_avancado: Instância de LogsAvancadoManager
+        """
+        self.logs_avancado = logs_avancado
     
     def _configurar_loggers(self):
         """Configura os loggers para diferentes tipos de log."""
@@ -72,10 +165,15 @@ class LogManager:
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         
-        # Handler para arquivo
+        # Handler para arquivo (um por dia, rodado por tamanho)
         try:
-            arquivo_log = diretorio / f"{nome}_{datetime.date.today()}.log"
-            file_handler = logging.FileHandler(arquivo_log, encoding='utf-8')
+            file_handler = ManipuladorRotativoDiario(
+                diretorio,
+                nome,
+                tamanho_maximo=int(float(self._obter_config("tamanho_maximo_mb", 10)) * 1024 * 1024),
+                max_arquivos=int(self._obter_config("max_arquivos", 10)),
+                compressor=self.compressor
+            )
             file_handler.setLevel(logging.INFO)
             file_handler.setFormatter(formato)
         except PermissionError:
@@ -103,6 +201,9 @@ class LogManager:
         """
         Registra um log no sistema.
         
+        Apenas filtra pelo nível e coloca o registro na fila; a formatação e a
+        escrita acontecem na thread de escrita.
+        
         Args:
             nivel: Nível do log (INFO, WARNING, ERROR, SUCCESS, DEBUG)
             mensagem: Mensagem do log
@@ -111,47 +212,120 @@ class LogManager:
         """
         # Normalizar nível
         nivel = nivel.upper()
+        nivel_logging = NIVEIS_LOGGING.get(nivel, logging.INFO)
         
-        # Mapear níveis customizados para níveis padrão
-        nivel_mapping = {
-            "SUCCESS": "INFO",
-            "DEBUG": "DEBUG",
-            "INFO": "INFO",
-            "WARNING": "WARNING",
-            "ERROR": "ERROR",
-            "CRITICAL": "CRITICAL"
-        }
+        # Filtrar antes de qualquer formatação
+        if nivel_logging < self.niveis_por_origem.get(origem, self.nivel_minimo):
+            with self.contadores_lock:
+                self.contadores_fila["filtrados"] += 1
+            return
+        
+        registro = (time.time(), nivel, nivel_logging, mensagem, origem, detalhes)
+        
+        # Sem thread de escrita (após parar), escrever diretamente
+        if not self.thread_escrita.is_alive():
+            self._processar_registro(registro)
+            return
+        
+        try:
+            self.fila.put_nowait(registro)
+            with self.contadores_lock:
+                self.contadores_fila["enfileirados"] += 1
+        except queue.Full:
+            with self.contadores_lock:
+                self.contadores_fila["descartados"] += 1
+    
+    def _loop_escrita(self):
+        """Consome a fila de logs até receber a marca de fim."""
+        while True:
+            registro = self.fila.get()
+            try:
+                if registro is _FIM_FILA:
+                    self._reportar_descartados(forcar=True)
+                    return
+                self._processar_registro(registro)
+                self._reportar_descartados()
+            except Exception as e:
+                print(f"Erro ao processar log: {e}")
+            finally:
+                self.fila.task_done()
+    
+    def _processar_registro(self, registro: tuple):
+        """
+        Formata e escreve um registro (arquivo, console e logs avançados).
         
-        nivel_logging = nivel_mapping.get(nivel, "INFO")
+        Args:
+            registro: (timestamp, nivel, nivel_logging, mensagem, origem, detalhes)
+        """
+        criado, nivel, nivel_logging, mensagem, origem, detalhes = registro
         
         # Preparar mensagem completa
         mensagem_completa = mensagem
         if detalhes:
             mensagem_completa += f" | Detalhes: {detalhes}"
         
-        # Registrar no logger apropriado
+        # Registrar no logger apropriado, com o instante original do registo
         logger = self.loggers.get(origem, self.loggers.get("sistema"))
-        if logger:
-            if nivel_logging == "DEBUG":
-                logger.debug(mensagem_completa)
-            elif nivel_logging == "INFO":
-                logger.info(mensagem_completa)
-            elif nivel_logging == "WARNING":
-                logger.warning(mensagem_completa)
-            elif nivel_logging == "ERROR":
-                logger.error(mensagem_completa)
-            elif nivel_logging == "CRITICAL":
-                logger.critical(mensagem_completa)
-        
-        # Log de sucesso com formatação especial
-        if nivel == "SUCCESS":
-            print(f"✅ {mensagem_completa}")
-        elif nivel == "ERROR":
-            print(f"❌ {mensagem_completa}")
-        elif nivel == "WARNING":
-            print(f"⚠️ {mensagem_completa}")
-        else:
-            print(f"ℹ️ {mensagem_completa}")
+        if logger and logger.isEnabledFor(nivel_logging):
+            log_record = logger.makeRecord(logger.name, nivel_logging, "(fila)", 0,
+                                           mensagem_completa, None, None)
+            log_record.created = criado
+            log_record.msecs = (criado - int(criado)) * 1000
+            logger.handle(log_record)
+        
+        # Saída de console com formatação especial
+        print(f"{PREFIXOS_CONSOLE.get(nivel, 'ℹ️')} {mensagem_completa}")
+        
+        # Repassar ao gerenciador avançado
+        if self.logs_avancado:
+            self.logs_avancado.registrar_log(nivel, mensagem, origem, detalhes or {})
+        
+        with self.contadores_lock:
+            self.contadores_fila["processados"] += 1
+    
+    def _reportar_descartados(self, forcar: bool = False):
+        """
+        Regista um aviso quando a fila transbordou desde o último aviso.
+        
+        Args:
+            forcar: Reportar mesmo que ainda haja registros na fila
+        """
+        with self.contadores_lock:
+            descartados = self.contadores_fila["descartados"]
+        
+        if descartados > self._descartados_reportados and (forcar or self.fila.empty()):
+            novos = descartados - self._descartados_reportados
+            self._descartados_reportados = descartados
+            self._processar_registro((time.time(), "WARNING", logging.WARNING,
+                                      f"Fila de logs cheia: {novos} logs descartados", "sistema", None))
+    
+    def obter_estatisticas_fila(self) -> Dict[str, int]:
+        """
+        Obtém os contadores da fila de logs.
+        
+        Returns:
+            Dict com enfileirados, descartados, filtrados, processados e pendentes
+        """
+        with self.contadores_lock:
+            estatisticas = dict(self.contadores_fila)
+        estatisticas["pendentes"] = self.fila.qsize()
+        return estatisticas
+    
+    def parar(self, timeout: float = 5.0):
+        """
+        Escreve os logs pendentes e termina a thread de escrita.
+        
+        Args:
+            timeout: Tempo máximo de espera em segundos
+        """
+        if not self.thread_escrita.is_alive():
+            return
+        
+        try:
+            self.fila.put(_FIM_FILA, timeout=timeout)
+            self.thread_escrita.join(timeout)
+        except queue.Full:
+            print("Aviso: fila de logs não esvaziou a tempo")
     
     def log_sistema(self, nivel: str, mensagem: str, detalhes: Optional[Dict[str, Any]] = None):
         """Registra log do sistema."""
@@ -177,7 +351,10 @@ class LogManager:
     
     def obter_logs(self, tipo: str = "sistema", limite: int = 100) -> list:
         """
-        Obtém logs de um tipo específico.
+        Obtém as últimas linhas de log de um tipo específico.
+        
+        Lê a partir do fim do arquivo de hoje e, se faltarem linhas,
+        continua pelos arquivos diários anteriores.
         
         Args:
             tipo: Tipo de log (sistema, tarefas, servidores)
@@ -187,29 +364,53 @@ class LogManager:
             Lista de logs
         """
         try:
-            diretorio = self.settings.obter_diretorio_logs(tipo)
-            arquivo_log = diretorio / f"{tipo}_{datetime.date.today()}.log"
+            hoje = str(datetime.date.today())
+            linhas = []
             
-            if not arquivo_log.exists():
-                return []
+            for arquivo in reversed(self._arquivos_no_periodo(tipo, data_fim=hoje)):
+                faltam = limite - len(linhas)
+                if faltam <= 0:
+                    break
+                linhas = ler_ultimas_linhas(arquivo, faltam) + linhas
             
-            with open(arquivo_log, 'r', encoding='utf-8') as f:
-                linhas = f.readlines()
-                return linhas[-limite:] if len(linhas) > limite else linhas
+            return linhas
                 
         except Exception as e:
             self.log_sistema("ERROR", f"Erro ao obter logs: {e}")
             return []
     
+    def seguir_logs(self, tipo: str = "sistema", parar: Optional[threading.Event] = None,
+                    intervalo: float = 0.5) -> Iterator[str]:
+        """
+        Gera as novas linhas de log à medida que são escritas.
+        
+        Deve ser consumido fora da thread da interface; acompanha a troca
+        do arquivo diário à meia-noite.
+        
+        Args:
+            tipo: Tipo de log (sistema, tarefas, servidores)
+            parar: Evento que termina o acompanhamento
+            intervalo: Segundos entre verificações
+            
+        Yields:
+            Novas linhas de log
+        """
+        diretorio = self.settings.obter_diretorio_logs(tipo)
+        return seguir_arquivo(
+            lambda: diretorio / f"{tipo}_{datetime.date.today()}.log",
+            parar=parar,
+            intervalo=intervalo
+        )
+    
     def limpar_logs_antigos(self, dias: int = 30):
         """
-        Remove logs mais antigos que o número de dias especificado.
+        Remove logs (arquivos diários e segmentos) mais antigos que o número de dias especificado.
         
         Args:
             dias: Número de dias para manter os logs
         """
         try:
-            data_limite = datetime.date.today() - datetime.timedelta(days=dias)
+            data_limite = str(datetime.date.today() - datetime.timedelta(days=dias))
             
             for tipo in ["sistema", "tarefas", "servidores"]:
                 diretorio = self.settings.obter_diretorio_logs(tipo)
@@ -217,78 +418,166 @@ class LogManager:
                 if not diretorio.exists():
                     continue
                 
-                for arquivo in diretorio.glob(f"{tipo}_*.log"):
+                removidos = []
+                for arquivo in diretorio.glob(f"{tipo}_*.log*"):
                     try:
                         # Extrair data do nome do arquivo
-                        nome_arquivo = arquivo.stem
-                        data_str = nome_arquivo.split("_")[-1]
-                        data_arquivo = datetime.datetime.strptime(data_str, "%Y-%m-%d").date()
+                        info = analisar_nome_log(arquivo)
+                        if not info or info[0] != tipo:
+                            continue
                         
-                        if data_arquivo < data_limite:
+                        if info[1] < data_limite:
                             arquivo.unlink()
+                            removidos.append(arquivo.name[:-3] if info[3] else arquivo.name)
                             self.log_sistema("INFO", f"Log antigo removido: {arquivo.name}")
                     except Exception as e:
                         self.log_sistema("WARNING", f"Erro ao processar arquivo {arquivo}: {e}")
+                
+                if removidos:
+                    IndiceSegmentos(diretorio, tipo).remover(removidos)
                         
         except Exception as e:
             self.log_sistema("ERROR", f"Erro ao limpar logs antigos: {e}")
     
+    def _arquivos_no_periodo(self, tipo: str, data_inicio: Optional[str] = None,
+                             data_fim: Optional[str] = None) -> List[Path]:
+        """
+        Lista arquivos diários e segmentos de um tipo dentro do período, por ordem cronológica.
+        
+        Os limites podem ser datas (YYYY-MM-DD) ou datas com hora (YYYY-MM-DD HH:MM:SS);
+        com hora, os segmentos rodados fora do período são ignorados pelo índice sem serem abertos.
+        
+        Args:
+            tipo: Tipo de log
+            data_inicio: Início do período
+            data_fim: Fim do período
+            
+        Returns:
+            Lista de arquivos
+        """
+        diretorio = self.settings.obter_diretorio_logs(tipo)
+        indice = IndiceSegmentos(diretorio, tipo).carregar()
+        inicio_hora = data_inicio if data_inicio and len(data_inicio) > 10 else None
+        fim_hora = data_fim if data_fim and len(data_fim) > 10 else None
+        arquivos = []
+        
+        for arquivo in listar_arquivos_log(diretorio, tipo):
+            _, data_str, sequencia, comprimido = analisar_nome_log(arquivo)
+            
+            # Filtrar por data se especificado
+            if data_inicio and data_str < data_inicio[:10]:
+                continue
+            if data_fim and data_str > data_fim[:10]:
+                continue
+            
+            # Com hora, filtrar segmentos pelo período registado no índice
+            if sequencia and (inicio_hora or fim_hora):
+                entrada = indice.get(arquivo.name[:-3] if comprimido else arquivo.name, {})
+                if inicio_hora and entrada.get("fim") and entrada["fim"] < inicio_hora:
+                    continue
+                if fim_hora and entrada.get("inicio") and entrada["inicio"] > fim_hora:
+                    continue
+            
+            arquivos.append(arquivo)
+        
+        return arquivos
+    
+    def _iterar_registros(self, arquivos: List[Path], apenas_estruturadas: bool = False,
+                          data_inicio: Optional[str] = None,
+                          data_fim: Optional[str] = None) -> Iterator[Dict[str, str]]:
+        """
+        Lê os arquivos linha a linha e gera um registro por linha de log.
+        
+        Args:
+            arquivos: Arquivos de log a percorrer
+            apenas_estruturadas: Ignorar linhas que não seguem o formato do logger
+            data_inicio: Ignorar linhas anteriores (quando inclui hora)
+            data_fim: Ignorar linhas posteriores (quando inclui hora)
+            
+        Yields:
+            Dict com timestamp, logger, nivel, mensagem e a linha original
+        """
+        # Limites só com data já foram aplicados na escolha dos arquivos
+        inicio = data_inicio if data_inicio and len(data_inicio) > 10 else None
+        fim = data_fim if data_fim and len(data_fim) > 10 else None
+        
+        for arquivo in arquivos:
+            try:
+                with abrir_log(arquivo) as f:
+                    for linha in f:
+                        partes = linha.rstrip("\n").split(" - ", 3)
+                        if len(partes) < 4:
+                            if apenas_estruturadas:
+                                continue
+                            partes += [""] * (4 - len(partes))
+                        elif (inicio and partes[0] < inicio) or (fim and partes[0] > fim):
+                            continue
+                        yield {
+                            "timestamp": partes[0],
+                            "logger": partes[1],
+                            "nivel": partes[2],
+                            "mensagem": partes[3],
+                            "linha": linha
+                        }
+            except Exception as e:
+                self.log_sistema("WARNING", f"Erro ao ler arquivo {arquivo}: {e}")
+    
     def exportar_logs(self, tipo: str = "sistema", formato: str = "txt", 
-                     data_inicio: Optional[str] = None, data_fim: Optional[str] = None) -> str:
+                     data_inicio: Optional[str] = None, data_fim: Optional[str] = None,
+                     compressao: Optional[str] = None,
+                     callback_progresso: Optional[Callable[[int], None]] = None,
+                     cancelar: Optional[threading.Event] = None) -> str:
         """
-        Exporta logs para um arquivo.
+        Exporta logs para um arquivo, em streaming linha a linha.
         
         Args:
             tipo: Tipo de log a exportar
-            formato: Formato de exportação (txt, csv, json)
-            data_inicio: Data de início (YYYY-MM-DD)
-            data_fim: Data de fim (YYYY-MM-DD)
+            formato: Formato de exportação (txt, csv, json, ndjson)
+            data_inicio: Início (YYYY-MM-DD ou YYYY-MM-DD HH:MM:SS)
+            data_fim: Fim (YYYY-MM-DD ou YYYY-MM-DD HH:MM:SS)
+            compressao: Compressão opcional (gzip, zstd)
+            callback_progresso: Chamado com o número de linhas exportadas
+            cancelar: Evento para interromper a exportação
             
         Returns:
             Caminho do arquivo exportado
         """
         try:
+            if not compressao_disponivel(compressao):
+                raise ValueError(f"Compressão não disponível: {compressao}")
+            
             diretorio = self.settings.obter_diretorio_logs(tipo)
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             nome_arquivo = f"logs_{tipo}_{timestamp}.{formato}"
+            if compressao:
+                nome_arquivo += COMPRESSOES[compressao]
             caminho_exportacao = diretorio / nome_arquivo
             
-            # Coletar logs
-            logs = []
-            for arquivo in diretorio.glob(f"{tipo}_*.log"):
-                try:
-                    nome_arquivo = arquivo.stem
-                    data_str = nome_arquivo.split("_")[-1]
-                    
-                    # Filtrar por data se especificado
-                    if data_inicio and data_str < data_inicio:
-                        continue
-                    if data_fim and data_str > data_fim:
-                        continue
-                    
-                    with open(arquivo, 'r', encoding='utf-8') as f:
-                        logs.extend(f.readlines())
-                except Exception as e:
-                    self.log_sistema("WARNING", f"Erro ao ler arquivo {arquivo}: {e}")
+            # Listar os arquivos antes de criar o destino, que fica no mesmo diretório
+            arquivos = self._arquivos_no_periodo(tipo, data_inicio, data_fim)
+            
+            colunas = ["timestamp", "logger", "nivel", "mensagem"]
+            formatador = criar_formatador(
+                formato, colunas,
+                titulos=["Timestamp", "Logger", "Level", "Message"],
+                modelo=lambda registro: registro["linha"]
+            )
             
-            # Exportar no formato especificado
-            if formato == "txt":
-                with open(caminho_exportacao, 'w', encoding='utf-8') as f:
-                    f.writelines(logs)
-            elif formato == "csv":
-                import csv
-                with open(caminho_exportacao, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["Timestamp", "Logger", "Level", "Message"])
-                    for log in logs:
-                        # Parsear linha de log
-                        partes = log.strip().split(" - ")
-                        if len(partes) >= 4:
-                            writer.writerow(partes)
+            exportar_stream(
+                self._iterar_registros(arquivos, formato != "txt", data_inicio, data_fim),
+                formatador,
+                str(caminho_exportacao),
+                compressao=compressao,
+                callback_progresso=callback_progresso,
+                cancelar=cancelar
+            )
             
             self.log_sistema("SUCCESS", f"Logs exportados para: {caminho_exportacao}")
             return str(caminho_exportacao)
             
+        except ExportacaoCancelada as e:
+            self.log_sistema("WARNING", f"Exportação de logs cancelada: {e}")
+            return ""
         except Exception as e:
             self.log_sistema("ERROR", f"Erro ao exportar logs: {e}")
-            return "" 
\ No newline at end of file
+            return ""
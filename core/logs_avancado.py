@@ -5,17 +5,22 @@ Implementa logs estruturados, filtros, busca e exportação.
 """
 
 import os
+import copy
 import json
 import sqlite3
 import threading
 import time
+from array import array
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any, Union
+from typing import Dict, List, Optional, Tuple, Any, Union, Iterator, Callable
 from datetime import datetime, timedelta
 from enum import Enum
-import csv
-import zipfile
-import shutil
+
+from .armazenamento import obter_banco
+from .exportacao_logs import (
+    ExportacaoCancelada, FormatadorExportacao, FORMATADORES, COMPRESSOES,
+    criar_formatador, compressao_disponivel, exportar_stream, abrir_zip
+)
 
 
 class NivelLog(Enum):
@@ -38,11 +43,36 @@ class OrigemLog(Enum):
     TAREFAS = "tarefas"
 
 
+# Colunas exportadas (chaves de LogEstruturado.to_dict) e respetivos títulos
+COLUNAS_EXPORTACAO = ["id", "timestamp", "nivel", "origem", "mensagem", "usuario", "sessao", "ip", "detalhes"]
+TITULOS_EXPORTACAO = ['ID', 'Timestamp', 'Nível', 'Origem', 'Mensagem', 'Usuário', 'Sessão', 'IP', 'Detalhes']
+
+# Valores de baixa cardinalidade guardados em tabelas de dicionário (atributo -> tabela)
+DICIONARIOS = {
+    "nivel": "dic_niveis",
+    "origem": "dic_origens",
+    "usuario": "dic_usuarios",
+    "sessao": "dic_sessoes",
+}
+
+# Leitura de logs com os valores dos dicionários, na ordem esperada por _log_de_linha
+SELECT_LOGS = """
+    SELECT l.id, l.timestamp, n.valor, o.valor, l.mensagem, l.detalhes, u.valor, s.valor, l.ip
+    FROM logs_detalhados l
+    LEFT JOIN dic_niveis n ON n.id = l.nivel_id
+    LEFT JOIN dic_origens o ON o.id = l.origem_id
+    LEFT JOIN dic_usuarios u ON u.id = l.usuario_id
+    LEFT JOIN dic_sessoes s ON s.id = l.sessao_id
+"""
+
+
 class LogEstruturado:
     """
     Classe para representar um log estruturado.
     """
     
+    __slots__ = ("id", "timestamp", "nivel", "origem", "mensagem", "detalhes", "usuario", "sessao", "ip")
+    
     def __init__(self, id: int = None, timestamp: datetime = None, nivel: str = "INFO",
                  origem: str = "sistema", mensagem: str = "", detalhes: Dict = None,
                  usuario: str = "", sessao: str = "", ip: str = ""):
@@ -166,6 +196,153 @@ class FiltroLogs:
         self.limite = 1000
 
 
+class BufferLogsRecentes:
+    """
+    Buffer circular colunar com os logs mais recentes.
+    
+    Em vez de uma lista de objetos, cada campo fica num array paralelo:
+    instantes em microssegundos, nível e origem como índices de uma tabela de
+    valores internados e detalhes já serializados em bytes. Os LogEstruturado
+    só são criados quando uma vista os pede.
+    """
+    
+    _EPOCA = datetime(1970, 1, 1)
+    _MICRO = timedelta(microseconds=1)
+    
+    def __init__(self, capacidade: int = 1000):
+        """
+        Inicializa o buffer.
+        
+        Args:
+            capacidade: Número máximo de logs guardados
+        """
+        self.capacidade = capacidade
+        self.lock = threading.Lock()
+        
+        self.ids = array('q', [0]) * capacidade
+        self.instantes = array('q', [0]) * capacidade
+        self.niveis = array('i', [0]) * capacidade
+        self.origens = array('i', [0]) * capacidade
+        self.mensagens = [""] * capacidade
+        self.detalhes = [b""] * capacidade
+        self.usuarios = [""] * capacidade
+        self.sessoes = [""] * capacidade
+        self.ips = [""] * capacidade
+        
+        # Tabela de valores internados (níveis e origens)
+        self.valores = []
+        self.indices = {}
+        
+        self.proxima = 0
+        self.tamanho = 0
+    
+    def _internar(self, valor: str) -> int:
+        indice = self.indices.get(valor)
+        if indice is None:
+            indice = self.indices[valor] = len(self.valores)
+            self.valores.append(valor)
+        return indice
+    
+    def adicionar(self, log: LogEstruturado):
+        """
+        Acrescenta um log, descartando o mais antigo quando cheio.
+        
+        Args:
+            log: Log a guardar
+        """
+        detalhes = json.dumps(log.detalhes, ensure_ascii=False).encode('utf-8') if log.detalhes else b""
+        
+        with self.lock:
+            posicao = self.proxima
+            self.ids[posicao] = log.id or 0
+            self.instantes[posicao] = (log.timestamp - self._EPOCA) // self._MICRO
+            self.niveis[posicao] = self._internar(log.nivel)
+            self.origens[posicao] = self._internar(log.origem)
+            self.mensagens[posicao] = log.mensagem
+            self.detalhes[posicao] = detalhes
+            self.usuarios[posicao] = log.usuario
+            self.sessoes[posicao] = log.sessao
+            self.ips[posicao] = log.ip
+            
+            self.proxima = (posicao + 1) % self.capacidade
+            self.tamanho = min(self.tamanho + 1, self.capacidade)
+    
+    def _criar_log(self, posicao: int) -> LogEstruturado:
+        detalhes = self.detalhes[posicao]
+        return LogEstruturado(
+            id=self.ids[posicao] or None,
+            timestamp=self._EPOCA + self.instantes[posicao] * self._MICRO,
+            nivel=self.valores[self.niveis[posicao]],
+            origem=self.valores[self.origens[posicao]],
+            mensagem=self.mensagens[posicao],
+            detalhes=json.loads(detalhes) if detalhes else {},
+            usuario=self.usuarios[posicao],
+            sessao=self.sessoes[posicao],
+            ip=self.ips[posicao]
+        )
+    
+    def ultimos(self, quantidade: int, filtro: 'FiltroLogs' = None) -> List[LogEstruturado]:
+        """
+        Obtém os logs mais recentes que satisfazem um filtro.
+        
+        Args:
+            quantidade: Número máximo de logs
+            filtro: Filtro de logs (opcional)
+            
+        Returns:
+            Logs do mais recente para o mais antigo
+        """
+        resultado = []
+        
+        with self.lock:
+            niveis = origens = None
+            inicio = fim = None
+            usuario = sessao = texto = ""
+            
+            if filtro:
+                if filtro.niveis:
+                    niveis = {self.indices[n] for n in filtro.niveis if n in self.indices}
+                if filtro.origens:
+                    origens = {self.indices[o] for o in filtro.origens if o in self.indices}
+                if filtro.data_inicio:
+                    inicio = (filtro.data_inicio - self._EPOCA) // self._MICRO
+                if filtro.data_fim:
+                    fim = (filtro.data_fim - self._EPOCA) // self._MICRO
+                usuario = filtro.usuario.lower()
+                sessao = filtro.sessao
+                texto = filtro.texto_busca.lower()
+            
+            for passo in range(1, self.tamanho + 1):
+                if len(resultado) >= quantidade:
+                    break
+                
+                posicao = (self.proxima - passo) % self.capacidade
+                
+                if niveis is not None and self.niveis[posicao] not in niveis:
+                    continue
+                if origens is not None and self.origens[posicao] not in origens:
+                    continue
+                if inicio is not None and self.instantes[posicao] < inicio:
+                    continue
+                if fim is not None and self.instantes[posicao] > fim:
+                    continue
+                if usuario and usuario not in self.usuarios[posicao].lower():
+                    continue
+                if sessao and self.sessoes[posicao] != sessao:
+                    continue
+                if texto and texto not in self.mensagens[posicao].lower() \
+                        and texto not in self.detalhes[posicao].decode('utf-8').lower():
+                    continue
+                
+                resultado.append(self._criar_log(posicao))
+        
+        return resultado
+    
+    def cheio(self) -> bool:
+        """Indica se o buffer já descartou logs antigos."""
+        return self.tamanho == self.capacidade
+
+
 class LogsAvancadoManager:
     """
     Gerenciador avançado de logs com banco de dados estruturado.
@@ -181,11 +358,17 @@ class LogsAvancadoManager:
         self.settings = settings
         self.db_file = Path(settings.obter("database", "arquivo")).parent / "logs_avancado.db"
         self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.banco = obter_banco(self.db_file)
+        
+        # Logs mais recentes em memória, para vistas sem consulta à base
+        self.buffer_recentes = BufferLogsRecentes(1000)
         
-        # Cache de logs em memória para performance
-        self.cache_logs = []
-        self.cache_lock = threading.Lock()
-        self.max_cache_size = 1000
+        # Dicionários em memória (atributo -> {valor: id}); as tabelas só crescem
+        self.dicionarios = {coluna: {} for coluna in DICIONARIOS}
+        self.dicionarios_lock = threading.Lock()
+        
+        # Conversão para auto_vacuum=INCREMENTAL em falta (feita pela thread de limpeza)
+        self.conversao_auto_vacuum_pendente = False
         
         # Thread de limpeza automática
         self.thread_limpeza = None
@@ -197,28 +380,32 @@ class LogsAvancadoManager:
     def _inicializar_banco(self):
         """Inicializa o banco de dados de logs."""
         try:
-            with sqlite3.connect(self.db_file) as conn:
+            self.conversao_auto_vacuum_pendente = not self._configurar_auto_vacuum(self.banco.conexao())
+            
+            with self.banco.transacao() as conn:
                 cursor = conn.cursor()
                 
-                # Tabela de logs estruturados
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS logs_detalhados (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        nivel TEXT NOT NULL,
-                        origem TEXT NOT NULL,
-                        mensagem TEXT NOT NULL,
-                        detalhes TEXT,
-                        usuario TEXT,
-                        sessao TEXT,
-                        ip TEXT,
-                        INDEX idx_timestamp (timestamp),
-                        INDEX idx_nivel (nivel),
-                        INDEX idx_origem (origem),
-                        INDEX idx_usuario (usuario),
-                        INDEX idx_sessao (sessao)
+                # Tabelas de dicionário
+                for tabela in DICIONARIOS.values():
+                    cursor.execute(f"""
+                        CREATE TABLE IF NOT EXISTS {tabela} (
+                            id INTEGER PRIMARY KEY,
+                            valor TEXT NOT NULL UNIQUE
+                        )
+                    """)
+                
+                # Tabela de logs estruturados (bases antigas guardavam os valores como texto)
+                colunas = [row[1] for row in cursor.execute("PRAGMA table_info(logs_detalhados)")]
+                if "nivel" in colunas:
+                    self._migrar_para_dicionarios(conn)
+                else:
+                    self._criar_tabela_logs(conn)
+                
+                # Índices (SQLite não aceita INDEX dentro de CREATE TABLE)
+                for coluna in ("timestamp", "nivel_id", "origem_id", "usuario_id", "sessao_id"):
+                    cursor.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{coluna} ON logs_detalhados ({coluna})"
                     )
-                """)
                 
                 # Tabela de estatísticas
                 cursor.execute("""
@@ -232,18 +419,208 @@ class LogsAvancadoManager:
                     )
                 """)
                 
-                conn.commit()
+                self._atualizar_dicionarios(conn)
                 
         except Exception as e:
             print(f"Erro ao inicializar banco de logs: {e}")
     
+    def _criar_tabela_logs(self, conn: sqlite3.Connection):
+        """Cria a tabela de logs com chaves para os dicionários."""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS logs_detalhados (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                nivel_id INTEGER NOT NULL REFERENCES dic_niveis (id),
+                origem_id INTEGER NOT NULL REFERENCES dic_origens (id),
+                mensagem TEXT NOT NULL,
+                detalhes TEXT,
+                usuario_id INTEGER REFERENCES dic_usuarios (id),
+                sessao_id INTEGER REFERENCES dic_sessoes (id),
+                ip TEXT
+            )
+        """)
+    
+    def _migrar_para_dicionarios(self, conn: sqlite3.Connection):
+        """
+        Converte uma tabela de logs com nível/origem/usuário/sessão em texto
+        para o formato com dicionários, preservando os ids.
+        """
+        print("Migrando base de logs para tabelas de dicionário...")
+        
+        for coluna, tabela in DICIONARIOS.items():
+            conn.execute(f"""
+                INSERT OR IGNORE INTO {tabela} (valor)
+                SELECT DISTINCT {coluna} FROM logs_detalhados WHERE {coluna} IS NOT NULL
+            """)
+        
+        # Os índices antigos acompanham a tabela renomeada e desaparecem com ela
+        conn.execute("ALTER TABLE logs_detalhados RENAME TO logs_detalhados_texto")
+        self._criar_tabela_logs(conn)
+        conn.execute("""
+            INSERT INTO logs_detalhados (id, timestamp, nivel_id, origem_id, mensagem, detalhes, usuario_id, sessao_id, ip)
+            SELECT t.id, t.timestamp, n.id, o.id, t.mensagem, t.detalhes,
+                   CASE WHEN t.usuario = '' THEN NULL ELSE u.id END,
+                   CASE WHEN t.sessao = '' THEN NULL ELSE s.id END,
+                   t.ip
+            FROM logs_detalhados_texto t
+            JOIN dic_niveis n ON n.valor = t.nivel
+            JOIN dic_origens o ON o.valor = t.origem
+            LEFT JOIN dic_usuarios u ON u.valor = t.usuario
+            LEFT JOIN dic_sessoes s ON s.valor = t.sessao
+        """)
+        conn.execute("DROP TABLE logs_detalhados_texto")
+        conn.execute("DELETE FROM dic_usuarios WHERE valor = ''")
+        conn.execute("DELETE FROM dic_sessoes WHERE valor = ''")
+    
+    def _atualizar_dicionarios(self, conn: sqlite3.Connection, colunas: List[str] = None):
+        """
+        Acrescenta à cache as entradas de dicionário criadas desde a última leitura
+        (por esta ou por outra instância). Só lê ids acima do maior conhecido.
+        
+        Args:
+            conn: Conexão à base de logs
+            colunas: Atributos a atualizar (padrão: todos)
+        """
+        for coluna in colunas or DICIONARIOS:
+            with self.dicionarios_lock:
+                maior_id = max(self.dicionarios[coluna].values(), default=0)
+            
+            novos = conn.execute(
+                f"SELECT id, valor FROM {DICIONARIOS[coluna]} WHERE id > ?", (maior_id,)
+            ).fetchall()
+            
+            if novos:
+                with self.dicionarios_lock:
+                    self.dicionarios[coluna].update((valor, id_valor) for id_valor, valor in novos)
+    
+    def _id_dicionario(self, conn: sqlite3.Connection, coluna: str, valor: str,
+                       novos: Dict[Tuple[str, str], int]) -> Optional[int]:
+        """
+        Obtém (ou cria) o id de um valor num dicionário.
+        
+        Args:
+            conn: Conexão (dentro da transação de inserção)
+            coluna: Atributo (nivel, origem, usuario, sessao)
+            valor: Valor a codificar
+            novos: Entradas criadas nesta transação; só entram na cache após o commit
+            
+        Returns:
+            Id do valor, ou None para usuário/sessão vazios
+        """
+        if not valor:
+            if coluna in ("usuario", "sessao"):
+                return None
+            valor = ""
+        
+        id_valor = self.dicionarios[coluna].get(valor) or novos.get((coluna, valor))
+        if id_valor is None:
+            tabela = DICIONARIOS[coluna]
+            conn.execute(f"INSERT OR IGNORE INTO {tabela} (valor) VALUES (?)", (valor,))
+            id_valor = conn.execute(f"SELECT id FROM {tabela} WHERE valor = ?", (valor,)).fetchone()[0]
+            novos[(coluna, valor)] = id_valor
+        return id_valor
+    
+    def _inserir_logs(self, logs: List[LogEstruturado]) -> Optional[int]:
+        """
+        Insere logs numa transação, codificando os valores nos dicionários.
+        
+        Args:
+            logs: Logs a inserir
+            
+        Returns:
+            Id do último log inserido
+        """
+        novos = {}
+        with self.banco.transacao() as conn:
+            linhas = [(
+                log.timestamp,
+                self._id_dicionario(conn, "nivel", log.nivel, novos),
+                self._id_dicionario(conn, "origem", log.origem, novos),
+                log.mensagem,
+                json.dumps(log.detalhes, ensure_ascii=False),
+                self._id_dicionario(conn, "usuario", log.usuario, novos),
+                self._id_dicionario(conn, "sessao", log.sessao, novos),
+                log.ip
+            ) for log in logs]
+            
+            conn.executemany("""
+                INSERT INTO logs_detalhados (timestamp, nivel_id, origem_id, mensagem, detalhes, usuario_id, sessao_id, ip)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, linhas)
+            ultimo_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        
+        with self.dicionarios_lock:
+            for (coluna, valor), id_valor in novos.items():
+                self.dicionarios[coluna][valor] = id_valor
+        
+        return ultimo_id
+    
+    def _configurar_auto_vacuum(self, conn: sqlite3.Connection) -> bool:
+        """
+        Ativa auto_vacuum=INCREMENTAL para o espaço libertado pela retenção
+        poder ser devolvido ao sistema aos poucos (ver _vacuum_incremental).
+        
+        Em WAL o modo só muda com um VACUUM. Numa base ainda sem tabelas é
+        imediato; numa base com dados fica para converter_auto_vacuum.
+        
+        Returns:
+            True se o modo já está ativo
+        """
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return True
+        
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2 and \
+                conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone() is None:
+            conn.execute("VACUUM")
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    
+    def converter_auto_vacuum(self) -> bool:
+        """
+        Converte uma base existente para auto_vacuum=INCREMENTAL com um VACUUM completo.
+        
+        O VACUUM reescreve a base inteira com o lock exclusivo, por isso só é
+        feito uma vez, pela thread de limpeza (ou como ação de manutenção), e
+        nunca no arranque.
+        
+        Returns:
+            True se a base ficou em modo incremental
+        """
+        try:
+            conn = self.banco.conexao()
+            if self._configurar_auto_vacuum(conn):
+                self.conversao_auto_vacuum_pendente = False
+                return True
+            
+            inicio = time.monotonic()
+            conn.execute("VACUUM")
+            duracao = time.monotonic() - inicio
+            convertida = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+            self.conversao_auto_vacuum_pendente = not convertida
+            
+            mensagem = (f"Base de logs convertida para auto_vacuum incremental em {duracao:.1f}s"
+                        if convertida else "VACUUM concluído mas a base de logs não ficou em auto_vacuum incremental")
+            print(mensagem)
+            self.registrar_log("INFO" if convertida else "WARNING", mensagem, "logs",
+                               {"duracao": round(duracao, 3), "arquivo": str(self.db_file)})
+            return convertida
+            
+        except Exception as e:
+            print(f"Erro ao converter base de logs para auto_vacuum incremental: {e}")
+            return False
+    
     def _iniciar_limpeza_automatica(self):
         """Inicia thread de limpeza automática."""
         def limpeza_automatica():
             while True:
                 try:
                     time.sleep(3600)  # Verificar a cada hora
-                    self.limpar_logs_antigos()
+                    if self.conversao_auto_vacuum_pendente:
+                        self.converter_auto_vacuum()
+                    self.limpar_logs_antigos(
+                        self.settings.obter("logs", "retencao_dias", 30),
+                        arquivar=self.settings.obter("logs", "arquivar_antes_limpar", False)
+                    )
                     self._atualizar_estatisticas()
                 except Exception as e:
                     print(f"Erro na limpeza automática: {e}")
@@ -276,16 +653,9 @@ class LogsAvancadoManager:
                 ip=ip
             )
             
-            # Adicionar ao cache
-            with self.cache_lock:
-                self.cache_logs.append(log)
-                
-                # Limpar cache se necessário
-                if len(self.cache_logs) > self.max_cache_size:
-                    self._persistir_cache()
-            
-            # Persistir no banco em thread separada
-            threading.Thread(target=self._persistir_log, args=(log,), daemon=True).start()
+            # Chamado pela thread de escrita do LogManager: persistir diretamente
+            self._persistir_log(log)
+            self.buffer_recentes.adicionar(log)
             
         except Exception as e:
             print(f"Erro ao registrar log: {e}")
@@ -293,61 +663,119 @@ class LogsAvancadoManager:
     def _persistir_log(self, log: LogEstruturado):
         """Persiste um log no banco de dados."""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    INSERT INTO logs_detalhados (timestamp, nivel, origem, mensagem, detalhes, usuario, sessao, ip)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    log.timestamp,
-                    log.nivel,
-                    log.origem,
-                    log.mensagem,
-                    json.dumps(log.detalhes, ensure_ascii=False),
-                    log.usuario,
-                    log.sessao,
-                    log.ip
-                ))
-                
-                log.id = cursor.lastrowid
-                conn.commit()
-                
+            log.id = self._inserir_logs([log])
         except Exception as e:
             print(f"Erro ao persistir log: {e}")
     
-    def _persistir_cache(self):
-        """Persiste logs do cache no banco."""
+    def registrar_lote(self, logs: List[LogEstruturado]) -> bool:
+        """
+        Persiste um lote de logs numa única transação.
+        
+        Args:
+            logs: Logs a gravar
+            
+        Returns:
+            True se o lote foi gravado
+        """
+        if not logs:
+            return True
+        
         try:
-            with self.cache_lock:
-                if not self.cache_logs:
-                    return
-                
-                logs_para_persistir = self.cache_logs.copy()
-                self.cache_logs.clear()
+            ultimo_id = self._inserir_logs(logs)
             
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                
-                for log in logs_para_persistir:
-                    cursor.execute("""
-                        INSERT INTO logs_detalhados (timestamp, nivel, origem, mensagem, detalhes, usuario, sessao, ip)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        log.timestamp,
-                        log.nivel,
-                        log.origem,
-                        log.mensagem,
-                        json.dumps(log.detalhes, ensure_ascii=False),
-                        log.usuario,
-                        log.sessao,
-                        log.ip
-                    ))
-                
-                conn.commit()
+            # Ids atribuídos em sequência dentro da transação
+            for deslocamento, log in enumerate(reversed(logs)):
+                log.id = ultimo_id - deslocamento
+            for log in logs:
+                self.buffer_recentes.adicionar(log)
+            return True
                 
         except Exception as e:
-            print(f"Erro ao persistir cache: {e}")
+            print(f"Erro ao persistir lote de logs: {e}")
+            return False
+    
+    def _construir_condicoes(self, filtro: FiltroLogs = None) -> Tuple[str, List[Any]]:
+        """
+        Constrói a cláusula WHERE correspondente a um filtro.
+        
+        Args:
+            filtro: Filtro de logs
+            
+        Returns:
+            (condicoes_sql, parametros)
+        """
+        condicoes = "WHERE 1=1"
+        params = []
+        
+        if filtro:
+            # Filtros de nível e origem (pelos ids dos dicionários)
+            for coluna, valores in (("nivel", filtro.niveis), ("origem", filtro.origens)):
+                if valores:
+                    ids = self._ids_dicionario(coluna, valores)
+                    if ids:
+                        placeholders = ",".join(["?"] * len(ids))
+                        condicoes += f" AND l.{coluna}_id IN ({placeholders})"
+                        params.extend(ids)
+                    else:
+                        condicoes += " AND 0"
+            
+            # Filtro de período
+            if filtro.data_inicio:
+                condicoes += " AND l.timestamp >= ?"
+                params.append(filtro.data_inicio.isoformat())
+            
+            if filtro.data_fim:
+                condicoes += " AND l.timestamp <= ?"
+                params.append(filtro.data_fim.isoformat())
+            
+            # Filtro de usuário
+            if filtro.usuario:
+                condicoes += " AND l.usuario_id IN (SELECT id FROM dic_usuarios WHERE valor LIKE ?)"
+                params.append(f"%{filtro.usuario}%")
+            
+            # Filtro de sessão
+            if filtro.sessao:
+                ids = self._ids_dicionario("sessao", [filtro.sessao])
+                condicoes += " AND l.sessao_id = ?" if ids else " AND 0"
+                params.extend(ids)
+            
+            # Filtro de texto
+            if filtro.texto_busca:
+                condicoes += " AND (l.mensagem LIKE ? OR l.detalhes LIKE ?)"
+                params.extend([f"%{filtro.texto_busca}%", f"%{filtro.texto_busca}%"])
+        
+        return condicoes, params
+    
+    def _ids_dicionario(self, coluna: str, valores: List[str]) -> List[int]:
+        """
+        Converte valores de filtro nos ids do dicionário.
+        
+        Valores desconhecidos levam a uma releitura das entradas novas, pois
+        podem ter sido criados por outra instância.
+        """
+        if any(valor not in self.dicionarios[coluna] for valor in valores):
+            try:
+                with self.banco.conexao() as conn:
+                    self._atualizar_dicionarios(conn, [coluna])
+            except Exception as e:
+                print(f"Erro ao ler dicionário de {coluna}: {e}")
+        
+        with self.dicionarios_lock:
+            return [self.dicionarios[coluna][valor] for valor in valores if valor in self.dicionarios[coluna]]
+    
+    def _log_de_linha(self, row) -> LogEstruturado:
+        """Cria um LogEstruturado a partir de uma linha de SELECT_LOGS."""
+        return LogEstruturado(
+            id=row[0],
+            timestamp=datetime.fromisoformat(row[1]),
+            nivel=row[2],
+            origem=row[3],
+            mensagem=row[4],
+            detalhes=json.loads(row[5]) if row[5] else {},
+            usuario=row[6] or "",
+            sessao=row[7] or "",
+            ip=row[8] or ""
+        )
     
     def buscar_logs(self, filtro: FiltroLogs = None) -> List[LogEstruturado]:
         """
@@ -360,81 +788,97 @@ class LogsAvancadoManager:
             Lista de logs encontrados
         """
         try:
-            # Persistir cache antes da busca
-            self._persistir_cache()
-            
-            with sqlite3.connect(self.db_file) as conn:
+            with self.banco.conexao() as conn:
                 cursor = conn.cursor()
                 
                 # Construir query
-                query = "SELECT * FROM logs_detalhados WHERE 1=1"
-                params = []
-                
-                if filtro:
-                    # Filtros de nível
-                    if filtro.niveis:
-                        placeholders = ",".join(["?"] * len(filtro.niveis))
-                        query += f" AND nivel IN ({placeholders})"
-                        params.extend(filtro.niveis)
-                    
-                    # Filtros de origem
-                    if filtro.origens:
-                        placeholders = ",".join(["?"] * len(filtro.origens))
-                        query += f" AND origem IN ({placeholders})"
-                        params.extend(filtro.origens)
-                    
-                    # Filtro de período
-                    if filtro.data_inicio:
-                        query += " AND timestamp >= ?"
-                        params.append(filtro.data_inicio.isoformat())
-                    
-                    if filtro.data_fim:
-                        query += " AND timestamp <= ?"
-                        params.append(filtro.data_fim.isoformat())
-                    
-                    # Filtro de usuário
-                    if filtro.usuario:
-                        query += " AND usuario LIKE ?"
-                        params.append(f"%{filtro.usuario}%")
-                    
-                    # Filtro de sessão
-                    if filtro.sessao:
-                        query += " AND sessao = ?"
-                        params.append(filtro.sessao)
-                    
-                    # Filtro de texto
-                    if filtro.texto_busca:
-                        query += " AND (mensagem LIKE ? OR detalhes LIKE ?)"
-                        params.extend([f"%{filtro.texto_busca}%", f"%{filtro.texto_busca}%"])
+                condicoes, params = self._construir_condicoes(filtro)
+                query = f"{SELECT_LOGS} {condicoes}"
                 
                 # Ordenar e limitar
-                query += " ORDER BY timestamp DESC"
+                query += " ORDER BY l.timestamp DESC"
                 if filtro and filtro.limite:
                     query += f" LIMIT {filtro.limite}"
                 
                 cursor.execute(query, params)
                 
-                logs = []
-                for row in cursor.fetchall():
-                    log = LogEstruturado(
-                        id=row[0],
-                        timestamp=datetime.fromisoformat(row[1]),
-                        nivel=row[2],
-                        origem=row[3],
-                        mensagem=row[4],
-                        detalhes=json.loads(row[5]) if row[5] else {},
-                        usuario=row[6] or "",
-                        sessao=row[7] or "",
-                        ip=row[8] or ""
-                    )
-                    logs.append(log)
-                
-                return logs
+                return [self._log_de_linha(row) for row in cursor.fetchall()]
                 
         except Exception as e:
             print(f"Erro ao buscar logs: {e}")
             return []
     
+    def obter_logs_recentes(self, limite: int = 100, filtro: FiltroLogs = None) -> List[LogEstruturado]:
+        """
+        Obtém os logs mais recentes, servidos da memória sempre que possível.
+        
+        O buffer guarda os últimos logs registados por esta instância; só se
+        consulta a base quando o buffer não tem logs suficientes para o filtro.
+        
+        Args:
+            limite: Número máximo de logs
+            filtro: Filtro de logs (o limite do filtro é ignorado)
+            
+        Returns:
+            Logs do mais recente para o mais antigo
+        """
+        logs = self.buffer_recentes.ultimos(limite, filtro)
+        if len(logs) >= limite:
+            logs.sort(key=lambda log: (log.timestamp, log.id or 0), reverse=True)
+            return logs
+        
+        filtro_base = copy.copy(filtro) if filtro else FiltroLogs()
+        filtro_base.definir_limite(limite)
+        return self.buscar_logs(filtro_base)
+    
+    def iterar_logs(self, filtro: FiltroLogs = None, tamanho_pagina: int = 500) -> Iterator[LogEstruturado]:
+        """
+        Percorre os logs filtrados página a página (paginação por chave).
+        
+        Só uma página fica em memória de cada vez, por isso serve para
+        exportações de qualquer tamanho. Respeita filtro.limite quando definido.
+        
+        Args:
+            filtro: Filtro de logs
+            tamanho_pagina: Número de linhas lidas por consulta
+            
+        Yields:
+            Logs do mais recente para o mais antigo
+        """
+        condicoes, params_base = self._construir_condicoes(filtro)
+        limite = filtro.limite if filtro and filtro.limite else None
+        entregues = 0
+        cursor_chave = None  # (timestamp, id) da última linha entregue
+        
+        with self.banco.conexao() as conn:
+            while True:
+                query = f"{SELECT_LOGS} {condicoes}"
+                params = list(params_base)
+                
+                if cursor_chave:
+                    query += " AND (l.timestamp < ? OR (l.timestamp = ? AND l.id < ?))"
+                    params.extend([cursor_chave[0], cursor_chave[0], cursor_chave[1]])
+                
+                pagina = tamanho_pagina
+                if limite is not None:
+                    pagina = min(pagina, limite - entregues)
+                
+                query += " ORDER BY l.timestamp DESC, l.id DESC LIMIT ?"
+                params.append(pagina)
+                
+                linhas = conn.execute(query, params).fetchall()
+                if not linhas:
+                    return
+                
+                for row in linhas:
+                    yield self._log_de_linha(row)
+                
+                entregues += len(linhas)
+                cursor_chave = (linhas[-1][1], linhas[-1][0])
+                
+                if len(linhas) < pagina or (limite is not None and entregues >= limite):
+                    return
+    
     def obter_estatisticas(self, data_inicio: datetime = None, data_fim: datetime = None) -> Dict[str, Any]:
         """
         Obtém estatísticas dos logs.
@@ -447,24 +891,28 @@ class LogsAvancadoManager:
             Dicionário com estatísticas
         """
         try:
-            self._persistir_cache()
-            
-            with sqlite3.connect(self.db_file) as conn:
+            with self.banco.conexao() as conn:
                 cursor = conn.cursor()
                 
                 # Construir query
-                query = "SELECT nivel, origem, COUNT(*) FROM logs_detalhados WHERE 1=1"
+                query = """
+                    SELECT n.valor, o.valor, COUNT(*)
+                    FROM logs_detalhados l
+                    JOIN dic_niveis n ON n.id = l.nivel_id
+                    JOIN dic_origens o ON o.id = l.origem_id
+                    WHERE 1=1
+                """
                 params = []
                 
                 if data_inicio:
-                    query += " AND timestamp >= ?"
+                    query += " AND l.timestamp >= ?"
                     params.append(data_inicio.isoformat())
                 
                 if data_fim:
-                    query += " AND timestamp <= ?"
+                    query += " AND l.timestamp <= ?"
                     params.append(data_fim.isoformat())
                 
-                query += " GROUP BY nivel, origem"
+                query += " GROUP BY l.nivel_id, l.origem_id"
                 
                 cursor.execute(query, params)
                 
@@ -501,41 +949,125 @@ class LogsAvancadoManager:
             print(f"Erro ao obter estatísticas: {e}")
             return {}
     
-    def limpar_logs_antigos(self, dias: int = 30):
+    def limpar_logs_antigos(self, dias: int = 30, arquivar: bool = False,
+                            tamanho_lote: int = 2000, pausa: float = 0.05) -> int:
         """
-        Remove logs antigos.
+        Remove logs antigos em lotes curtos por intervalo de id.
+        
+        Cada lote é uma transação própria e entre lotes há uma pausa, por isso as
+        escritas concorrentes nunca esperam mais do que um lote. No fim, o espaço
+        libertado é devolvido com incremental_vacuum, também em passos.
         
         Args:
             dias: Número de dias para manter
+            arquivar: Gravar os logs removidos em NDJSON comprimido antes de apagar
+            tamanho_lote: Intervalo de ids apagado por transação
+            pausa: Segundos entre lotes
+            
+        Returns:
+            Número de logs removidos
         """
+        removidos = 0
+        
         try:
             data_limite = datetime.now() - timedelta(days=dias)
             
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
+            with self.banco.conexao() as conn:
+                # Intervalo de ids a percorrer (usa idx_timestamp)
+                id_minimo, id_maximo = conn.execute(
+                    "SELECT MIN(id), MAX(id) FROM logs_detalhados WHERE timestamp < ?", (data_limite,)
+                ).fetchone()
+                
+                if id_minimo is None:
+                    return 0
                 
-                cursor.execute("DELETE FROM logs_detalhados WHERE timestamp < ?", (data_limite.isoformat(),))
+                if arquivar and not self._arquivar_logs(conn, data_limite, id_minimo, id_maximo, tamanho_lote):
+                    return 0
                 
-                conn.commit()
+                for inicio in range(id_minimo, id_maximo + 1, tamanho_lote):
+                    cursor = conn.execute(
+                        "DELETE FROM logs_detalhados WHERE id >= ? AND id < ? AND timestamp < ?",
+                        (inicio, min(inicio + tamanho_lote, id_maximo + 1), data_limite)
+                    )
+                    removidos += cursor.rowcount
+                    time.sleep(pausa)
+                
+                self._vacuum_incremental(conn, pausa=pausa)
+            
+            return removidos
                 
         except Exception as e:
             print(f"Erro ao limpar logs antigos: {e}")
+            return removidos
+    
+    def _arquivar_logs(self, conn: sqlite3.Connection, data_limite: datetime,
+                       id_minimo: int, id_maximo: int, tamanho_lote: int) -> bool:
+        """
+        Grava os logs a remover num arquivo NDJSON comprimido.
+        
+        O arquivo é escrito e fechado por completo antes de qualquer remoção.
+        
+        Returns:
+            True se o arquivo foi gravado
+        """
+        def registros():
+            for inicio in range(id_minimo, id_maximo + 1, tamanho_lote):
+                linhas = conn.execute(
+                    f"{SELECT_LOGS} WHERE l.id >= ? AND l.id < ? AND l.timestamp < ? ORDER BY l.id",
+                    (inicio, min(inicio + tamanho_lote, id_maximo + 1), data_limite)
+                ).fetchall()
+                for row in linhas:
+                    yield self._log_de_linha(row).to_dict()
+        
+        try:
+            diretorio = self.db_file.parent / "arquivo_logs"
+            diretorio.mkdir(parents=True, exist_ok=True)
+            compressao = "zstd" if compressao_disponivel("zstd") else "gzip"
+            caminho = diretorio / (
+                f"logs_ate_{data_limite.strftime('%Y%m%d_%H%M%S')}.ndjson{COMPRESSOES[compressao]}"
+            )
+            
+            exportar_stream(registros(), criar_formatador("ndjson", COLUNAS_EXPORTACAO), str(caminho), compressao)
+            return True
+            
+        except Exception as e:
+            print(f"Erro ao arquivar logs antigos: {e}")
+            return False
+    
+    def _vacuum_incremental(self, conn: sqlite3.Connection, paginas: int = 500, pausa: float = 0.05):
+        """
+        Devolve as páginas livres ao sistema em passos de `paginas`.
+        
+        Args:
+            conn: Conexão à base de logs
+            paginas: Páginas libertadas por passo
+            pausa: Segundos entre passos
+        """
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return
+        
+        while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            conn.execute(f"PRAGMA incremental_vacuum({int(paginas)})").fetchall()
+            time.sleep(pausa)
     
     def _atualizar_estatisticas(self):
         """Atualiza estatísticas diárias."""
         try:
             hoje = datetime.now().date()
             
-            with sqlite3.connect(self.db_file) as conn:
+            with self.banco.transacao() as conn:
                 cursor = conn.cursor()
                 
                 # Obter estatísticas do dia
                 cursor.execute("""
-                    SELECT nivel, origem, COUNT(*) 
-                    FROM logs_detalhados 
-                    WHERE DATE(timestamp) = ?
-                    GROUP BY nivel, origem
-                """, (hoje.isoformat(),))
+                    SELECT n.valor, o.valor, COUNT(*)
+                    FROM logs_detalhados l
+                    JOIN dic_niveis n ON n.id = l.nivel_id
+                    JOIN dic_origens o ON o.id = l.origem_id
+                    WHERE l.timestamp >= ? AND l.timestamp < ?
+                    GROUP BY l.nivel_id, l.origem_id
+                """, (datetime.combine(hoje, datetime.min.time()),
+                      datetime.combine(hoje + timedelta(days=1), datetime.min.time())))
                 
                 for row in cursor.fetchall():
                     nivel, origem, quantidade = row
@@ -545,132 +1077,123 @@ class LogsAvancadoManager:
                         VALUES (?, ?, ?, ?)
                     """, (hoje.isoformat(), nivel, origem, quantidade))
                 
-                conn.commit()
-                
         except Exception as e:
             print(f"Erro ao atualizar estatísticas: {e}")
     
     def exportar_logs(self, formato: str = "csv", filtro: FiltroLogs = None, 
-                     caminho_destino: str = None) -> str:
+                     caminho_destino: str = None, compressao: str = None,
+                     callback_progresso: Callable[[int], None] = None,
+                     cancelar: threading.Event = None) -> str:
         """
-        Exporta logs para arquivo.
+        Exporta logs para arquivo em streaming, página a página.
         
         Args:
-            formato: Formato de exportação (csv, json, txt)
+            formato: Formato de exportação (csv, json, ndjson, txt, zip)
             filtro: Filtro de logs
             caminho_destino: Caminho do arquivo de destino
+            compressao: Compressão opcional do arquivo (gzip, zstd)
+            callback_progresso: Chamado com o número de logs exportados
+            cancelar: Evento para interromper a exportação
             
         Returns:
             Caminho do arquivo exportado
         """
         try:
-            logs = self.buscar_logs(filtro)
+            formato = formato.lower()
+            if formato != "zip" and formato not in FORMATADORES:
+                raise ValueError(f"Formato não suportado: {formato}")
+            if not compressao_disponivel(compressao):
+                raise ValueError(f"Compressão não disponível: {compressao}")
             
             if not caminho_destino:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 caminho_destino = f"logs_export_{timestamp}.{formato}"
+                if compressao and formato != "zip":
+                    caminho_destino += COMPRESSOES[compressao]
             
-            if formato.lower() == "csv":
-                self._exportar_csv(logs, caminho_destino)
-            elif formato.lower() == "json":
-                self._exportar_json(logs, caminho_destino)
-            elif formato.lower() == "txt":
-                self._exportar_txt(logs, caminho_destino)
-            elif formato.lower() == "zip":
-                self._exportar_zip(logs, caminho_destino)
+            if formato == "zip":
+                self._exportar_zip(filtro, caminho_destino, callback_progresso, cancelar)
             else:
-                raise ValueError(f"Formato não suportado: {formato}")
+                exportar_stream(
+                    self._registros_exportacao(filtro),
+                    self._criar_formatador(formato),
+                    caminho_destino,
+                    compressao=compressao,
+                    callback_progresso=callback_progresso,
+                    cancelar=cancelar
+                )
             
             return caminho_destino
             
+        except ExportacaoCancelada as e:
+            print(f"Exportação de logs cancelada: {e}")
+            return ""
         except Exception as e:
             print(f"Erro ao exportar logs: {e}")
             return ""
     
-    def _exportar_csv(self, logs: List[LogEstruturado], caminho: str):
-        """Exporta logs para CSV."""
-        with open(caminho, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['ID', 'Timestamp', 'Nível', 'Origem', 'Mensagem', 'Usuário', 'Sessão', 'IP', 'Detalhes'])
-            
-            for log in logs:
-                writer.writerow([
-                    log.id,
-                    log.timestamp.isoformat(),
-                    log.nivel,
-                    log.origem,
-                    log.mensagem,
-                    log.usuario,
-                    log.sessao,
-                    log.ip,
-                    json.dumps(log.detalhes, ensure_ascii=False)
-                ])
-    
-    def _exportar_json(self, logs: List[LogEstruturado], caminho: str):
-        """Exporta logs para JSON."""
-        dados = [log.to_dict() for log in logs]
-        with open(caminho, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, indent=2, ensure_ascii=False)
-    
-    def _exportar_txt(self, logs: List[LogEstruturado], caminho: str):
-        """Exporta logs para TXT."""
-        with open(caminho, 'w', encoding='utf-8') as f:
-            for log in logs:
-                f.write(f"[{log.timestamp}] {log.nivel} - {log.origem}: {log.mensagem}\n")
-                if log.detalhes:
-                    f.write(f"  Detalhes: {json.dumps(log.detalhes, ensure_ascii=False)}\n")
-                f.write("\n")
-    
-    def _exportar_zip(self, logs: List[LogEstruturado], caminho: str):
-        """Exporta logs para ZIP com múltiplos formatos."""
-        with zipfile.ZipFile(caminho, 'w') as zipf:
-            # CSV
-            csv_path = caminho.replace('.zip', '.csv')
-            self._exportar_csv(logs, csv_path)
-            zipf.write(csv_path, 'logs.csv')
-            os.remove(csv_path)
-            
-            # JSON
-            json_path = caminho.replace('.zip', '.json')
-            self._exportar_json(logs, json_path)
-            zipf.write(json_path, 'logs.json')
-            os.remove(json_path)
-            
-            # TXT
-            txt_path = caminho.replace('.zip', '.txt')
-            self._exportar_txt(logs, txt_path)
-            zipf.write(txt_path, 'logs.txt')
-            os.remove(txt_path)
+    def _registros_exportacao(self, filtro: FiltroLogs = None) -> Iterator[Dict[str, Any]]:
+        """Gera os registros de exportação a partir dos logs paginados."""
+        for log in self.iterar_logs(filtro):
+            yield log.to_dict()
     
-    def obter_niveis_disponiveis(self) -> List[str]:
-        """Obtém níveis de log disponíveis."""
+    def _criar_formatador(self, formato: str) -> FormatadorExportacao:
+        """Cria o formatador com as colunas e títulos desta exportação."""
+        if formato == "txt":
+            return criar_formatador(formato, COLUNAS_EXPORTACAO, modelo=self._formatar_txt)
+        return criar_formatador(formato, COLUNAS_EXPORTACAO, titulos=TITULOS_EXPORTACAO)
+    
+    def _formatar_txt(self, registro: Dict[str, Any]) -> str:
+        """Formata um log para exportação TXT."""
+        texto = f"[{registro['timestamp']}] {registro['nivel']} - {registro['origem']}: {registro['mensagem']}\n"
+        if registro["detalhes"] and registro["detalhes"] != "{}":
+            texto += f"  Detalhes: {registro['detalhes']}\n"
+        return texto + "\n"
+    
+    def _exportar_zip(self, filtro: FiltroLogs, caminho: str,
+                      callback_progresso: Callable[[int], None] = None,
+                      cancelar: threading.Event = None):
+        """Exporta logs para ZIP com múltiplos formatos, cada um numa entrada."""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT DISTINCT nivel FROM logs_detalhados ORDER BY nivel")
-                return [row[0] for row in cursor.fetchall()]
+            with abrir_zip(caminho) as zipf:
+                for formato in ("csv", "json", "txt"):
+                    exportar_stream(
+                        self._registros_exportacao(filtro),
+                        self._criar_formatador(formato),
+                        zipf,
+                        entrada_zip=f"logs.{formato}",
+                        callback_progresso=callback_progresso,
+                        cancelar=cancelar
+                    )
+        except Exception:
+            # Não deixar ZIPs parciais para trás
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            raise
+    
+    def _valores_dicionario(self, coluna: str) -> List[str]:
+        """Valores conhecidos de um dicionário, ordenados (sem varrer os logs)."""
+        try:
+            with self.banco.conexao() as conn:
+                self._atualizar_dicionarios(conn, [coluna])
         except Exception as e:
-            print(f"Erro ao obter níveis: {e}")
-            return []
+            print(f"Erro ao ler dicionário de {coluna}: {e}")
+        
+        with self.dicionarios_lock:
+            return sorted(valor for valor in self.dicionarios[coluna] if valor)
+    
+    def obter_niveis_disponiveis(self) -> List[str]:
+        """Obtém níveis de log disponíveis."""
+        return self._valores_dicionario("nivel")
     
     def obter_origens_disponiveis(self) -> List[str]:
         """Obtém origens de log disponíveis."""
-        try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT DISTINCT origem FROM logs_detalhados ORDER BY origem")
-                return [row[0] for row in cursor.fetchall()]
-        except Exception as e:
-            print(f"Erro ao obter origens: {e}")
-            return []
+        return self._valores_dicionario("origem")
     
     def obter_usuarios_disponiveis(self) -> List[str]:
         """Obtém usuários disponíveis."""
-        try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT DISTINCT usuario FROM logs_detalhados WHERE usuario != '' ORDER BY usuario")
-                return [row[0] for row in cursor.fetchall()]
-        except Exception as e:
-            print(f"Erro ao obter usuários: {e}")
-            return [] 
\ No newline at end of file
+        return self._valores_dicionario("usuario")
+    
+    def obter_sessoes_disponiveis(self) -> List[str]:
+        """Obtém sessões disponíveis."""
+        return self._valores_dicionario("sessao")
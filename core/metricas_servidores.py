@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Coleta periódica de métricas dos servidores SSH, sem agentes.
+Um único script de sonda por servidor e ciclo (carga, CPU, memória, disco,
+uptime e estado dos containers Docker), executado na conexão do pool e guardado
+numa série temporal compacta no SQLite.
+"""
+
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+
+# Uma linha "chave=valor" por métrica; os containers numa linha cada
+SCRIPT_SONDA = r"""
+echo "load=$(cut -d' ' -f1-3 /proc/loadavg)"
+echo "cpu=$(head -n1 /proc/stat | cut -d' ' -f2-)"
+echo "mem=$(awk '/^MemTotal:|^MemAvailable:/{printf "%s ", $2}' /proc/meminfo)"
+echo "disco=$(df -Pk / | awk 'NR==2{print $2, $3}')"
+echo "uptime=$(cut -d' ' -f1 /proc/uptime)"
+command -v docker >/dev/null 2>&1 && docker ps -a --format '{{.Names}}|{{.State}}' 2>/dev/null | sed 's/^/docker=/'
+true
+"""
+
+
+def analisar_sonda(saida: str, cpu_anterior: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    Converte a saída do script de sonda em métricas.
+
+    Args:
+        saida: stdout do SCRIPT_SONDA
+        cpu_anterior: Contadores de /proc/stat da coleta anterior (para a % de CPU)
+
+    Returns:
+        Dict com load1/5/15, cpu (%), memoria (%), disco (%), uptime (s),
+        containers {nome: estado} e cpu_contadores (para a próxima coleta)
+    """
+    metricas = {
+        "load1": None, "load5": None, "load15": None, "cpu": None,
+        "memoria": None, "disco": None, "uptime": None,
+        "containers": {}, "cpu_contadores": None
+    }
+
+    for linha in saida.splitlines():
+        chave, _, valor = linha.partition("=")
+        valores = valor.split()
+        try:
+            if chave == "load" and len(valores) >= 3:
+                metricas["load1"], metricas["load5"], metricas["load15"] = map(float, valores[:3])
+            elif chave == "cpu" and valores:
+                # user..steal (guest já está incluído em user)
+                contadores = [int(v) for v in valores[:8]]
+                metricas["cpu_contadores"] = contadores
+                if cpu_anterior and len(cpu_anterior) == len(contadores):
+                    # idle + iowait contam como tempo livre
+                    delta = [a - b for a, b in zip(contadores, cpu_anterior)]
+                    total = sum(delta)
+                    livre = delta[3] + (delta[4] if len(delta) > 4 else 0)
+                    if total > 0:
+                        metricas["cpu"] = round(100.0 * (total - livre) / total, 1)
+            elif chave == "mem" and len(valores) >= 2:
+                total, disponivel = int(valores[0]), int(valores[1])
+                if total:
+                    metricas["memoria"] = round(100.0 * (total - disponivel) / total, 1)
+            elif chave == "disco" and len(valores) >= 2:
+                total, usado = int(valores[0]), int(valores[1])
+                if total:
+                    metricas["disco"] = round(100.0 * usado / total, 1)
+            elif chave == "uptime" and valores:
+                metricas["uptime"] = int(float(valores[0]))
+            elif chave == "docker" and "|" in valor:
+                nome, _, estado = valor.partition("|")
+                metricas["containers"][nome] = estado
+        except ValueError:
+            continue
+
+    return metricas
+
+
+class ColetorMetricas:
+    """
+    Coletor periódico de métricas de todos os servidores ativos.
+    """
+
+    def __init__(self, servidores_manager, settings):
+        """
+        Inicializa o coletor.
+
+        Args:
+            servidores_manager: Instância de ServidoresManager
+            settings: Configurações do sistema
+        """
+        self.servidores_manager = servidores_manager
+        self.banco = servidores_manager.banco
+        self.intervalo = settings.obter("servidores", "intervalo_metricas", 60)
+        # Mais coletas em simultâneo do que conexões no pool só ficariam à espera de uma conexão livre
+        self.max_paralelo = min(settings.obter("servidores", "max_paralelo_metricas", 5),
+                                servidores_manager.pool_conexoes.max_conexoes)
+        self.retencao_dias = settings.obter("servidores", "retencao_metricas_dias", 7)
+        self.timeout = settings.obter("servidores", "timeout_metricas", 20)
+
+        self.cpu_anterior = {}  # servidor_id -> contadores de /proc/stat
+        self.ultimas = {}       # servidor_id -> últimas métricas (com instante e erro)
+        self.lock = threading.Lock()
+        self.parar_evento = threading.Event()
+        self.thread = None
+
+        self._inicializar_tabela()
+
+    def _inicializar_tabela(self):
+        """Cria a tabela da série temporal."""
+        try:
+            with self.banco.transacao() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS metricas_servidores (
+                        servidor_id INTEGER NOT NULL,
+                        instante INTEGER NOT NULL,
+                        load1 REAL,
+                        cpu REAL,
+                        memoria REAL,
+                        disco REAL,
+                        uptime INTEGER,
+                        containers_total INTEGER,
+                        containers_execucao INTEGER,
+                        containers TEXT,
+                        PRIMARY KEY (servidor_id, instante)
+                    ) WITHOUT ROWID
+                """)
+        except Exception as e:
+            print(f"Erro ao inicializar tabela de métricas: {e}")
+
+    def iniciar(self):
+        """Inicia a coleta periódica em background."""
+        if self.thread and self.thread.is_alive():
+            return
+        self.parar_evento.clear()
+        self.thread = threading.Thread(target=self._executar, daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        """Para a coleta periódica."""
+        self.parar_evento.set()
+
+    def _executar(self):
+        """Ciclo de coleta: um exec por servidor a cada intervalo."""
+        while not self.parar_evento.is_set():
+            inicio = time.monotonic()
+            try:
+                self.coletar_agora()
+                self._limpar_antigas()
+            except Exception as e:
+                print(f"Erro na coleta de métricas: {e}")
+            self.parar_evento.wait(max(1.0, self.intervalo - (time.monotonic() - inicio)))
+
+    def _coletar_servidor(self, servidor) -> Dict[str, Any]:
+        """Executa a sonda num servidor e devolve as métricas."""
+        instante = int(time.time())
+        with self.servidores_manager.pool_conexoes.usar_conexao(servidor) as (sucesso, conexao, mensagem):
+            if sucesso:
+                sucesso, stdout, _, mensagem = conexao.executar_comando(SCRIPT_SONDA, self.timeout)
+        if not sucesso:
+            return {"servidor_id": servidor.id, "instante": instante, "erro": mensagem}
+
+        metricas = analisar_sonda(stdout, self.cpu_anterior.get(servidor.id))
+        self.cpu_anterior[servidor.id] = metricas.pop("cpu_contadores")
+        metricas.update(servidor_id=servidor.id, instante=instante, erro=None)
+        return metricas
+
+    def coletar_agora(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Coleta as métricas de todos os servidores ativos (em paralelo, limitado).
+
+        Returns:
+            Dict servidor_id -> métricas (ou {"erro": ...})
+        """
+        servidores = self.servidores_manager.selecionar_servidores()
+        if not servidores:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_paralelo, len(servidores))),
+                                thread_name_prefix="ssh-metricas") as executor:
+            resultados = list(executor.map(self._coletar_servidor, servidores))
+
+        linhas = []
+        for metricas in resultados:
+            if metricas.get("erro"):
+                continue
+            containers = metricas["containers"]
+            linhas.append((
+                metricas["servidor_id"], metricas["instante"], metricas["load1"], metricas["cpu"],
+                metricas["memoria"], metricas["disco"], metricas["uptime"], len(containers),
+                sum(1 for estado in containers.values() if estado == "running"),
+                json.dumps(containers, separators=(",", ":")) if containers else None
+            ))
+
+        if linhas:
+            try:
+                with self.banco.transacao() as conn:
+                    conn.executemany("""
+                        INSERT OR REPLACE INTO metricas_servidores
+                        (servidor_id, instante, load1, cpu, memoria, disco, uptime,
+                         containers_total, containers_execucao, containers)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, linhas)
+            except Exception as e:
+                print(f"Erro ao gravar métricas: {e}")
+
+        with self.lock:
+            for metricas in resultados:
+                self.ultimas[metricas["servidor_id"]] = metricas
+
+        return {metricas["servidor_id"]: metricas for metricas in resultados}
+
+    def _limpar_antigas(self):
+        """Remove as métricas fora do período de retenção."""
+        limite = int(time.time()) - self.retencao_dias * 86400
+        try:
+            with self.banco.transacao() as conn:
+                conn.execute("DELETE FROM metricas_servidores WHERE instante < ?", (limite,))
+        except Exception as e:
+            print(f"Erro ao limpar métricas antigas: {e}")
+
+    def obter_ultimas(self) -> Dict[int, Dict[str, Any]]:
+        """Últimas métricas coletadas de cada servidor."""
+        with self.lock:
+            return dict(self.ultimas)
+
+    def obter_serie(self, servidor_id: int, segundos: int = 3600) -> List[Dict[str, Any]]:
+        """
+        Obtém a série temporal de um servidor.
+
+        Args:
+            servidor_id: ID do servidor
+            segundos: Janela de tempo até agora
+
+        Returns:
+            Pontos do mais antigo para o mais recente
+        """
+        desde = int(time.time()) - segundos
+        try:
+            linhas = self.banco.consultar("""
+                SELECT instante, load1, cpu, memoria, disco, uptime, containers_total, containers_execucao
+                FROM metricas_servidores
+                WHERE servidor_id = ? AND instante >= ?
+                ORDER BY instante
+            """, (servidor_id, desde))
+        except Exception as e:
+            print(f"Erro ao obter série de métricas: {e}")
+            return []
+        campos = ("instante", "load1", "cpu", "memoria", "disco", "uptime",
+                  "containers_total", "containers_execucao")
+        return [dict(zip(campos, linha)) for linha in linhas]
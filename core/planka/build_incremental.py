@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo para builds incrementais da imagem de produção do Planka.
+Calcula uma impressão digital do contexto de build (com um índice de arquivos
+próprio, que só exclui o que o .dockerignore exclui) e guarda a do último
+build bem-sucedido, para que um novo deploy sem alterações não refaça a imagem.
+"""
+
+import re
+import json
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..indice_arquivos import IndiceArquivos
+
+
+def traduzir_padrao_dockerignore(padrao: str) -> "re.Pattern":
+    """
+    Converte um padrão do .dockerignore numa expressão regular.
+
+    Segue as regras do Docker: o padrão é relativo à raiz do contexto, "*" e
+    "?" não atravessam "/", e "**" corresponde a qualquer número de diretórios.
+
+    Args:
+        padrao: Padrão sem o "!" inicial
+
+    Returns:
+        Expressão para comparar com o caminho relativo completo
+    """
+    padrao = padrao.strip().lstrip("/")
+    while padrao.startswith("./"):
+        padrao = padrao[2:]
+    padrao = padrao.rstrip("/")
+
+    partes = []
+    i = 0
+    while i < len(padrao):
+        c = padrao[i]
+        if padrao.startswith("**", i):
+            i += 2
+            if padrao.startswith("/", i):
+                partes.append("(?:.*/)?")
+                i += 1
+            else:
+                partes.append(".*")
+            continue
+        if c == "*":
+            partes.append("[^/]*")
+        elif c == "?":
+            partes.append("[^/]")
+        elif c == "[":
+            fim = padrao.find("]", i + 1)
+            if fim == -1:
+                partes.append(re.escape(c))
+            else:
+                classe = padrao[i + 1:fim]
+                if classe.startswith("^"):
+                    classe = "!" + classe[1:]
+                if classe.startswith("!"):
+                    classe = "^/" + classe[1:]
+                partes.append(f"[{classe}]")
+                i = fim
+        elif c == "\\" and i + 1 < len(padrao):
+            i += 1
+            partes.append(re.escape(padrao[i]))
+        else:
+            partes.append(re.escape(c))
+        i += 1
+    return re.compile("".join(partes) + r"\Z")
+
+
+class IndiceContextoBuild(IndiceArquivos):
+    """
+    Índice do contexto de build do Docker.
+
+    Ao contrário do índice da sincronização, só ignora o que o .dockerignore
+    exclui: um "build" ou "dist" dentro do contexto vai para a imagem e tem de
+    contar para a impressão digital.
+    """
+
+    def __init__(self, raiz, arquivo_banco, padroes: List[str]):
+        """
+        Inicializa o índice.
+
+        Args:
+            raiz: Diretório do contexto de build
+            arquivo_banco: Base SQLite onde o índice é guardado
+            padroes: Linhas do .dockerignore (as começadas por "!" são exceções)
+        """
+        super().__init__(raiz, arquivo_banco, ignorar=[])
+        # Entradas próprias nas mesmas tabelas, separadas das do índice da sincronização
+        self.chave = f"{self.chave}#contexto_build"
+        self.padroes = padroes
+        self.regras: List[Tuple["re.Pattern", bool]] = [
+            (traduzir_padrao_dockerignore(p[1:] if p.startswith("!") else p), not p.startswith("!"))
+            for p in padroes
+        ]
+        self.com_excecoes = any(not excluir for _, excluir in self.regras)
+
+    def _ignorado(self, relativo: str, nome: str) -> bool:
+        """
+        Verifica se o .dockerignore exclui o caminho (ou um diretório acima dele).
+
+        Vale a última regra que corresponder. Com exceções ("!") os diretórios
+        excluídos continuam a ser percorridos, porque podem ter arquivos
+        reincluídos.
+        """
+        caminhos = [relativo]
+        pai = relativo
+        while "/" in pai:
+            pai = pai.rsplit("/", 1)[0]
+            caminhos.append(pai)
+
+        ignorado = False
+        for regra, excluir in self.regras:
+            if ignorado != excluir and any(regra.match(caminho) for caminho in caminhos):
+                ignorado = excluir
+        if ignorado and self.com_excecoes and (self.raiz / relativo).is_dir():
+            return False
+        return ignorado
+
+
+class BuildIncremental:
+    """
+    Impressão digital do contexto de build e estado do último build.
+    """
+
+    # Arquivos que nunca afetam a imagem, além dos do .dockerignore
+    IGNORAR_PADRAO = ["**/*.backup"]
+
+    def __init__(self, indice, arquivo_estado: Path, arquivo_compose: str = "docker-compose-local.yml"):
+        """
+        Inicializa o controlo de builds incrementais.
+
+        Args:
+            indice: Índice de arquivos do diretório do Planka (IndiceArquivos),
+                onde fica o marco "build"
+            arquivo_estado: Arquivo JSON com o estado do último build
+            arquivo_compose: docker-compose usado no build
+        """
+        self.indice = indice
+        self.planka_dir = indice.raiz
+        self.indice_contexto = None
+        self.arquivo_estado = Path(arquivo_estado)
+        self.arquivo_compose = arquivo_compose
+        self.estado = self._carregar_estado()
+
+    def _carregar_estado(self) -> Dict:
+        """Carrega o estado do último build."""
+        try:
+            with open(self.arquivo_estado, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _salvar_estado(self):
+        """Grava o estado de forma atómica."""
+        try:
+            self.arquivo_estado.parent.mkdir(parents=True, exist_ok=True)
+            temporario = self.arquivo_estado.with_suffix(".tmp")
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(self.estado, f)
+            temporario.replace(self.arquivo_estado)
+        except Exception as e:
+            print(f"Erro ao salvar estado do build: {e}")
+
+    def _padroes_ignorados(self) -> List[str]:
+        """Padrões ignorados: os padrão mais as linhas do .dockerignore (com as exceções "!")."""
+        padroes = list(self.IGNORAR_PADRAO)
+        try:
+            with open(self.planka_dir / ".dockerignore", 'r', encoding='utf-8') as f:
+                for linha in f:
+                    linha = linha.strip()
+                    if linha and not linha.startswith("#"):
+                        padroes.append(linha)
+        except OSError:
+            pass
+        return padroes
+
+    def calcular_impressao(self) -> str:
+        """
+        Calcula a impressão digital do contexto de build.
+
+        Usa um índice próprio, com as regras do .dockerignore e não a lista de
+        exclusões da sincronização (que ignora "build", "dist", ... a qualquer
+        profundidade). O índice é atualizado antes e só os arquivos alterados
+        desde o cálculo anterior voltam a ser lidos.
+
+        Returns:
+            Hash SHA-256 em hexadecimal
+        """
+        padroes = self._padroes_ignorados()
+        if self.indice_contexto is None or self.indice_contexto.padroes != padroes:
+            self.indice_contexto = IndiceContextoBuild(self.planka_dir, self.indice.banco.caminho, padroes)
+        self.indice_contexto.atualizar()
+        return self.indice_contexto.impressao()
+
+    def obter_imagens(self) -> Dict[str, Optional[str]]:
+        """
+        Imagens geradas pelo docker-compose e o ID atual de cada uma.
+
+        Returns:
+            Dict nome da imagem -> ID (None se a imagem não existir)
+        """
+        imagens = {}
+        try:
+            result = subprocess.run(
+                ["docker-compose", "-f", self.arquivo_compose, "config", "--images"],
+                cwd=self.planka_dir,
+                capture_output=True,
+                text=True,
+                timeout=30,
+                encoding='utf-8', errors='replace'
+            )
+            if result.returncode != 0:
+                return {}
+
+            for imagem in result.stdout.split():
+                inspecao = subprocess.run(
+                    ["docker", "image", "inspect", "--format", "{{.Id}}", imagem],
+                    capture_output=True,
+                    text=True,
+                    timeout=30,
+                    encoding='utf-8', errors='replace'
+                )
+                imagens[imagem] = inspecao.stdout.strip() if inspecao.returncode == 0 else None
+        except Exception as e:
+            print(f"Erro ao obter imagens do build: {e}")
+        return imagens
+
+    def build_atualizado(self, impressao: str) -> bool:
+        """
+        Verifica se a imagem do último build corresponde ao código atual.
+
+        Args:
+            impressao: Impressão digital atual
+
+        Returns:
+            True se a impressão coincide e as imagens ainda existem com o mesmo ID
+        """
+        ultimo = self.estado.get("ultimo_build")
+        if not ultimo or ultimo.get("impressao") != impressao:
+            return False
+        if not ultimo.get("imagens") or not all(ultimo["imagens"].values()):
+            return False
+        return self.obter_imagens() == ultimo["imagens"]
+
+    def registrar_build(self, impressao: str, duracao: float, sem_cache: bool):
+        """
+        Regista um build bem-sucedido.
+
+        Args:
+            impressao: Impressão digital do código usado no build
+            duracao: Duração do build em segundos
+            sem_cache: Se o build foi feito com --no-cache
+        """
+        self.estado["ultimo_build"] = {
+            "impressao": impressao,
+            "imagens": self.obter_imagens(),
+            "duracao": round(duracao, 1),
+            "sem_cache": sem_cache
+        }
+        self._salvar_estado()
+        self.indice.marcar("build")
+
+    def invalidar(self):
+        """Esquece o último build (o próximo deploy volta a fazer build)."""
+        self.estado.pop("ultimo_build", None)
+        self._salvar_estado()
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""
+Execução em streaming dos comandos de build e arranque do Planka.
+Lê a saída do docker-compose linha a linha à medida que é produzida, reencaminha
+cada linha para o log, reconhece as etapas do BuildKit, do builder clássico e do
+"up" (com início, fim e se vieram da cache) e termina o processo apenas quando
+fica sem produzir saída durante demasiado tempo. Os tempos por etapa de cada
+execução ficam guardados no SQLite.
+"""
+
+import re
+import time
+import queue
+import subprocess
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from ..armazenamento import obter_banco
+
+
+# BuildKit (--progress=plain): "#5 [planka 3/10] RUN npm ci", "#5 CACHED", "#5 DONE 12.3s"
+RE_BUILDKIT_INICIO = re.compile(r"^#(\d+) (\[.+)$")
+RE_BUILDKIT_FIM = re.compile(r"^#(\d+) (DONE [\d.]+s|CACHED|ERROR\b.*|CANCELED)")
+# Builder clássico: "Step 3/10 : RUN npm ci", " ---> Using cache"
+RE_CLASSICO_PASSO = re.compile(r"^Step (\d+/\d+) : (.+)$")
+RE_CLASSICO_CACHE = re.compile(r"^\s*---> Using cache")
+RE_CLASSICO_FIM = re.compile(r"^(Successfully built|Successfully tagged)")
+# docker compose v2: "Container planka-postgres-1  Started"; v1: "Creating planka_postgres_1 ... done"
+RE_COMPOSE_V2 = re.compile(r"^\s*(?:✔\s*)?Container (\S+)\s+(Creating|Created|Recreate|Recreated|Starting|Started|"
+                           r"Waiting|Healthy|Running|Stopping|Stopped|Error)\b")
+RE_COMPOSE_V1 = re.compile(r"^(Creating|Recreating|Starting) (\S+)\s+\.\.\.\s*(done|error)?", re.IGNORECASE)
+
+# Estados do compose que concluem a etapa de um container
+FIM_COMPOSE = {"Created", "Recreated", "Started", "Healthy", "Running", "Stopped", "Error"}
+
+
+class AnalisadorEtapas:
+    """
+    Converte linhas de progresso do BuildKit, do builder clássico e do
+    docker-compose up em etapas com início, fim e indicação de cache.
+    """
+
+    def __init__(self):
+        """Inicializa o analisador."""
+        self.etapas = []  # Por ordem de início
+        self.abertas = {}  # chave -> etapa ainda sem fim
+        self.inicio = time.monotonic()
+
+    def _agora(self) -> float:
+        """Segundos desde o início da execução."""
+        return time.monotonic() - self.inicio
+
+    def _abrir(self, chave: str, nome: str):
+        """Abre uma etapa (ignorado se já estiver aberta)."""
+        if chave in self.abertas:
+            return
+        etapa = {"nome": nome, "inicio": self._agora(), "fim": None, "em_cache": False, "erro": False}
+        self.etapas.append(etapa)
+        self.abertas[chave] = etapa
+
+    def _fechar(self, chave: str, em_cache: bool = False, erro: bool = False):
+        """Fecha uma etapa aberta."""
+        etapa = self.abertas.pop(chave, None)
+        if etapa is not None:
+            etapa["fim"] = self._agora()
+            etapa["em_cache"] = etapa["em_cache"] or em_cache
+            etapa["erro"] = erro
+
+    def _fechar_todas(self, prefixo: str):
+        """Fecha as etapas abertas de um tipo."""
+        for chave in [c for c in self.abertas if c.startswith(prefixo)]:
+            self._fechar(chave)
+
+    def processar(self, linha: str):
+        """
+        Processa uma linha de saída.
+
+        Args:
+            linha: Linha sem o fim de linha
+        """
+        fim = RE_BUILDKIT_FIM.match(linha)
+        if fim:
+            estado = fim.group(2)
+            self._fechar(f"bk:{fim.group(1)}", em_cache=estado == "CACHED",
+                         erro=estado.startswith(("ERROR", "CANCELED")))
+            return
+        inicio = RE_BUILDKIT_INICIO.match(linha)
+        if inicio:
+            self._abrir(f"bk:{inicio.group(1)}", inicio.group(2))
+            return
+
+        passo = RE_CLASSICO_PASSO.match(linha)
+        if passo:
+            # Cada passo do builder clássico termina quando começa o seguinte
+            self._fechar_todas("classico:")
+            self._abrir(f"classico:{passo.group(1)}", f"[{passo.group(1)}] {passo.group(2)}")
+            return
+        if RE_CLASSICO_CACHE.match(linha):
+            for chave, etapa in self.abertas.items():
+                if chave.startswith("classico:"):
+                    etapa["em_cache"] = True
+            return
+        if RE_CLASSICO_FIM.match(linha):
+            self._fechar_todas("classico:")
+            return
+
+        compose = RE_COMPOSE_V2.match(linha)
+        if compose:
+            container, estado = compose.groups()
+            chave = f"compose:{container}"
+            self._abrir(chave, f"container {container}")
+            if estado in FIM_COMPOSE:
+                self._fechar(chave, erro=estado == "Error")
+            return
+        compose = RE_COMPOSE_V1.match(linha)
+        if compose:
+            _, container, resultado = compose.groups()
+            chave = f"compose:{container}"
+            self._abrir(chave, f"container {container}")
+            if resultado:
+                self._fechar(chave, erro=resultado.lower() == "error")
+
+    def finalizar(self, sucesso: bool) -> List[Dict[str, Any]]:
+        """
+        Fecha as etapas que ficaram abertas e devolve todas.
+
+        Args:
+            sucesso: Se o processo terminou bem (as abertas contam como erro se não)
+
+        Returns:
+            Etapas com nome, inicio, fim, duracao (segundos), em_cache e erro
+        """
+        for chave in list(self.abertas):
+            self._fechar(chave, erro=not sucesso)
+        for etapa in self.etapas:
+            etapa["duracao"] = round(etapa["fim"] - etapa["inicio"], 3)
+        return self.etapas
+
+
+def executar_em_streaming(comando: List[str], cwd=None, env=None,
+                          ao_receber_linha: Optional[Callable[[str], None]] = None,
+                          timeout_inatividade: float = 300,
+                          timeout_total: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Executa um comando lendo a saída (stdout e stderr juntos) linha a linha.
+
+    Args:
+        comando: Comando e argumentos
+        cwd: Diretório de trabalho
+        env: Variáveis de ambiente
+        ao_receber_linha: Chamado com cada linha assim que é lida
+        timeout_inatividade: Segundos sem saída após os quais o processo é terminado
+        timeout_total: Limite opcional para a duração total (None ou 0 para sem limite)
+
+    Returns:
+        Dict com returncode (None se terminado por timeout), motivo ("inatividade",
+        "total" ou None), duracao (segundos), linhas (total lidas), ultimas_linhas
+        e etapas
+    """
+    analisador = AnalisadorEtapas()
+    linhas = queue.Queue()
+    ultimas = []
+    total_linhas = 0
+    motivo = None
+    inicio = time.monotonic()
+
+    processo = subprocess.Popen(
+        comando,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        text=True,
+        encoding='utf-8', errors='replace',
+        bufsize=1
+    )
+
+    def ler():
+        """Lê a saída numa thread para que a espera possa ter timeout."""
+        try:
+            for linha in processo.stdout:
+                linhas.put(linha)
+        finally:
+            linhas.put(None)
+
+    threading.Thread(target=ler, daemon=True).start()
+
+    ultima_atividade = time.monotonic()
+    while True:
+        agora = time.monotonic()
+        if timeout_total and agora - inicio > timeout_total:
+            motivo = "total"
+            break
+        restante = timeout_inatividade - (agora - ultima_atividade)
+        if restante <= 0:
+            motivo = "inatividade"
+            break
+        try:
+            linha = linhas.get(timeout=min(restante, 1.0))
+        except queue.Empty:
+            continue
+        if linha is None:
+            break
+
+        ultima_atividade = time.monotonic()
+        linha = linha.rstrip("\r\n")
+        total_linhas += 1
+        ultimas.append(linha)
+        if len(ultimas) > 50:
+            del ultimas[0]
+        analisador.processar(linha)
+        if ao_receber_linha:
+            try:
+                ao_receber_linha(linha)
+            except Exception as e:
+                print(f"Erro ao reencaminhar linha do build: {e}")
+
+    if motivo:
+        processo.kill()
+    try:
+        returncode = processo.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        returncode = None
+
+    if motivo:
+        returncode = None
+    return {
+        "returncode": returncode,
+        "motivo": motivo,
+        "duracao": round(time.monotonic() - inicio, 3),
+        "linhas": total_linhas,
+        "ultimas_linhas": ultimas,
+        "etapas": analisador.finalizar(returncode == 0)
+    }
+
+
+class HistoricoBuilds:
+    """
+    Histórico das execuções de build/arranque e dos tempos por etapa.
+    """
+
+    def __init__(self, arquivo_banco):
+        """
+        Inicializa o histórico.
+
+        Args:
+            arquivo_banco: Base SQLite onde o histórico é guardado
+        """
+        self.banco = obter_banco(arquivo_banco)
+        self._inicializar_tabelas()
+
+    def _inicializar_tabelas(self):
+        """Cria as tabelas do histórico."""
+        try:
+            with self.banco.transacao() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS builds_execucoes (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        tipo TEXT NOT NULL,
+                        comando TEXT NOT NULL,
+                        instante TEXT DEFAULT CURRENT_TIMESTAMP,
+                        duracao REAL NOT NULL,
+                        returncode INTEGER,
+                        motivo TEXT,
+                        linhas INTEGER NOT NULL
+                    )
+                """)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS builds_etapas (
+                        execucao_id INTEGER NOT NULL,
+                        ordem INTEGER NOT NULL,
+                        nome TEXT NOT NULL,
+                        inicio REAL NOT NULL,
+                        duracao REAL NOT NULL,
+                        em_cache INTEGER NOT NULL,
+                        erro INTEGER NOT NULL,
+                        PRIMARY KEY (execucao_id, ordem)
+                    ) WITHOUT ROWID
+                """)
+        except Exception as e:
+            print(f"Erro ao inicializar histórico de builds: {e}")
+
+    def registrar(self, tipo: str, comando: List[str], resultado: Dict[str, Any]) -> Optional[int]:
+        """
+        Guarda uma execução e as suas etapas.
+
+        Args:
+            tipo: Tipo da execução ("build" ou "up")
+            comando: Comando executado
+            resultado: Retorno de executar_em_streaming
+
+        Returns:
+            ID da execução ou None em caso de erro
+        """
+        try:
+            with self.banco.transacao() as conn:
+                cursor = conn.execute("""
+                    INSERT INTO builds_execucoes (tipo, comando, duracao, returncode, motivo, linhas)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (tipo, " ".join(comando), resultado["duracao"], resultado["returncode"],
+                      resultado["motivo"], resultado["linhas"]))
+                execucao_id = cursor.lastrowid
+                conn.executemany("""
+                    INSERT INTO builds_etapas (execucao_id, ordem, nome, inicio, duracao, em_cache, erro)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [(execucao_id, ordem, etapa["nome"], round(etapa["inicio"], 3), etapa["duracao"],
+                       int(etapa["em_cache"]), int(etapa["erro"]))
+                      for ordem, etapa in enumerate(resultado["etapas"])])
+            return execucao_id
+        except Exception as e:
+            print(f"Erro ao registrar build: {e}")
+            return None
+
+    def obter_execucoes(self, tipo: Optional[str] = None, limite: int = 20) -> List[Dict[str, Any]]:
+        """
+        Últimas execuções, da mais recente para a mais antiga.
+
+        Args:
+            tipo: Filtrar por tipo ("build" ou "up")
+            limite: Número máximo de execuções
+
+        Returns:
+            Lista de execuções
+        """
+        sql = "SELECT id, tipo, comando, instante, duracao, returncode, motivo, linhas FROM builds_execucoes"
+        parametros = []
+        if tipo:
+            sql += " WHERE tipo = ?"
+            parametros.append(tipo)
+        sql += " ORDER BY id DESC LIMIT ?"
+        parametros.append(limite)
+        try:
+            linhas = self.banco.consultar(sql, parametros)
+        except Exception as e:
+            print(f"Erro ao obter histórico de builds: {e}")
+            return []
+        campos = ("id", "tipo", "comando", "instante", "duracao", "returncode", "motivo", "linhas")
+        return [dict(zip(campos, linha)) for linha in linhas]
+
+    def obter_etapas(self, execucao_id: int) -> List[Dict[str, Any]]:
+        """Etapas de uma execução, pela ordem de início."""
+        try:
+            linhas = self.banco.consultar("""
+                SELECT nome, inicio, duracao, em_cache, erro FROM builds_etapas
+                WHERE execucao_id = ? ORDER BY ordem
+            """, (execucao_id,))
+        except Exception as e:
+            print(f"Erro ao obter etapas do build: {e}")
+            return []
+        return [{"nome": nome, "inicio": inicio, "duracao": duracao,
+                 "em_cache": bool(em_cache), "erro": bool(erro)}
+                for nome, inicio, duracao, em_cache, erro in linhas]
+
+    def etapas_mais_lentas(self, tipo: str = "build", ultimas: int = 10, limite: int = 5) -> List[Dict[str, Any]]:
+        """
+        Etapas que mais pesam nas últimas execuções (tempo médio fora da cache).
+
+        Args:
+            tipo: Tipo de execução
+            ultimas: Número de execuções consideradas
+            limite: Número de etapas devolvidas
+
+        Returns:
+            Lista com nome, execucoes, media, maximo e vezes_em_cache
+        """
+        try:
+            linhas = self.banco.consultar("""
+                SELECT e.nome, COUNT(*), AVG(CASE WHEN e.em_cache = 0 THEN e.duracao END),
+                       MAX(e.duracao), SUM(e.em_cache)
+                FROM builds_etapas e
+                WHERE e.execucao_id IN (
+                    SELECT id FROM builds_execucoes WHERE tipo = ? ORDER BY id DESC LIMIT ?
+                )
+                GROUP BY e.nome
+                ORDER BY COALESCE(AVG(CASE WHEN e.em_cache = 0 THEN e.duracao END), 0) DESC
+                LIMIT ?
+            """, (tipo, ultimas, limite))
+        except Exception as e:
+            print(f"Erro ao obter etapas mais lentas: {e}")
+            return []
+        return [{"nome": nome, "execucoes": execucoes, "media": round(media or 0.0, 3),
+                 "maximo": maximo, "vezes_em_cache": em_cache or 0}
+                for nome, execucoes, media, maximo, em_cache in linhas]
@@ -5,8 +5,7 @@ Gerenciamento de containers Docker e controle de modo desenvolvimento vs produç
 """
 
 import subprocess
-import time
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 from pathlib import Path
 
 
@@ -63,14 +62,12 @@ class ContainerManager:
             )
             
             if result.returncode == 0:
-                # Aguardar inicialização
-                time.sleep(10)
-                
-                # Verificar se iniciou corretamente
-                if status_monitor.verificar_status() == "online":
-                    return True, "Planka iniciado com sucesso"
+                # Aguardar até os containers, a base de dados e o HTTP estarem prontos
+                prontidao = self.aguardar_prontidao("docker-compose.yml")
+                if prontidao["pronto"]:
+                    return True, f"Planka iniciado com sucesso (pronto em {prontidao['tempo_ate_pronto']:.1f}s)"
                 else:
-                    return False, "Planka iniciado mas não está respondendo"
+                    return False, f"Planka iniciado mas não está respondendo ({prontidao['motivo']})"
             else:
                 return False, f"Erro ao iniciar Planka: {result.stderr}"
                 
@@ -104,8 +101,9 @@ class ContainerManager:
             )
             
             if result.returncode == 0:
-                # Aguardar parada
-                time.sleep(5)
+                # Aguardar até não haver containers a correr
+                from .prontidao import EsperaProntidao
+                EsperaProntidao(self.settings, "docker-compose.yml").aguardar_parada()
                 
                 # Verificar se parou
                 if status_monitor.verificar_status() == "offline":
@@ -132,10 +130,7 @@ class ContainerManager:
         if not sucesso_parar:
             return False, f"Erro ao parar: {msg_parar}"
         
-        # Aguardar um pouco
-        time.sleep(3)
-        
-        # Iniciar novamente
+        # Iniciar novamente (parar_planka só devolve depois de os containers pararem)
         sucesso_iniciar, msg_iniciar = self.iniciar_planka()
         if not sucesso_iniciar:
             return False, f"Erro ao reiniciar: {msg_iniciar}"
@@ -184,16 +179,12 @@ class ContainerManager:
             )
             
             if resultado.returncode == 0:
-                # Aguardar inicialização
-                time.sleep(10)
-                
-                # Verificar se iniciou
-                from .status_monitor import StatusMonitor
-                status_monitor = StatusMonitor(self.settings)
-                if status_monitor.verificar_status() == "online":
-                    return True, "Planka iniciado em modo desenvolvimento"
+                # Aguardar até os containers, a base de dados e o HTTP estarem prontos
+                prontidao = self.aguardar_prontidao("docker-compose-dev.yml")
+                if prontidao["pronto"]:
+                    return True, f"Planka iniciado em modo desenvolvimento (pronto em {prontidao['tempo_ate_pronto']:.1f}s)"
                 else:
-                    return False, "Planka não iniciou em modo desenvolvimento"
+                    return False, f"Planka não iniciou em modo desenvolvimento ({prontidao['motivo']})"
             else:
                 return False, f"Erro ao iniciar modo desenvolvimento: {resultado.stderr}"
                 
@@ -202,6 +193,21 @@ class ContainerManager:
         except Exception as e:
             return False, f"Erro ao iniciar modo desenvolvimento: {str(e)}"
     
+    def aguardar_prontidao(self, arquivo_compose: str = "docker-compose.yml",
+                           prazo: Optional[float] = None) -> Dict:
+        """
+        Espera até a stack estar pronta (containers saudáveis, pg_isready e HTTP).
+        
+        Args:
+            arquivo_compose: docker-compose da stack
+            prazo: Segundos máximos de espera (None para planka.timeout_prontidao)
+            
+        Returns:
+            Resultado de EsperaProntidao.aguardar (pronto, tempo_ate_pronto, etapas, ...)
+        """
+        from .prontidao import EsperaProntidao
+        return EsperaProntidao(self.settings, arquivo_compose).aguardar(prazo)
+    
     def parar_modo_desenvolvimento(self) -> Tuple[bool, str]:
         """
         Para o modo desenvolvimento.
@@ -7,9 +7,12 @@ Diagnósticos do sistema e verificação de problemas.
 import subprocess
 import time
 import socket
-from typing import Dict
+from typing import Dict, List
 from pathlib import Path
 
+from .logs_manager import LogsManager
+from ..assinaturas_erros import criar_detector
+
 
 class DiagnosticManager:
     """
@@ -95,6 +98,14 @@ class DiagnosticManager:
                 problemas.append("Porta 3000 não está acessível")
                 diagnostico["recomendacoes"].append("Verificar se a porta está sendo usada por outro processo")
             
+            # Problema 6: Assinaturas de erro críticas nos logs
+            diagnostico["assinaturas_erros"] = self._analisar_logs_producao(diagnostico["logs"])
+            criticos = [a for a in diagnostico["assinaturas_erros"] if a["gravidade"] == "critico"]
+            if criticos:
+                for assinatura in criticos[:3]:
+                    problemas.append(f"Erro crítico nos logs ({assinatura['origem']}, {assinatura['ocorrencias']}x): {assinatura['exemplo'][:120]}")
+                diagnostico["recomendacoes"].append("Verificar os erros críticos repetidos nos logs dos containers")
+            
             diagnostico["problemas"] = problemas
             
             return diagnostico
@@ -172,6 +183,14 @@ class DiagnosticManager:
                 problemas.append("Porta 3000 não está acessível")
                 diagnostico["recomendacoes"].append("Verificar se a porta está sendo usada por outro processo")
             
+            # Problema 6: Assinaturas de erro críticas nos logs
+            diagnostico["assinaturas_erros"] = self._analisar_logs_producao(diagnostico["logs"])
+            criticos = [a for a in diagnostico["assinaturas_erros"] if a["gravidade"] == "critico"]
+            if criticos:
+                for assinatura in criticos[:3]:
+                    problemas.append(f"Erro crítico nos logs ({assinatura['origem']}, {assinatura['ocorrencias']}x): {assinatura['exemplo'][:120]}")
+                diagnostico["recomendacoes"].append("Verificar os erros críticos repetidos nos logs dos containers")
+            
             diagnostico["problemas"] = problemas
             
             return diagnostico
@@ -226,43 +245,26 @@ class DiagnosticManager:
         Returns:
             Dicionário com logs
         """
-        try:
-            logs = {}
-            
-            # Logs do container Planka
-            result = subprocess.run(
-                ["docker-compose", "-f", "docker-compose-local.yml", "logs", "--tail", "50", "planka"],
-                cwd=self.planka_dir,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                encoding='utf-8', errors='replace'
-            )
-            
-            if result.returncode == 0:
-                logs["planka"] = result.stdout
-            else:
-                logs["planka"] = f"Erro ao obter logs: {result.stderr}"
-            
-            # Logs do PostgreSQL
-            result = subprocess.run(
-                ["docker-compose", "-f", "docker-compose-local.yml", "logs", "--tail", "20", "postgres"],
-                cwd=self.planka_dir,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                encoding='utf-8', errors='replace'
-            )
-            
-            if result.returncode == 0:
-                logs["postgres"] = result.stdout
-            else:
-                logs["postgres"] = f"Erro ao obter logs: {result.stderr}"
-            
-            return logs
+        # Reutiliza os logs já ingeridos quando a ingestão está ativa
+        return LogsManager(self.settings)._obter_logs_producao()
+    
+    def _analisar_logs_producao(self, logs: Dict[str, str]) -> List[Dict]:
+        """
+        Agrupa os erros dos logs de produção por assinatura.
+        
+        Args:
+            logs: Logs por serviço (resultado de _obter_logs_producao)
             
-        except Exception as e:
-            return {"erro": str(e)}
+        Returns:
+            Erros distintos com contagens, dos mais graves para os menos graves
+        """
+        detector = criar_detector(self.settings)
+        for servico, texto in logs.items():
+            if servico == "erro":
+                continue
+            for linha in texto.splitlines():
+                detector.analisar_linha(linha, origem=servico)
+        return detector.resumo(limite=20)
     
     def _verificar_container_reiniciando(self) -> bool:
         """
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo para ingestão incremental dos logs dos containers do Planka.
+Segue os logs de cada container com um cursor --since persistido e grava-os
+em lotes na base de logs estruturados.
+"""
+
+import re
+import json
+import time
+import queue
+import atexit
+import threading
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..logs_avancado import LogsAvancadoManager, LogEstruturado, FiltroLogs
+
+
+# Serviços seguidos (nome do serviço no docker-compose)
+SERVICOS_PLANKA = ["planka", "planka-server", "planka-client", "postgres"]
+
+# Prefixo da origem dos logs de container na base de logs estruturados
+PREFIXO_ORIGEM = "container:"
+
+# Deteção do nível a partir do conteúdo da linha
+_PADROES_NIVEL = [
+    ("CRITICAL", re.compile(r"\b(FATAL|PANIC|CRITICAL)\b", re.IGNORECASE)),
+    ("ERROR", re.compile(r"\b(ERROR|ERRO|EXCEPTION|FAILED)\b", re.IGNORECASE)),
+    ("WARNING", re.compile(r"\b(WARN|WARNING)\b", re.IGNORECASE)),
+    ("DEBUG", re.compile(r"\b(DEBUG|VERBOSE|SILLY)\b", re.IGNORECASE)),
+]
+
+_ingestor_ativo = None
+_ingestor_lock = threading.Lock()
+
+
+def origem_container(servico: str) -> str:
+    """Origem usada na base de logs para um serviço."""
+    return f"{PREFIXO_ORIGEM}{servico}"
+
+
+def obter_ingestor_ativo() -> Optional['IngestorLogsContainers']:
+    """Devolve o ingestor em execução neste processo, se houver."""
+    return _ingestor_ativo
+
+
+def analisar_linha(linha: str) -> Optional[Tuple[str, datetime, str, str]]:
+    """
+    Analisa uma linha de `docker logs --timestamps`.
+
+    Args:
+        linha: Linha no formato "<RFC3339Nano> <mensagem>"
+
+    Returns:
+        (timestamp_docker, timestamp_local, nivel, mensagem) ou None
+    """
+    linha = linha.rstrip("\r\n")
+    if not linha:
+        return None
+
+    marca, _, mensagem = linha.partition(" ")
+    try:
+        # Docker usa nanossegundos; datetime aceita até microssegundos
+        base, _, fracao = marca.rstrip("Z").partition(".")
+        instante = datetime.fromisoformat(f"{base}.{(fracao + '000000')[:6]}+00:00")
+        instante = instante.astimezone().replace(tzinfo=None)
+    except ValueError:
+        return None
+
+    nivel = "INFO"
+    for nome_nivel, padrao in _PADROES_NIVEL:
+        if padrao.search(mensagem):
+            nivel = nome_nivel
+            break
+
+    return marca, instante, nivel, mensagem
+
+
+class IngestorLogsContainers:
+    """
+    Ingestor em background dos logs dos containers do Planka.
+
+    Uma thread por container executa `docker logs --follow --since <cursor>`;
+    uma única thread de escrita agrupa as linhas em lotes, grava-as na base de
+    logs estruturados e só então avança e persiste o cursor de cada container.
+    """
+
+    def __init__(self, settings, logs_avancado: LogsAvancadoManager,
+                 servicos: Optional[List[str]] = None, tamanho_lote: int = 200,
+                 intervalo_lote: float = 2.0):
+        """
+        Inicializa o ingestor.
+
+        Args:
+            settings: Instância das configurações do sistema
+            logs_avancado: Base de logs estruturados onde gravar
+            servicos: Serviços a seguir (padrão: SERVICOS_PLANKA)
+            tamanho_lote: Máximo de linhas por gravação
+            intervalo_lote: Segundos máximos até gravar um lote incompleto
+        """
+        self.settings = settings
+        self.logs_avancado = logs_avancado
+        self.planka_dir = Path(settings.obter("planka", "diretorio"))
+        self.servicos = servicos or list(SERVICOS_PLANKA)
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_lote = intervalo_lote
+
+        self.arquivo_cursores = logs_avancado.db_file.parent / "planka_logs_cursores.json"
+        self.cursores = self._carregar_cursores()
+        self.cursores_lock = threading.Lock()
+
+        self.fila = queue.Queue(maxsize=10000)
+        self.parar_evento = threading.Event()
+        self.processos = {}
+        self.threads = []
+        self.estatisticas = {servico: {"linhas": 0, "ultima_linha": None} for servico in self.servicos}
+
+    def _nome_container(self, servico: str) -> str:
+        """Nome do container criado pelo docker-compose para um serviço."""
+        return f"{self.planka_dir.name}-{servico}-1"
+
+    def _carregar_cursores(self) -> Dict[str, str]:
+        """Carrega os cursores persistidos (serviço -> último timestamp docker)."""
+        try:
+            if self.arquivo_cursores.exists():
+                with open(self.arquivo_cursores, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Erro ao carregar cursores de logs: {e}")
+        return {}
+
+    def _salvar_cursores(self):
+        """Persiste os cursores de forma atómica."""
+        try:
+            with self.cursores_lock:
+                dados = dict(self.cursores)
+            temporario = self.arquivo_cursores.with_suffix(".json.tmp")
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, indent=2)
+            temporario.replace(self.arquivo_cursores)
+        except Exception as e:
+            print(f"Erro ao salvar cursores de logs: {e}")
+
+    def iniciar(self):
+        """Inicia as threads de leitura e a thread de escrita."""
+        self.parar_evento.clear()
+
+        escritor = threading.Thread(target=self._loop_escrita, daemon=True)
+        escritor.start()
+        self.threads.append(escritor)
+
+        for servico in self.servicos:
+            leitor = threading.Thread(target=self._loop_leitura, args=(servico,), daemon=True)
+            leitor.start()
+            self.threads.append(leitor)
+
+    def parar(self):
+        """Para a ingestão, terminando os processos docker em curso."""
+        self.parar_evento.set()
+        for processo in list(self.processos.values()):
+            try:
+                processo.terminate()
+            except Exception:
+                pass
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
+
+    def _loop_leitura(self, servico: str):
+        """Segue os logs de um container, reiniciando com recuo exponencial quando termina."""
+        espera = 1.0
+        with self.cursores_lock:
+            cursor = self.cursores.get(servico)
+
+        while not self.parar_evento.is_set():
+            comando = ["docker", "logs", "--timestamps", "--follow"]
+            if cursor:
+                comando += ["--since", cursor]
+            else:
+                comando += ["--tail", "500"]
+            comando.append(self._nome_container(servico))
+
+            recebeu_linhas = False
+            try:
+                processo = subprocess.Popen(
+                    comando,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace'
+                )
+                self.processos[servico] = processo
+
+                for linha in processo.stdout:
+                    if self.parar_evento.is_set():
+                        break
+                    analisada = analisar_linha(linha)
+                    # --since é inclusivo: ignorar o que já foi lido
+                    if not analisada or (cursor and analisada[0] <= cursor):
+                        continue
+                    recebeu_linhas = True
+                    self.fila.put((servico,) + analisada)
+                    cursor = analisada[0]
+
+                processo.wait(timeout=5)
+            except Exception as e:
+                print(f"Erro ao seguir logs de {servico}: {e}")
+            finally:
+                self.processos.pop(servico, None)
+
+            # Container parado ou inexistente: tentar de novo mais tarde
+            espera = 1.0 if recebeu_linhas else min(espera * 2, 60.0)
+            self.parar_evento.wait(espera)
+
+    def _loop_escrita(self):
+        """Agrupa as linhas recebidas em lotes e grava-as."""
+        lote = []
+        limite = time.monotonic() + self.intervalo_lote
+
+        while not self.parar_evento.is_set() or not self.fila.empty():
+            try:
+                lote.append(self.fila.get(timeout=max(0.0, limite - time.monotonic())))
+            except queue.Empty:
+                pass
+
+            if len(lote) >= self.tamanho_lote or (lote and time.monotonic() >= limite):
+                self._gravar_lote(lote)
+                lote = []
+
+            if time.monotonic() >= limite:
+                limite = time.monotonic() + self.intervalo_lote
+
+        if lote:
+            self._gravar_lote(lote)
+
+    def _gravar_lote(self, lote: List[Tuple]):
+        """Grava um lote na base de logs e avança os cursores."""
+        logs = []
+        novos_cursores = {}
+
+        for servico, marca, instante, nivel, mensagem in lote:
+            logs.append(LogEstruturado(
+                timestamp=instante,
+                nivel=nivel,
+                origem=origem_container(servico),
+                mensagem=mensagem,
+                detalhes={"container": self._nome_container(servico)}
+            ))
+            novos_cursores[servico] = max(marca, novos_cursores.get(servico, ""))
+
+        if not self.logs_avancado.registrar_lote(logs):
+            return
+
+        with self.cursores_lock:
+            for servico, marca in novos_cursores.items():
+                if marca > self.cursores.get(servico, ""):
+                    self.cursores[servico] = marca
+        self._salvar_cursores()
+
+        for servico, _, instante, _, _ in lote:
+            self.estatisticas[servico]["linhas"] += 1
+            self.estatisticas[servico]["ultima_linha"] = instante.isoformat()
+
+    def obter_historico(self, servicos: Optional[List[str]] = None, linhas: int = 50) -> List[LogEstruturado]:
+        """
+        Obtém as linhas mais recentes já ingeridas.
+
+        Args:
+            servicos: Serviços a incluir (padrão: todos)
+            linhas: Número máximo de linhas
+
+        Returns:
+            Logs do mais antigo para o mais recente
+        """
+        filtro = FiltroLogs()
+        for servico in servicos or self.servicos:
+            filtro.adicionar_origem(origem_container(servico))
+        return list(reversed(self.logs_avancado.obter_logs_recentes(linhas, filtro)))
+
+    def iterar_historico(self, servicos: Optional[List[str]] = None,
+                         limite: Optional[int] = None) -> Iterator[LogEstruturado]:
+        """
+        Percorre o histórico ingerido em páginas, do mais recente para o mais antigo.
+
+        Args:
+            servicos: Serviços a incluir (padrão: todos)
+            limite: Número máximo de linhas (padrão: todo o histórico)
+        """
+        filtro = FiltroLogs()
+        for servico in servicos or self.servicos:
+            filtro.adicionar_origem(origem_container(servico))
+        if limite:
+            filtro.definir_limite(limite)
+        return self.logs_avancado.iterar_logs(filtro)
+
+    def formatar_historico(self, servicos: Optional[List[str]] = None, linhas: int = 50) -> str:
+        """Histórico no formato de `docker-compose logs` ("servico | linha")."""
+        resultado = []
+        for log in self.obter_historico(servicos, linhas):
+            servico = log.origem[len(PREFIXO_ORIGEM):]
+            resultado.append(f"{servico:<15} | {log.timestamp.strftime('%Y-%m-%d %H:%M:%S')} {log.mensagem}")
+        return "\n".join(resultado) + ("\n" if resultado else "")
+
+
+def iniciar_ingestor(settings, logs_avancado: Optional[LogsAvancadoManager] = None) -> IngestorLogsContainers:
+    """
+    Inicia o ingestor do processo (um único por processo) se ainda não estiver ativo.
+
+    Args:
+        settings: Instância das configurações do sistema
+        logs_avancado: Base de logs estruturados; criada se não for indicada
+
+    Returns:
+        Ingestor ativo
+    """
+    global _ingestor_ativo
+
+    with _ingestor_lock:
+        if _ingestor_ativo is None:
+            ingestor = IngestorLogsContainers(settings, logs_avancado or LogsAvancadoManager(settings))
+            ingestor.iniciar()
+            atexit.register(ingestor.parar)
+            _ingestor_ativo = ingestor
+        return _ingestor_ativo
+
+
+def parar_ingestor():
+    """Para o ingestor do processo, se estiver ativo."""
+    global _ingestor_ativo
+
+    with _ingestor_lock:
+        if _ingestor_ativo is not None:
+            _ingestor_ativo.parar()
+            _ingestor_ativo = None
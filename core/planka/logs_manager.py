@@ -8,6 +8,8 @@ import subprocess
 from typing import Dict
 from pathlib import Path
 
+from .ingestor_logs import iniciar_ingestor, parar_ingestor, obter_ingestor_ativo
+
 
 class LogsManager:
     """
@@ -24,6 +26,38 @@ class LogsManager:
         self.settings = settings
         self.planka_dir = Path(settings.obter("planka", "diretorio"))
     
+    def iniciar_ingestao(self, logs_avancado=None):
+        """
+        Inicia a ingestão incremental dos logs dos containers em background.
+        
+        Args:
+            logs_avancado: Base de logs estruturados onde gravar (opcional)
+        """
+        try:
+            iniciar_ingestor(self.settings, logs_avancado)
+        except Exception as e:
+            print(f"Erro ao iniciar ingestão de logs dos containers: {e}")
+    
+    def parar_ingestao(self):
+        """Para a ingestão dos logs dos containers."""
+        parar_ingestor()
+    
+    def _historico_ingerido(self, servicos=None, linhas: int = 50) -> str:
+        """
+        Obtém as linhas já ingeridas, sem invocar o docker.
+        
+        Returns:
+            Logs formatados ou "" se a ingestão não estiver ativa ou não tiver dados
+        """
+        ingestor = obter_ingestor_ativo()
+        if ingestor is None:
+            return ""
+        try:
+            return ingestor.formatar_historico(servicos, linhas)
+        except Exception as e:
+            print(f"Erro ao ler logs ingeridos: {e}")
+            return ""
+    
     def obter_logs(self, linhas: int = 50) -> str:
         """
         Obtém logs do Planka.
@@ -34,6 +68,10 @@ class LogsManager:
         Returns:
             Logs do Planka
         """
+        historico = self._historico_ingerido(linhas=linhas)
+        if historico:
+            return historico
+        
         try:
             # Obter logs dos containers Docker
             result = subprocess.run(
@@ -63,6 +101,10 @@ class LogsManager:
         Returns:
             Logs detalhados
         """
+        historico = self._historico_ingerido(linhas=linhas)
+        if historico:
+            return historico
+        
         try:
             # Logs completos de todos os containers
             result = subprocess.run(
@@ -89,6 +131,13 @@ class LogsManager:
         Returns:
             Dicionário com logs
         """
+        logs = {
+            "planka": self._historico_ingerido(["planka"], 50),
+            "postgres": self._historico_ingerido(["postgres"], 20)
+        }
+        if logs["planka"] and logs["postgres"]:
+            return logs
+        
         try:
             logs = {}
             
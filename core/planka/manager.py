@@ -96,6 +96,10 @@ class PlankaManager:
         """Delega para ContainerManager."""
         return self.container_manager.parar_modo_desenvolvimento()
     
+    def aguardar_prontidao(self, arquivo_compose: str = "docker-compose.yml", prazo=None):
+        """Delega para ContainerManager."""
+        return self.container_manager.aguardar_prontidao(arquivo_compose, prazo)
+    
     def obter_logs(self, linhas: int = 50):
         """Delega para LogsManager."""
         return self.logs_manager.obter_logs(linhas)
@@ -112,6 +116,10 @@ class PlankaManager:
         """Delega para LogsManager."""
         return self.logs_manager.obter_logs_producao_detalhados(linhas)
     
+    def iniciar_ingestao_logs(self, logs_avancado=None):
+        """Delega para LogsManager."""
+        return self.logs_manager.iniciar_ingestao(logs_avancado)
+    
     # Métodos de produção
     def executar_producao_com_modificacoes_locais(self):
         """Delega para ProductionManager."""
@@ -27,6 +27,23 @@ class ProductionManager:
         """
         self.settings = settings
         self.planka_dir = Path(settings.obter("planka", "diretorio"))
+        self._indice = None
+    
+    def obter_indice_arquivos(self):
+        """
+        Índice persistente dos arquivos do Planka (criado na primeira utilização).
+        
+        Returns:
+            Instância de IndiceArquivos
+        """
+        if self._indice is None:
+            from ..indice_arquivos import IndiceArquivos, IGNORAR_PADRAO
+            self._indice = IndiceArquivos(
+                self.settings.obter_diretorio_planka(),
+                self.settings.obter_arquivo_database(),
+                self.settings.obter("planka", "indice_ignorar", IGNORAR_PADRAO)
+            )
+        return self._indice
     
     def _limpar_arquivos_corrompidos(self) -> bool:
         """
@@ -57,19 +74,20 @@ class ProductionManager:
                 else:
                     self._adicionar_log(f"  • {diretorio} não existe")
             
-            # Verificar se há arquivos Python corrompidos (tamanho 0)
+            # Verificar se há arquivos Python corrompidos (tamanho 0), pelo índice de arquivos
             self._adicionar_log("  • Verificando arquivos Python corrompidos...")
-            for root, dirs, files in os.walk(self.planka_dir):
-                for file in files:
-                    if file.endswith('.py') or file == 'python':
-                        file_path = Path(root) / file
-                        try:
-                            if file_path.stat().st_size == 0:
-                                self._adicionar_log(f"  ⚠️ Arquivo corrompido encontrado: {file_path}")
-                                file_path.unlink()
-                                self._adicionar_log(f"  ✅ Arquivo corrompido removido: {file_path}")
-                        except Exception as e:
-                            pass  # Ignorar erros de acesso
+            indice = self.obter_indice_arquivos()
+            indice.atualizar()
+            for caminho in indice.arquivos(lambda c: c.endswith('.py') or c.rsplit('/', 1)[-1] == 'python'):
+                entrada = indice.obter(caminho)
+                if entrada and entrada["tamanho"] == 0:
+                    file_path = indice.raiz / caminho
+                    try:
+                        self._adicionar_log(f"  ⚠️ Arquivo corrompido encontrado: {file_path}")
+                        file_path.unlink()
+                        self._adicionar_log(f"  ✅ Arquivo corrompido removido: {file_path}")
+                    except Exception as e:
+                        pass  # Ignorar erros de acesso
             
             self._adicionar_log("  ✅ Limpeza de arquivos corrompidos concluída")
             return True
@@ -142,8 +160,10 @@ class ProductionManager:
             from .container_manager import ContainerManager
             container_manager = ContainerManager(self.settings)
             container_manager.parar_planka()
-            self._adicionar_log("  • Aguardando 5 segundos para garantir parada...")
-            time.sleep(5)
+            self._adicionar_log("  • Aguardando parada dos containers de produção local...")
+            from .prontidao import EsperaProntidao
+            if not EsperaProntidao(self.settings, "docker-compose-local.yml").aguardar_parada(prazo=5):
+                self._adicionar_log("  ⚠️ Ainda há containers a correr")
             
             # Verificar se containers pararam
             containers_apos_parar = status_monitor.verificar_containers_ativos()
@@ -171,8 +191,11 @@ class ProductionManager:
             
             # Fazer build da imagem
             self._adicionar_log("🔨 FAZENDO BUILD DA IMAGEM...")
-            self._adicionar_log("  • Comando: docker-compose -f docker-compose-local.yml build --no-cache")
-            self._adicionar_log("  • Timeout: 5 minutos")
+            if self.settings.obter("planka", "build_incremental", True):
+                self._adicionar_log("  • Modo: incremental (build só se o código mudou, com cache de camadas)")
+            else:
+                self._adicionar_log("  • Comando: docker-compose -f docker-compose-local.yml build --no-cache")
+            self._adicionar_log(f"  • Timeout: {self.settings.obter('planka', 'timeout_inatividade_build', 300)}s sem saída")
             sucesso_build = self._fazer_build_producao()
             if not sucesso_build:
                 return False, "Erro no build da imagem"
@@ -180,15 +203,21 @@ class ProductionManager:
             # Iniciar containers
             self._adicionar_log("🚀 INICIANDO CONTAINERS...")
             self._adicionar_log("  • Comando: docker-compose -f docker-compose-local.yml up -d")
-            self._adicionar_log("  • Timeout: 1 minuto")
+            self._adicionar_log(f"  • Timeout: {self.settings.obter('planka', 'timeout_inatividade_up', 60)}s sem saída")
             sucesso_inicio = self._iniciar_containers_producao()
             if not sucesso_inicio:
                 return False, "Erro ao iniciar containers"
             
             # Aguardar inicialização
             self._adicionar_log("⏳ AGUARDANDO INICIALIZAÇÃO...")
-            self._adicionar_log("  • Aguardando 15 segundos para inicialização completa...")
-            time.sleep(15)
+            espera = EsperaProntidao(self.settings, "docker-compose-local.yml")
+            self._adicionar_log(f"  • Verificando containers, pg_isready e HTTP (prazo: {espera.prazo}s)...")
+            prontidao = espera.aguardar(ao_progresso=lambda mensagem: self._adicionar_log(f"    - {mensagem}"))
+            if prontidao["pronto"]:
+                self._adicionar_log(f"  ✅ Planka pronto em {prontidao['tempo_ate_pronto']:.1f}s "
+                                    f"({prontidao['tentativas']} verificações)")
+            else:
+                self._adicionar_log(f"  ⚠️ Planka não ficou pronto em {espera.prazo}s: {prontidao['motivo']}")
             
             # Verificar containers após inicialização
             containers_apos_inicio = status_monitor.verificar_containers_ativos()
@@ -261,6 +290,14 @@ class ProductionManager:
             with open(prod_compose_file, 'w', encoding='utf-8') as f:
                 f.write(novo_compose_content)
             
+            # Registar o estado do código no momento da sincronização
+            try:
+                indice = self.obter_indice_arquivos()
+                indice.atualizar()
+                indice.marcar("sincronizacao")
+            except Exception as e:
+                print(f"Erro ao atualizar índice de arquivos: {e}")
+            
             return True, "Versão de produção sincronizada com desenvolvimento"
             
         except Exception as e:
@@ -329,13 +366,15 @@ class ProductionManager:
             status_monitor = StatusMonitor(self.settings)
             modo_atual = status_monitor.verificar_modo_ativo()
             
-            return {
+            info = {
                 "sincronizada": usa_build_local,
                 "motivo": "Usa build local" if usa_build_local else "Usa imagem oficial",
                 "backup_existe": backup_file.exists(),
                 "modo_atual": modo_atual,
                 "arquivo_existe": prod_compose_file.exists()
             }
+            info.update(self._resumir_alteracoes())
+            return info
             
         except Exception as e:
             return {
@@ -345,6 +384,34 @@ class ProductionManager:
                 "modo_atual": "erro"
             }
     
+    def _resumir_alteracoes(self) -> Dict:
+        """
+        Alterações no código desde o último build e a última sincronização.
+        
+        Returns:
+            Dict com as contagens (None se o marco ainda não existir), os
+            primeiros arquivos alterados desde o build e o tempo do índice
+        """
+        try:
+            indice = self.obter_indice_arquivos()
+            atualizacao = indice.atualizar()
+            desde_build = indice.alteracoes_desde("build")
+            desde_sincronizacao = indice.alteracoes_desde("sincronizacao")
+            
+            def contar(alteracoes):
+                return len(alteracoes["alterados"]) + len(alteracoes["removidos"]) if alteracoes else None
+            
+            return {
+                "alteracoes_desde_build": contar(desde_build),
+                "alteracoes_desde_sincronizacao": contar(desde_sincronizacao),
+                "arquivos_alterados": (desde_build["alterados"] + desde_build["removidos"])[:20] if desde_build else [],
+                "arquivos_indexados": atualizacao["total"],
+                "duracao_indice_ms": atualizacao["duracao_ms"]
+            }
+        except Exception as e:
+            print(f"Erro ao consultar índice de arquivos: {e}")
+            return {}
+    
     def configurar_producao_sempre_desenvolvimento(self) -> Tuple[bool, str]:
         """
         Configura produção para sempre usar o código de desenvolvimento.
@@ -552,10 +619,102 @@ class ProductionManager:
             self._adicionar_log(f"  ❌ Erro na verificação de integridade: {e}")
             return False
 
+    def _obter_build_incremental(self):
+        """Controlo dos builds incrementais (estado guardado no diretório de configuração)."""
+        from .build_incremental import BuildIncremental
+        try:
+            config_dir = self.settings.obter_diretorio_config()
+        except Exception:
+            config_dir = Path(__file__).parent.parent.parent / "config"
+        return BuildIncremental(self.obter_indice_arquivos(), Path(config_dir) / "build_producao.json")
+    
+    def _executar_build(self, sem_cache: bool) -> bool:
+        """
+        Executa o build da imagem de produção.
+        
+        Args:
+            sem_cache: Usar --no-cache (reconstrói todas as camadas)
+            
+        Returns:
+            True se sucesso, False caso contrário
+        """
+        comando = ["docker-compose", "-f", "docker-compose-local.yml", "build"]
+        if sem_cache:
+            comando.append("--no-cache")
+        self._adicionar_log(f"  • Comando completo: {' '.join(comando)}")
+        self._adicionar_log(f"  • Diretório de trabalho: {self.planka_dir}")
+        
+        # BuildKit: reaproveita camadas e as cache mounts (RUN --mount=type=cache) do Dockerfile;
+        # progresso em texto simples para se poder acompanhar as etapas
+        env = dict(os.environ, DOCKER_BUILDKIT="1", COMPOSE_DOCKER_CLI_BUILD="1", BUILDKIT_PROGRESS="plain")
+        
+        self._adicionar_log("  • Executando comando de build...")
+        resultado = self._executar_em_streaming(
+            "build", comando, env,
+            self.settings.obter("planka", "timeout_inatividade_build", 300),
+            self.settings.obter("planka", "timeout_total_build", 0)
+        )
+        return resultado["returncode"] == 0
+    
+    def _executar_em_streaming(self, tipo: str, comando, env, timeout_inatividade: float,
+                               timeout_total: float = 0) -> Dict:
+        """
+        Executa um comando do docker-compose com a saída enviada para o log em
+        tempo real e guarda os tempos por etapa no histórico de builds.
+        
+        Args:
+            tipo: Tipo da execução ("build" ou "up")
+            comando: Comando e argumentos
+            env: Variáveis de ambiente (None para as atuais)
+            timeout_inatividade: Segundos sem saída após os quais o comando é terminado
+            timeout_total: Limite para a duração total (0 para sem limite)
+            
+        Returns:
+            Resultado de executar_em_streaming
+        """
+        from .build_stream import executar_em_streaming, HistoricoBuilds
+        
+        limite = f"{timeout_inatividade}s sem saída" + (f", {timeout_total}s no total" if timeout_total else "")
+        self._adicionar_log(f"  • Timeout configurado: {limite}")
+        resultado = executar_em_streaming(
+            comando,
+            cwd=self.planka_dir,
+            env=env,
+            ao_receber_linha=lambda linha: self._adicionar_log(f"    │ {linha}"),
+            timeout_inatividade=timeout_inatividade,
+            timeout_total=timeout_total or None
+        )
+        
+        if resultado["motivo"] == "inatividade":
+            self._adicionar_log(f"  ⏰ Comando terminado após {timeout_inatividade}s sem saída")
+        elif resultado["motivo"] == "total":
+            self._adicionar_log(f"  ⏰ Comando terminado após {timeout_total}s")
+        self._adicionar_log(f"  • Código de retorno: {resultado['returncode']}")
+        self._adicionar_log(f"  • Duração: {resultado['duracao']:.1f}s ({resultado['linhas']} linhas de saída)")
+        
+        etapas = resultado["etapas"]
+        if etapas:
+            em_cache = sum(1 for etapa in etapas if etapa["em_cache"])
+            self._adicionar_log(f"  • Etapas: {len(etapas)} ({em_cache} em cache)")
+            for etapa in sorted(etapas, key=lambda e: e["duracao"], reverse=True)[:3]:
+                if etapa["duracao"] >= 0.1:
+                    self._adicionar_log(f"    - {etapa['duracao']:.1f}s {etapa['nome'][:80]}")
+        
+        try:
+            HistoricoBuilds(self.settings.obter_arquivo_database()).registrar(tipo, comando, resultado)
+        except Exception as e:
+            self._adicionar_log(f"  ⚠️ Não foi possível guardar os tempos do build: {e}")
+        return resultado
+    
     def _fazer_build_producao(self) -> bool:
         """
         Faz build da imagem de produção.
         
+        No modo incremental (planka.build_incremental), o build é saltado se o
+        código e os Dockerfiles não mudaram desde o último build bem-sucedido;
+        caso contrário usa a cache de camadas, e só recorre à limpeza dos
+        diretórios e a --no-cache se esse build falhar.
+        
         Returns:
             True se sucesso, False caso contrário
         """
@@ -567,14 +726,6 @@ class ProductionManager:
                 self._adicionar_log("  ❌ Verificação de integridade falhou")
                 return False
             
-            # Limpar arquivos corrompidos antes do build
-            self._limpar_arquivos_corrompidos()
-
-            comando = ["docker-compose", "-f", "docker-compose-local.yml", "build", "--no-cache"]
-            self._adicionar_log(f"  • Comando completo: {' '.join(comando)}")
-            self._adicionar_log(f"  • Diretório de trabalho: {self.planka_dir}")
-            self._adicionar_log(f"  • Timeout configurado: 300 segundos (5 minutos)")
-            
             # Verificar se o arquivo docker-compose-local.yml existe
             arquivo_compose = self.planka_dir / "docker-compose-local.yml"
             if not arquivo_compose.exists():
@@ -593,30 +744,45 @@ class ProductionManager:
             except Exception as e:
                 self._adicionar_log(f"  ⚠️ Não foi possível verificar espaço em disco: {e}")
             
-            self._adicionar_log("  • Executando comando de build...")
-            result = subprocess.run(
-                comando,
-                cwd=self.planka_dir,
-                capture_output=True,
-                text=True,
-                timeout=300,  # 5 minutos
-                encoding='utf-8', errors='replace'
-            )
+            if not self.settings.obter("planka", "build_incremental", True):
+                # Build completo: limpar e reconstruir todas as camadas
+                self._limpar_arquivos_corrompidos()
+                if self._executar_build(sem_cache=True):
+                    self._adicionar_log("  ✅ Build concluído com sucesso")
+                    return True
+                self._adicionar_log("  ❌ Erro no build")
+                return False
             
-            self._adicionar_log(f"  • Código de retorno: {result.returncode}")
-            self._adicionar_log(f"  • Tamanho da saída stdout: {len(result.stdout)} caracteres")
-            self._adicionar_log(f"  • Tamanho da saída stderr: {len(result.stderr)} caracteres")
+            build_incremental = self._obter_build_incremental()
+            inicio = time.monotonic()
+            impressao = build_incremental.calcular_impressao()
+            self._adicionar_log(f"  • Impressão digital do código: {impressao[:16]} "
+                                f"({time.monotonic() - inicio:.1f}s)")
             
-            if result.returncode == 0:
-                self._adicionar_log("  ✅ Build concluído com sucesso")
+            if build_incremental.build_atualizado(impressao):
+                self._adicionar_log("  ✅ Código sem alterações desde o último build - build não necessário")
                 return True
-            else:
-                self._adicionar_log("  ❌ Erro no build")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            self._adicionar_log("  ⏰ Timeout no build após 5 minutos")
+            
+            inicio = time.monotonic()
+            if self._executar_build(sem_cache=False):
+                build_incremental.registrar_build(impressao, time.monotonic() - inicio, sem_cache=False)
+                self._adicionar_log(f"  ✅ Build incremental concluído em {time.monotonic() - inicio:.1f}s")
+                return True
+            
+            # Recurso: limpar os diretórios e reconstruir sem cache
+            self._adicionar_log("  ⚠️ Build com cache falhou - a tentar build completo sem cache")
+            build_incremental.invalidar()
+            self._limpar_arquivos_corrompidos()
+            inicio = time.monotonic()
+            if self._executar_build(sem_cache=True):
+                build_incremental.registrar_build(build_incremental.calcular_impressao(),
+                                                  time.monotonic() - inicio, sem_cache=True)
+                self._adicionar_log(f"  ✅ Build completo concluído em {time.monotonic() - inicio:.1f}s")
+                return True
+            
+            self._adicionar_log("  ❌ Erro no build")
             return False
+                
         except Exception as e:
             self._adicionar_log(f"  ❌ Erro inesperado no build: {e}")
             return False
@@ -634,7 +800,6 @@ class ProductionManager:
             comando = ["docker-compose", "-f", "docker-compose-local.yml", "up", "-d"]
             self._adicionar_log(f"  • Comando completo: {' '.join(comando)}")
             self._adicionar_log(f"  • Diretório de trabalho: {self.planka_dir}")
-            self._adicionar_log(f"  • Timeout configurado: 60 segundos")
             
             # Verificar status dos containers antes de iniciar
             self._adicionar_log("  • Verificando status dos containers antes da inicialização...")
@@ -650,27 +815,16 @@ class ProductionManager:
                 self._adicionar_log(f"  ⚠️ Aviso: {containers_rodando} container(s) já está(ão) rodando")
             
             self._adicionar_log("  • Executando comando de inicialização...")
-            result = subprocess.run(
-                comando,
-                cwd=self.planka_dir,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                encoding='utf-8', errors='replace'
+            resultado = self._executar_em_streaming(
+                "up", comando, None,
+                self.settings.obter("planka", "timeout_inatividade_up", 60)
             )
             
-            self._adicionar_log(f"  • Código de retorno: {result.returncode}")
-            self._adicionar_log(f"  • Tamanho da saída stdout: {len(result.stdout)} caracteres")
-            self._adicionar_log(f"  • Tamanho da saída stderr: {len(result.stderr)} caracteres")
-            
-            if result.returncode == 0:
+            if resultado["returncode"] == 0:
                 self._adicionar_log("  ✅ Comando de inicialização executado com sucesso")
                 
-                # Aguardar um pouco para os containers inicializarem
-                self._adicionar_log("  • Aguardando 3 segundos para containers inicializarem...")
-                time.sleep(3)
-                
-                # Verificar status dos containers após inicialização
+                # Verificar status dos containers após inicialização (a espera pela
+                # prontidão é feita a seguir, em executar_producao_com_modificacoes_locais)
                 self._adicionar_log("  • Verificando status dos containers após inicialização...")
                 containers_depois = status_monitor.verificar_containers_ativos()
                 for container, ativo in containers_depois.items():
@@ -688,9 +842,6 @@ class ProductionManager:
                 self._adicionar_log("  ❌ Erro ao executar comando de inicialização")
                 return False
                 
-        except subprocess.TimeoutExpired:
-            self._adicionar_log("  ⏰ Timeout ao iniciar containers após 60 segundos")
-            return False
         except Exception as e:
             self._adicionar_log(f"  ❌ Erro inesperado ao iniciar containers: {e}")
             return False
@@ -715,7 +866,7 @@ class ProductionManager:
             from .status_monitor import StatusMonitor
             status_monitor = StatusMonitor(self.settings)
             containers_ativos = status_monitor.verificar_containers_ativos()
-            if not containers_ativos.get("planka", False):
+            if not containers_ativos.get("producao", False):
                 self._adicionar_log("  ⚠️ Container planka não está rodando")
                 self._adicionar_log("  • Não é possível criar admin user sem o container ativo")
                 return False
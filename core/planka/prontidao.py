@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Espera pela prontidão do Planka depois de iniciar os containers.
+Em vez de esperas fixas, verifica por ordem o estado e o healthcheck dos
+containers, o pg_isready do PostgreSQL e a resposta HTTP do Planka, com
+intervalos crescentes até um prazo. Os eventos do Docker (start, die,
+health_status) interrompem a espera para que a verificação seguinte seja
+imediata.
+"""
+
+import time
+import threading
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+
+class EsperaProntidao:
+    """
+    Espera até que a stack de um docker-compose do Planka esteja pronta.
+    """
+
+    def __init__(self, settings, arquivo_compose: str = "docker-compose.yml"):
+        """
+        Inicializa a espera.
+
+        Args:
+            settings: Instância das configurações do sistema
+            arquivo_compose: docker-compose da stack
+        """
+        self.settings = settings
+        self.planka_dir = Path(settings.obter("planka", "diretorio"))
+        self.planka_url = settings.obter("planka", "url")
+        self.arquivo_compose = arquivo_compose
+        self.prazo = settings.obter("planka", "timeout_prontidao", 180)
+        self.intervalo_inicial = settings.obter("planka", "intervalo_prontidao_inicial", 0.5)
+        self.intervalo_maximo = settings.obter("planka", "intervalo_prontidao_maximo", 5)
+
+        self._tem_postgres = None
+        self.evento = threading.Event()
+        self.processo_eventos = None
+
+    def _compose(self, *argumentos, timeout: float = 10) -> subprocess.CompletedProcess:
+        """Executa um subcomando do docker-compose da stack."""
+        return subprocess.run(
+            ["docker-compose", "-f", self.arquivo_compose, *argumentos],
+            cwd=self.planka_dir,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            encoding='utf-8', errors='replace'
+        )
+
+    def _iniciar_eventos(self):
+        """Acompanha os eventos dos containers para acordar a espera."""
+        try:
+            self.processo_eventos = subprocess.Popen(
+                ["docker", "events", "--filter", "type=container",
+                 "--filter", "event=start", "--filter", "event=die",
+                 "--filter", "event=health_status", "--format", "{{.Status}}"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8', errors='replace'
+            )
+        except Exception as e:
+            print(f"Erro ao acompanhar eventos do Docker: {e}")
+            return
+
+        def ler():
+            """Cada evento acorda a espera em curso."""
+            for _ in self.processo_eventos.stdout:
+                self.evento.set()
+
+        threading.Thread(target=ler, daemon=True).start()
+
+    def _parar_eventos(self):
+        """Termina o acompanhamento dos eventos."""
+        if self.processo_eventos is not None:
+            try:
+                self.processo_eventos.kill()
+                self.processo_eventos.wait(timeout=5)
+            except Exception:
+                pass
+            self.processo_eventos = None
+
+    def estado_containers(self) -> List[Dict[str, Any]]:
+        """
+        Estado e healthcheck dos containers da stack.
+
+        Returns:
+            Lista com nome, estado ("running", "exited", ...), saude ("healthy",
+            "starting", "unhealthy" ou "" sem healthcheck) e reinicios
+        """
+        result = self._compose("ps", "-q")
+        ids = result.stdout.split() if result.returncode == 0 else []
+        if not ids:
+            return []
+
+        result = subprocess.run(
+            ["docker", "inspect", "--format",
+             "{{.Name}}|{{.State.Status}}|{{if .State.Health}}{{.State.Health.Status}}{{end}}|{{.RestartCount}}",
+             *ids],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            encoding='utf-8', errors='replace'
+        )
+        containers = []
+        for linha in result.stdout.splitlines():
+            partes = linha.split("|")
+            if len(partes) == 4:
+                containers.append({
+                    "nome": partes[0].lstrip("/"),
+                    "estado": partes[1],
+                    "saude": partes[2],
+                    "reinicios": int(partes[3]) if partes[3].isdigit() else 0
+                })
+        return containers
+
+    def _verificar_containers(self) -> Optional[str]:
+        """None se todos os containers estão a correr e saudáveis, senão o motivo."""
+        containers = self.estado_containers()
+        if not containers:
+            return "nenhum container da stack encontrado"
+        pendentes = [f"{c['nome']} ({c['saude'] or c['estado']})" for c in containers
+                     if c["estado"] != "running" or c["saude"] not in ("", "healthy")]
+        return f"a aguardar {', '.join(pendentes)}" if pendentes else None
+
+    def _verificar_postgres(self) -> Optional[str]:
+        """None se o PostgreSQL aceita ligações (ou se a stack não o tem)."""
+        if self._tem_postgres is None:
+            servicos = self._compose("config", "--services")
+            self._tem_postgres = servicos.returncode != 0 or "postgres" in servicos.stdout.split()
+        if not self._tem_postgres:
+            return None
+        result = self._compose("exec", "-T", "postgres", "pg_isready", "-U", "postgres")
+        if result.returncode == 0:
+            return None
+        return f"pg_isready: {(result.stdout or result.stderr).strip() or result.returncode}"
+
+    def _verificar_http(self) -> Optional[str]:
+        """None se o Planka responde com 200."""
+        try:
+            response = requests.get(
+                self.planka_url,
+                timeout=3,
+                headers={'User-Agent': 'Dashboard-Planka-Manager'}
+            )
+        except requests.RequestException as e:
+            return f"HTTP: {type(e).__name__}"
+        return None if response.status_code == 200 else f"HTTP {response.status_code}"
+
+    def aguardar(self, prazo: Optional[float] = None,
+                 ao_progresso: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Espera até a stack estar pronta ou o prazo terminar.
+
+        As verificações são feitas por ordem (containers, PostgreSQL, HTTP) e
+        cada uma, depois de passar, não volta a ser repetida.
+
+        Args:
+            prazo: Segundos máximos de espera (None para planka.timeout_prontidao)
+            ao_progresso: Chamado com uma mensagem quando uma etapa fica pronta
+
+        Returns:
+            Dict com pronto, tempo_ate_pronto (segundos), etapas (segundos até
+            cada verificação passar), tentativas e motivo (o que faltava, se
+            não ficou pronto)
+        """
+        prazo = self.prazo if prazo is None else prazo
+        verificacoes = [
+            ("containers", self._verificar_containers),
+            ("postgres", self._verificar_postgres),
+            ("http", self._verificar_http)
+        ]
+        etapas = {}
+        tentativas = 0
+        motivo = None
+        intervalo = self.intervalo_inicial
+        inicio = time.monotonic()
+
+        self._iniciar_eventos()
+        try:
+            while True:
+                tentativas += 1
+                while verificacoes:
+                    nome, verificar = verificacoes[0]
+                    try:
+                        motivo = verificar()
+                    except Exception as e:
+                        motivo = f"{nome}: {e}"
+                    if motivo is not None:
+                        break
+                    etapas[nome] = round(time.monotonic() - inicio, 2)
+                    verificacoes.pop(0)
+                    # Etapa nova: voltar aos intervalos curtos
+                    intervalo = self.intervalo_inicial
+                    if ao_progresso:
+                        ao_progresso(f"{nome} pronto em {etapas[nome]:.1f}s")
+
+                if not verificacoes:
+                    break
+                restante = prazo - (time.monotonic() - inicio)
+                if restante <= 0:
+                    break
+                self.evento.clear()
+                self.evento.wait(min(intervalo, restante))
+                intervalo = min(intervalo * 2, self.intervalo_maximo)
+        finally:
+            self._parar_eventos()
+
+        pronto = not verificacoes
+        return {
+            "pronto": pronto,
+            "tempo_ate_pronto": round(time.monotonic() - inicio, 2) if pronto else None,
+            "etapas": etapas,
+            "tentativas": tentativas,
+            "motivo": None if pronto else motivo
+        }
+
+    def aguardar_parada(self, prazo: float = 30) -> bool:
+        """
+        Espera até não haver containers da stack a correr.
+
+        Args:
+            prazo: Segundos máximos de espera
+
+        Returns:
+            True se a stack parou dentro do prazo
+        """
+        intervalo = self.intervalo_inicial
+        limite = time.monotonic() + prazo
+        while True:
+            try:
+                if not any(c["estado"] == "running" for c in self.estado_containers()):
+                    return True
+            except Exception as e:
+                print(f"Erro ao verificar paragem dos containers: {e}")
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return False
+            time.sleep(min(intervalo, restante))
+            intervalo = min(intervalo * 2, self.intervalo_maximo)
@@ -10,6 +10,35 @@ from typing import Dict, List
 from pathlib import Path
 
 
+def modos_ativos(linhas: List[str]) -> Dict[str, bool]:
+    """
+    Determina os modos ativos a partir das linhas de estado dos containers.
+    
+    Serve tanto para a saída do docker-compose ps local como para o
+    "docker ps" executado nos servidores remotos.
+    
+    Args:
+        linhas: Linhas com o nome e o estado de cada container
+        
+    Returns:
+        Dict com status de cada modo
+    """
+    producao = server_rodando = client_rodando = False
+    for linha in linhas:
+        if "Up" not in linha:
+            continue
+        if "planka-personalizado-planka-1" in linha:
+            producao = True
+        elif "planka-personalizado-planka-server-1" in linha:
+            server_rodando = True
+        elif "planka-personalizado-planka-client-1" in linha:
+            client_rodando = True
+    return {
+        "producao": producao,
+        "desenvolvimento": server_rodando and client_rodando
+    }
+
+
 class StatusMonitor:
     """
     Monitor de status do sistema Planka.
@@ -148,11 +177,7 @@ class StatusMonitor:
             
             if resultado_prod.returncode == 0:
                 # Verificar se o container planka está rodando
-                linhas_prod = resultado_prod.stdout.strip().split('\n')
-                for linha in linhas_prod:
-                    if "planka-personalizado-planka-1" in linha and "Up" in linha:
-                        status["producao"] = True
-                        break
+                status["producao"] = modos_ativos(resultado_prod.stdout.strip().split('\n'))["producao"]
             
             # Verificar containers de desenvolvimento
             resultado_dev = subprocess.run(
@@ -166,18 +191,7 @@ class StatusMonitor:
             
             if resultado_dev.returncode == 0:
                 # Verificar se os containers específicos do desenvolvimento estão rodando
-                linhas_dev = resultado_dev.stdout.strip().split('\n')
-                server_rodando = False
-                client_rodando = False
-                
-                for linha in linhas_dev:
-                    if "planka-personalizado-planka-server-1" in linha and "Up" in linha:
-                        server_rodando = True
-                    elif "planka-personalizado-planka-client-1" in linha and "Up" in linha:
-                        client_rodando = True
-                
-                if server_rodando and client_rodando:
-                    status["desenvolvimento"] = True
+                status["desenvolvimento"] = modos_ativos(resultado_dev.stdout.strip().split('\n'))["desenvolvimento"]
                     
         except Exception as e:
             print(f"Erro ao verificar containers ativos: {e}")
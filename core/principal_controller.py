@@ -68,6 +68,10 @@ class PrincipalController:
             # Planka Manager
             self.planka_manager = self.PlankaManager(self.settings)
             
+            # Ingestão dos logs dos containers em background
+            if self.settings.obter("planka", "ingestao_logs", True):
+                self.planka_manager.iniciar_ingestao_logs(getattr(self.log_manager, "logs_avancado", None))
+            
             # Diagnostic Manager
             self.diagnostic_manager = self.DiagnosticManager(self.settings, self.planka_manager)
             
@@ -246,6 +250,14 @@ class PrincipalController:
         except Exception as e:
             self._callback_adicionar_log(f"Erro ao atualizar status: {str(e)}", "error")
     
+    def definir_servidores_manager(self, servidores_manager):
+        """Inclui os servidores remotos no status exibido."""
+        try:
+            self.status_checker.definir_servidores_manager(servidores_manager)
+            self.status_monitor._atualizar_status_manual()
+        except Exception as e:
+            print(f"Erro ao definir servidores remotos: {str(e)}")
+    
     def parar_monitoramento(self):
         """Para o monitoramento automático."""
         try:
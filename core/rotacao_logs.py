@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Rotação de arquivos de log por dia e por tamanho.
+Segmentos rodados são comprimidos em background e registados num índice de períodos.
+"""
+
+import os
+import re
+import json
+import gzip
+import queue
+import shutil
+import logging
+import datetime
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# {tipo}_{YYYY-MM-DD}.log (ativo) ou {tipo}_{YYYY-MM-DD}.{n}.log[.gz] (segmento rodado)
+_PADRAO_ARQUIVO = re.compile(r"^(?P<tipo>.+)_(?P<data>\d{4}-\d{2}-\d{2})(?:\.(?P<seq>\d+))?\.log(?P<gz>\.gz)?$")
+
+
+def analisar_nome_log(arquivo: Path) -> Optional[Tuple[str, str, int, bool]]:
+    """
+    Extrai tipo, data, sequência e compressão do nome de um arquivo de log.
+
+    Args:
+        arquivo: Arquivo de log
+
+    Returns:
+        (tipo, data, sequencia, comprimido) ou None se o nome não for de log.
+        O arquivo ativo do dia tem sequência 0 e é ordenado depois dos segmentos.
+    """
+    correspondencia = _PADRAO_ARQUIVO.match(arquivo.name)
+    if not correspondencia:
+        return None
+    sequencia = int(correspondencia.group("seq")) if correspondencia.group("seq") else 0
+    return (correspondencia.group("tipo"), correspondencia.group("data"),
+            sequencia, bool(correspondencia.group("gz")))
+
+
+def listar_arquivos_log(diretorio: Path, tipo: str) -> List[Path]:
+    """
+    Lista arquivos ativos e segmentos de um tipo por ordem cronológica.
+
+    Quando um segmento existe comprimido e por comprimir (compressão em curso),
+    só a versão por comprimir é devolvida.
+
+    Args:
+        diretorio: Diretório de logs
+        tipo: Tipo de log
+
+    Returns:
+        Lista de arquivos, do mais antigo para o mais recente
+    """
+    if not diretorio.exists():
+        return []
+
+    arquivos = {}
+    for arquivo in diretorio.glob(f"{tipo}_*.log*"):
+        info = analisar_nome_log(arquivo)
+        if not info or info[0] != tipo:
+            continue
+        _, data, sequencia, comprimido = info
+        chave = (data, sequencia)
+        if chave not in arquivos or not comprimido:
+            arquivos[chave] = arquivo
+
+    # Dentro do mesmo dia: segmentos 1, 2, ... e por último o arquivo ativo (0)
+    return [arquivos[chave] for chave in sorted(arquivos, key=lambda c: (c[0], c[1] == 0, c[1]))]
+
+
+class IndiceSegmentos:
+    """
+    Índice persistente dos segmentos rodados de um tipo de log e dos seus períodos.
+    """
+
+    def __init__(self, diretorio: Path, tipo: str):
+        """
+        Inicializa o índice.
+
+        Args:
+            diretorio: Diretório de logs
+            tipo: Tipo de log
+        """
+        self.arquivo = diretorio / f"{tipo}_segmentos.json"
+        self.lock = threading.Lock()
+
+    def carregar(self) -> Dict[str, Dict]:
+        """Carrega o índice (nome do segmento sem .gz -> metadados)."""
+        try:
+            if self.arquivo.exists():
+                with open(self.arquivo, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Erro ao carregar índice de segmentos: {e}")
+        return {}
+
+    def _salvar(self, indice: Dict[str, Dict]):
+        """Grava o índice de forma atómica."""
+        temporario = self.arquivo.with_suffix(".json.tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(indice, f, indent=2, ensure_ascii=False)
+        os.replace(temporario, self.arquivo)
+
+    def atualizar(self, nome: str, **dados):
+        """Cria ou atualiza a entrada de um segmento."""
+        with self.lock:
+            indice = self.carregar()
+            indice.setdefault(nome, {}).update(dados)
+            self._salvar(indice)
+
+    def remover(self, nomes: List[str]):
+        """Remove entradas do índice."""
+        with self.lock:
+            indice = self.carregar()
+            alterado = False
+            for nome in nomes:
+                if indice.pop(nome, None) is not None:
+                    alterado = True
+            if alterado:
+                self._salvar(indice)
+
+    def periodo(self, arquivo: Path) -> Optional[Tuple[str, str]]:
+        """
+        Devolve (inicio, fim) de um segmento, se conhecido.
+
+        Args:
+            arquivo: Segmento (comprimido ou não)
+        """
+        nome = arquivo.name[:-3] if arquivo.name.endswith(".gz") else arquivo.name
+        entrada = self.carregar().get(nome)
+        if entrada and entrada.get("inicio") and entrada.get("fim"):
+            return entrada["inicio"], entrada["fim"]
+        return None
+
+
+class CompressorSegmentos:
+    """
+    Thread única que comprime segmentos rodados e aplica o limite de arquivos.
+    """
+
+    def __init__(self):
+        """Inicializa o compressor e a sua thread."""
+        self.fila = queue.Queue()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def agendar(self, segmento: Path, indice: IndiceSegmentos, max_arquivos: int):
+        """
+        Agenda a compressão de um segmento.
+
+        Args:
+            segmento: Segmento por comprimir
+            indice: Índice do tipo de log
+            max_arquivos: Máximo de segmentos a manter (0 = sem limite)
+        """
+        self.fila.put((segmento, indice, max_arquivos))
+
+    def aguardar(self):
+        """Bloqueia até todas as compressões agendadas terminarem."""
+        self.fila.join()
+
+    def _loop(self):
+        while True:
+            segmento, indice, max_arquivos = self.fila.get()
+            try:
+                self._comprimir(segmento, indice)
+                self._aplicar_limite(segmento.parent, indice, max_arquivos)
+            except Exception as e:
+                print(f"Erro ao comprimir segmento de log {segmento}: {e}")
+            finally:
+                self.fila.task_done()
+
+    def _comprimir(self, segmento: Path, indice: IndiceSegmentos):
+        """Comprime o segmento para .gz e remove o original."""
+        destino = segmento.with_name(segmento.name + ".gz")
+        temporario = segmento.with_name(segmento.name + ".gz.tmp")
+
+        with open(segmento, 'rb') as origem, gzip.open(temporario, 'wb') as gz:
+            shutil.copyfileobj(origem, gz, 1024 * 1024)
+
+        os.replace(temporario, destino)
+        segmento.unlink()
+        indice.atualizar(segmento.name, comprimido=True, tamanho_comprimido=destino.stat().st_size)
+
+    def _aplicar_limite(self, diretorio: Path, indice: IndiceSegmentos, max_arquivos: int):
+        """Remove os segmentos comprimidos mais antigos acima do limite."""
+        if not max_arquivos:
+            return
+
+        tipo = indice.arquivo.name[:-len("_segmentos.json")]
+        segmentos = [arquivo for arquivo in listar_arquivos_log(diretorio, tipo)
+                     if arquivo.name.endswith(".gz")]
+
+        excedentes = segmentos[:-max_arquivos] if len(segmentos) > max_arquivos else []
+        for arquivo in excedentes:
+            try:
+                arquivo.unlink()
+            except OSError as e:
+                print(f"Erro ao remover segmento antigo {arquivo}: {e}")
+        indice.remover([arquivo.name[:-3] for arquivo in excedentes])
+
+
+class ManipuladorRotativoDiario(logging.FileHandler):
+    """
+    Handler de arquivo com um arquivo por dia e rotação por tamanho.
+
+    Ao atingir o tamanho máximo, o arquivo do dia passa a segmento
+    ({tipo}_{data}.{n}.log), é registado no índice e comprimido em background.
+    """
+
+    def __init__(self, diretorio: Path, tipo: str, tamanho_maximo: int = 0,
+                 max_arquivos: int = 0, compressor: Optional[CompressorSegmentos] = None):
+        """
+        Inicializa o handler.
+
+        Args:
+            diretorio: Diretório de logs
+            tipo: Tipo de log (prefixo dos arquivos)
+            tamanho_maximo: Tamanho máximo do arquivo ativo em bytes (0 = sem limite)
+            max_arquivos: Máximo de segmentos comprimidos a manter (0 = sem limite)
+            compressor: Compressor partilhado; sem ele os segmentos ficam por comprimir
+        """
+        self.diretorio = diretorio
+        self.tipo = tipo
+        self.tamanho_maximo = tamanho_maximo
+        self.max_arquivos = max_arquivos
+        self.compressor = compressor
+        self.indice = IndiceSegmentos(diretorio, tipo)
+        self.data_atual = datetime.date.today()
+        self.ultimo_registo = None
+        super().__init__(self._caminho_ativo(self.data_atual), encoding='utf-8')
+
+    def _caminho_ativo(self, data: datetime.date) -> Path:
+        return self.diretorio / f"{self.tipo}_{data}.log"
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            data = datetime.date.fromtimestamp(record.created)
+            if data != self.data_atual:
+                self._trocar_dia(data)
+            elif self.tamanho_maximo and self.stream is not None:
+                if self.stream.tell() >= self.tamanho_maximo:
+                    self._rodar()
+        except Exception:
+            self.handleError(record)
+            return
+
+        super().emit(record)
+        self.ultimo_registo = record.created
+
+    def _fechar_stream(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+    def _trocar_dia(self, data: datetime.date):
+        """Passa a escrever no arquivo do novo dia."""
+        self._fechar_stream()
+        self.data_atual = data
+        self.baseFilename = os.path.abspath(self._caminho_ativo(data))
+        self.ultimo_registo = None
+        self.stream = self._open()
+
+    def _proxima_sequencia(self) -> int:
+        sequencias = []
+        for arquivo in listar_arquivos_log(self.diretorio, self.tipo):
+            _, data, sequencia, _ = analisar_nome_log(arquivo)
+            if data == str(self.data_atual):
+                sequencias.append(sequencia)
+        return max(sequencias, default=0) + 1
+
+    def _inicio_arquivo(self, caminho: Path) -> str:
+        """Lê o timestamp da primeira linha do arquivo."""
+        with open(caminho, 'r', encoding='utf-8', errors='replace') as f:
+            return f.readline()[:19]
+
+    def _rodar(self):
+        """Fecha o arquivo ativo, transforma-o em segmento e abre um novo."""
+        self._fechar_stream()
+        ativo = Path(self.baseFilename)
+        segmento = ativo.with_name(f"{self.tipo}_{self.data_atual}.{self._proxima_sequencia()}.log")
+
+        if ativo.exists():
+            inicio = self._inicio_arquivo(ativo)
+            os.replace(ativo, segmento)
+
+            fim = datetime.datetime.fromtimestamp(self.ultimo_registo) if self.ultimo_registo else datetime.datetime.now()
+            self.indice.atualizar(
+                segmento.name,
+                data=str(self.data_atual),
+                inicio=inicio,
+                fim=fim.strftime("%Y-%m-%d %H:%M:%S"),
+                tamanho=segmento.stat().st_size,
+                comprimido=False
+            )
+
+            if self.compressor:
+                self.compressor.agendar(segmento, self.indice, self.max_arquivos)
+
+        self.stream = self._open()
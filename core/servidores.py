@@ -6,15 +6,26 @@ Controla conexões, execução de comandos e pool de conexões.
 
 import os
 import json
-import sqlite3
+import math
+import atexit
+import codecs
+import fnmatch
+import select
+import socket
+import tempfile
 import threading
 import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
-from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Any
+from datetime import datetime, timedelta
 import paramiko
 from cryptography.fernet import Fernet
 
+from .armazenamento import obter_banco
+
 
 class ServidorSSH:
     """
@@ -24,7 +35,7 @@ class ServidorSSH:
     def __init__(self, id: int = None, nome: str = "", host: str = "", 
                  porta: int = 22, usuario: str = "", senha: str = "", 
                  chave_privada: str = "", timeout: int = 30, 
-                 descricao: str = "", ativo: bool = True):
+                 descricao: str = "", ativo: bool = True, grupos: str = ""):
         """
         Inicializa um servidor SSH.
         
@@ -39,6 +50,7 @@ class ServidorSSH:
             timeout: Timeout da conexão em segundos
             descricao: Descrição do servidor
             ativo: Se o servidor está ativo
+            grupos: Grupos/etiquetas separados por vírgula (ex: "producao, web")
         """
         self.id = id
         self.nome = nome
@@ -50,6 +62,7 @@ class ServidorSSH:
         self.timeout = timeout
         self.descricao = descricao
         self.ativo = ativo
+        self.grupos = grupos
         self.data_criacao = datetime.now()
         self.data_modificacao = datetime.now()
     
@@ -66,6 +79,7 @@ class ServidorSSH:
             "timeout": self.timeout,
             "descricao": self.descricao,
             "ativo": self.ativo,
+            "grupos": self.grupos,
             "data_criacao": self.data_criacao.isoformat(),
             "data_modificacao": self.data_modificacao.isoformat()
         }
@@ -83,29 +97,394 @@ class ServidorSSH:
             chave_privada=data.get("chave_privada", ""),
             timeout=data.get("timeout", 30),
             descricao=data.get("descricao", ""),
-            ativo=data.get("ativo", True)
+            ativo=data.get("ativo", True),
+            grupos=data.get("grupos", "")
         )
+    
+    def obter_grupos(self) -> List[str]:
+        """Lista os grupos do servidor (sem espaços, em minúsculas)."""
+        return [g.strip().lower() for g in (self.grupos or "").split(",") if g.strip()]
+
+
+class TransportCronometrado(paramiko.Transport):
+    """Transport que mede a duração da troca de chaves (kex)."""
+    
+    duracao_kex = None
+    
+    def start_client(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().start_client(*args, **kwargs)
+        finally:
+            self.duracao_kex = time.perf_counter() - inicio
+
+
+class LatenciasSSH:
+    """
+    Tempos de cada etapa das conexões e comandos SSH, por servidor.
+    
+    Guarda as últimas amostras de cada etapa (dns, tcp, kex, autenticacao,
+    canal, execucao) e as contagens de acertos/falhas do pool.
+    """
+    
+    ETAPAS = ("dns", "tcp", "kex", "autenticacao", "canal", "execucao")
+    
+    def __init__(self, max_amostras: int = 500):
+        """
+        Inicializa o registo.
+        
+        Args:
+            max_amostras: Amostras mantidas por servidor e etapa
+        """
+        self.max_amostras = max_amostras
+        self.amostras = {}  # servidor_id -> etapa -> deque de segundos
+        self.pool = {}      # servidor_id -> [acertos, falhas]
+        self.lock = threading.Lock()
+    
+    def registrar(self, servidor_id: int, etapa: str, duracao: Optional[float]):
+        """Acrescenta uma amostra (em segundos) de uma etapa."""
+        if duracao is None:
+            return
+        with self.lock:
+            etapas = self.amostras.setdefault(servidor_id, {})
+            amostras = etapas.get(etapa)
+            if amostras is None:
+                amostras = etapas[etapa] = deque(maxlen=self.max_amostras)
+            amostras.append(duracao)
+    
+    def registrar_pool(self, servidor_id: int, acerto: bool):
+        """Conta um pedido ao pool (conexão reutilizada ou nova)."""
+        with self.lock:
+            contagem = self.pool.setdefault(servidor_id, [0, 0])
+            contagem[0 if acerto else 1] += 1
+    
+    @staticmethod
+    def _percentil(ordenadas: List[float], percentil: float) -> float:
+        """Percentil pelo método do posto mais próximo."""
+        indice = max(0, min(len(ordenadas) - 1, math.ceil(percentil / 100 * len(ordenadas)) - 1))
+        return ordenadas[indice]
+    
+    def resumo(self, servidor_id: int) -> Dict[str, Any]:
+        """
+        Resumo de um servidor.
+        
+        Returns:
+            Dict com "etapas" (n, média, p50, p90, p99 e máximo em ms por etapa)
+            e "pool" (acertos, falhas e taxa de acerto)
+        """
+        with self.lock:
+            etapas = {etapa: sorted(amostras) for etapa, amostras in self.amostras.get(servidor_id, {}).items()}
+            acertos, falhas = self.pool.get(servidor_id, (0, 0))
+        
+        resumo_etapas = {}
+        for etapa in self.ETAPAS:
+            ordenadas = etapas.get(etapa)
+            if not ordenadas:
+                continue
+            resumo_etapas[etapa] = {
+                "n": len(ordenadas),
+                "media_ms": round(sum(ordenadas) / len(ordenadas) * 1000, 2),
+                "p50_ms": round(self._percentil(ordenadas, 50) * 1000, 2),
+                "p90_ms": round(self._percentil(ordenadas, 90) * 1000, 2),
+                "p99_ms": round(self._percentil(ordenadas, 99) * 1000, 2),
+                "max_ms": round(ordenadas[-1] * 1000, 2),
+            }
+        
+        pedidos = acertos + falhas
+        return {
+            "etapas": resumo_etapas,
+            "pool": {
+                "acertos": acertos,
+                "falhas": falhas,
+                "taxa_acerto": round(acertos / pedidos * 100, 1) if pedidos else None
+            }
+        }
+    
+    def servidores(self) -> List[int]:
+        """IDs dos servidores com amostras ou pedidos ao pool."""
+        with self.lock:
+            return sorted(set(self.amostras) | set(self.pool))
+
+
+class CacheComandosSSH:
+    """
+    Cache dos resultados de comandos remotos só de leitura, por servidor e comando.
+    
+    Só são guardados os comandos que correspondem a um dos padrões configurados
+    (ex.: "uname*", "df*", "docker ps*"), cada um com o seu TTL, e que não
+    tenham operadores de shell. O número de entradas é limitado (LRU).
+    """
+    
+    CARACTERES_SHELL = set(";|&<>`$\n\\")
+    
+    def __init__(self, ttl_por_padrao: Dict[str, float], max_entradas: int = 256):
+        """
+        Inicializa o cache.
+        
+        Args:
+            ttl_por_padrao: Padrão (fnmatch) do comando -> TTL em segundos
+            max_entradas: Máximo de resultados guardados
+        """
+        self.ttl_por_padrao = dict(ttl_por_padrao)
+        self.max_entradas = max_entradas
+        self.entradas = OrderedDict()  # (servidor_id, comando) -> (expira, instante, resultado)
+        self.acertos = 0
+        self.falhas = 0
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def normalizar(comando: str) -> str:
+        """Comando com os espaços normalizados (a chave do cache)."""
+        return " ".join(comando.split())
+    
+    def ttl(self, comando: str) -> Optional[float]:
+        """
+        TTL de um comando.
+        
+        Returns:
+            Segundos, ou None se o comando não puder ser guardado
+        """
+        comando = self.normalizar(comando)
+        if not comando or self.CARACTERES_SHELL & set(comando):
+            return None
+        for padrao, ttl in self.ttl_por_padrao.items():
+            if fnmatch.fnmatchcase(comando, padrao):
+                return ttl if ttl > 0 else None
+        return None
+    
+    def obter(self, servidor_id: int, comando: str) -> Optional[Tuple[Tuple[bool, str, str, str], float]]:
+        """
+        Resultado guardado de um comando.
+        
+        Returns:
+            (resultado, idade em segundos) ou None se não houver ou tiver expirado
+        """
+        chave = (servidor_id, self.normalizar(comando))
+        agora = time.monotonic()
+        with self.lock:
+            entrada = self.entradas.get(chave)
+            if entrada is None or entrada[0] <= agora:
+                if entrada is not None:
+                    del self.entradas[chave]
+                self.falhas += 1
+                return None
+            self.entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada[2], agora - entrada[1]
+    
+    def guardar(self, servidor_id: int, comando: str, resultado: Tuple[bool, str, str, str]):
+        """Guarda o resultado de um comando, se o comando tiver TTL."""
+        ttl = self.ttl(comando)
+        if ttl is None:
+            return
+        agora = time.monotonic()
+        chave = (servidor_id, self.normalizar(comando))
+        with self.lock:
+            self.entradas[chave] = (agora + ttl, agora, resultado)
+            self.entradas.move_to_end(chave)
+            while len(self.entradas) > self.max_entradas:
+                self.entradas.popitem(last=False)
+    
+    def invalidar(self, servidor_id: Optional[int] = None):
+        """
+        Descarta os resultados guardados.
+        
+        Args:
+            servidor_id: Servidor a descartar (None para todos)
+        """
+        with self.lock:
+            if servidor_id is None:
+                self.entradas.clear()
+                return
+            for chave in [c for c in self.entradas if c[0] == servidor_id]:
+                del self.entradas[chave]
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        """Entradas, acertos, falhas e taxa de acerto do cache."""
+        with self.lock:
+            pedidos = self.acertos + self.falhas
+            return {
+                "entradas": len(self.entradas),
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / pedidos * 100, 1) if pedidos else None
+            }
+
+
+class SaidaComando:
+    """
+    Acumula a saída de um fluxo (stdout ou stderr) com limite de memória.
+    
+    Acima do limite, a saída completa passa a ser escrita num arquivo
+    temporário e só o início fica em memória. O arquivo é apagado quando o
+    acumulador é descartado.
+    """
+    
+    # Pasta dos arquivos de excedente
+    PASTA_EXCEDENTE = Path(tempfile.gettempdir()) / "dashboard_ssh"
+    
+    def __init__(self, nome: str, limite_bytes: int, excedente_em_arquivo: bool = True):
+        """
+        Inicializa o acumulador.
+        
+        Args:
+            nome: Nome do fluxo ("stdout" ou "stderr")
+            limite_bytes: Bytes mantidos em memória
+            excedente_em_arquivo: Guardar a saída completa em arquivo ao passar o limite
+        """
+        self.nome = nome
+        self.limite_bytes = limite_bytes
+        self.excedente_em_arquivo = excedente_em_arquivo
+        self.dados = bytearray()
+        self.total_bytes = 0
+        self.arquivo = None
+        self.caminho = None
+        self.decodificador = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    
+    def escrever(self, dados: bytes) -> str:
+        """
+        Acrescenta um bloco recebido.
+        
+        Args:
+            dados: Bytes recebidos do canal
+            
+        Returns:
+            O bloco decodificado (para entrega imediata)
+        """
+        self.total_bytes += len(dados)
+        
+        if self.arquivo is None and self.total_bytes > self.limite_bytes and self.excedente_em_arquivo:
+            self.PASTA_EXCEDENTE.mkdir(parents=True, exist_ok=True)
+            self.arquivo = tempfile.NamedTemporaryFile(
+                mode='wb', dir=self.PASTA_EXCEDENTE, prefix=f"{self.nome}_", suffix=".log", delete=False
+            )
+            self.caminho = self.arquivo.name
+            self.arquivo.write(self.dados)
+        
+        if self.arquivo is not None:
+            self.arquivo.write(dados)
+        
+        livre = self.limite_bytes - len(self.dados)
+        if livre > 0:
+            self.dados += dados[:livre]
+        
+        return self.decodificador.decode(dados)
+    
+    def fechar(self):
+        """Fecha o arquivo de excedente, se existir."""
+        if self.arquivo is not None:
+            self.arquivo.close()
+            self.arquivo = None
+    
+    def descartar(self):
+        """Fecha e apaga o arquivo de excedente, se existir."""
+        self.fechar()
+        if self.caminho:
+            try:
+                os.remove(self.caminho)
+            except OSError:
+                pass
+            self.caminho = None
+    
+    def __del__(self):
+        try:
+            self.descartar()
+        except Exception:
+            pass
+    
+    @classmethod
+    def limpar_excedentes(cls):
+        """Apaga os arquivos de excedente deixados por execuções anteriores."""
+        try:
+            for arquivo in cls.PASTA_EXCEDENTE.glob("*.log"):
+                try:
+                    arquivo.unlink()
+                except OSError:
+                    pass
+        except Exception as e:
+            print(f"Erro ao limpar saídas de comandos em {cls.PASTA_EXCEDENTE}: {e}")
+    
+    @property
+    def truncado(self) -> bool:
+        """Indica se parte da saída ficou fora da memória."""
+        return self.total_bytes > len(self.dados)
+    
+    def texto(self) -> str:
+        """Texto guardado em memória, com a indicação de truncagem."""
+        texto = self.dados.decode('utf-8', errors='ignore')
+        if self.truncado:
+            texto += f"\n... saída truncada ({self.total_bytes} bytes no total)\n"
+        return texto
 
 
 class ConexaoSSH:
     """
     Classe para gerenciar uma conexão SSH individual.
+    
+    Uma única sessão autenticada (paramiko.Transport) é partilhada por vários
+    comandos em simultâneo, cada um no seu canal exec; só a abertura de canais
+    é serializada.
     """
     
-    def __init__(self, servidor: ServidorSSH):
+    # Tamanho dos blocos lidos do canal
+    TAMANHO_BLOCO = 32768
+    
+    def __init__(self, servidor: ServidorSSH, max_canais: int = 8,
+                 limite_saida_bytes: int = 1024 * 1024, excedente_em_arquivo: bool = True,
+                 keepalive: int = 30, latencias: Optional[LatenciasSSH] = None):
         """
         Inicializa uma conexão SSH.
         
         Args:
             servidor: Servidor SSH para conectar
+            max_canais: Máximo de canais (comandos) simultâneos nesta conexão
+            limite_saida_bytes: Saída de cada fluxo mantida em memória por comando
+            excedente_em_arquivo: Guardar em arquivo a saída que passe o limite
+            keepalive: Intervalo dos pacotes keepalive em segundos (0 desativa)
+            latencias: Registo onde guardar os tempos de cada etapa (opcional)
         """
         self.servidor = servidor
         self.client = None
-        self.shell = None
+        self.transport = None
         self.conectado = False
         self.data_conexao = None
         self.ultima_atividade = None
         self.lock = threading.Lock()
+        self.lock_canais = threading.Lock()
+        self.max_canais = max_canais
+        self.canais = threading.BoundedSemaphore(max_canais)
+        self.canais_abertos = 0
+        self.reservas = 0  # Utilizadores atuais (obtidos do pool e ainda não devolvidos)
+        self.limite_saida_bytes = limite_saida_bytes
+        self.excedente_em_arquivo = excedente_em_arquivo
+        self.keepalive = keepalive
+        self.latencias = latencias
+    
+    def _medir(self, etapa: str, duracao: Optional[float]):
+        """Regista o tempo de uma etapa, se houver registo de latências."""
+        if self.latencias is not None:
+            self.latencias.registrar(self.servidor.id, etapa, duracao)
+    
+    def _abrir_socket(self) -> socket.socket:
+        """Resolve o nome e abre a ligação TCP, medindo cada etapa."""
+        inicio = time.perf_counter()
+        enderecos = socket.getaddrinfo(self.servidor.host, self.servidor.porta, type=socket.SOCK_STREAM)
+        self._medir("dns", time.perf_counter() - inicio)
+        
+        erro = None
+        for familia, tipo, protocolo, _, endereco in enderecos:
+            sock = socket.socket(familia, tipo, protocolo)
+            sock.settimeout(self.servidor.timeout)
+            inicio = time.perf_counter()
+            try:
+                sock.connect(endereco)
+            except OSError as e:
+                sock.close()
+                erro = e
+                continue
+            self._medir("tcp", time.perf_counter() - inicio)
+            return sock
+        raise erro or OSError(f"Não foi possível resolver {self.servidor.host}")
     
     def conectar(self) -> Tuple[bool, str]:
         """
@@ -117,7 +496,12 @@ class ConexaoSSH:
         try:
             with self.lock:
                 if self.conectado:
-                    return True, "Já conectado"
+                    if self.transport is not None and self.transport.is_active():
+                        return True, "Já conectado"
+                    # Sessão caiu: descartar e voltar a ligar
+                    self.client.close()
+                    self.conectado = False
+                    self.transport = None
                 
                 # Criar cliente SSH
                 self.client = paramiko.SSHClient()
@@ -141,12 +525,25 @@ class ConexaoSSH:
                 else:
                     return False, "Nenhum método de autenticação configurado"
                 
-                # Estabelecer conexão
+                # Estabelecer conexão (DNS e TCP à parte, para medir cada etapa)
+                connect_kwargs["sock"] = self._abrir_socket()
+                connect_kwargs["transport_factory"] = TransportCronometrado
+                inicio = time.perf_counter()
                 self.client.connect(**connect_kwargs)
+                duracao_ssh = time.perf_counter() - inicio
+                self.transport = self.client.get_transport()
+                
+                duracao_kex = getattr(self.transport, "duracao_kex", None)
+                self._medir("kex", duracao_kex)
+                self._medir("autenticacao", duracao_ssh - duracao_kex if duracao_kex is not None else None)
                 
-                # Criar shell interativo
-                self.shell = self.client.invoke_shell()
-                self.shell.settimeout(self.servidor.timeout)
+                # Keepalives detetam sessões mortas enquanto a conexão está ociosa no pool
+                if self.keepalive:
+                    self.transport.set_keepalive(self.keepalive)
+                    try:
+                        self.transport.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                    except (OSError, AttributeError):
+                        pass
                 
                 self.conectado = True
                 self.data_conexao = datetime.now()
@@ -165,53 +562,144 @@ class ConexaoSSH:
         """Fecha a conexão SSH."""
         try:
             with self.lock:
-                if self.shell:
-                    self.shell.close()
                 if self.client:
                     self.client.close()
                 
                 self.conectado = False
-                self.shell = None
+                self.transport = None
                 self.client = None
                 
         except Exception as e:
             print(f"Erro ao desconectar: {e}")
     
-    def executar_comando(self, comando: str) -> Tuple[bool, str, str, str]:
+    def esta_ativa(self) -> bool:
+        """Indica se a sessão SSH continua aberta."""
+        transport = self.transport
+        return self.conectado and transport is not None and transport.is_active()
+    
+    def _abrir_canal(self) -> paramiko.Channel:
+        """
+        Abre um canal de sessão na conexão partilhada (serializado).
+        
+        Se a sessão tiver caído desde a última utilização, volta a ligar uma
+        vez de forma transparente antes de desistir.
+        """
+        with self.lock_canais:
+            try:
+                if not self.esta_ativa():
+                    raise paramiko.SSHException("Sessão SSH não está ativa")
+                canal = self.transport.open_session(timeout=self.servidor.timeout)
+            except (paramiko.SSHException, EOFError, OSError):
+                sucesso, mensagem = self.conectar()
+                if not sucesso:
+                    raise paramiko.SSHException(mensagem)
+                canal = self.transport.open_session(timeout=self.servidor.timeout)
+        canal.settimeout(self.servidor.timeout)
+        return canal
+    
+    def executar_comando(self, comando: str, timeout: Optional[float] = None,
+                         callback: Optional[Callable[[str, str], None]] = None) -> Tuple[bool, str, str, str]:
         """
         Executa um comando no servidor SSH.
         
+        Vários comandos podem correr ao mesmo tempo, cada um no seu canal, até
+        max_canais; acima disso esperam por um canal livre. O stdout e o stderr
+        são lidos à medida que chegam (sem encher a janela do canal) e
+        entregues ao callback em blocos.
+        
         Args:
             comando: Comando a executar
+            timeout: Tempo máximo de execução em segundos (None = sem limite)
+            callback: Chamado com (fluxo, texto) para cada bloco recebido,
+                sendo fluxo "stdout" ou "stderr"
             
         Returns:
             (sucesso, stdout, stderr, mensagem)
         """
         try:
-            with self.lock:
-                if not self.conectado:
-                    return False, "", "", "Não conectado"
-                
-                # Executar comando
-                stdin, stdout, stderr = self.client.exec_command(comando, timeout=self.servidor.timeout)
-                
-                # Aguardar conclusão
-                exit_status = stdout.channel.recv_exit_status()
-                
-                # Ler saída
-                stdout_text = stdout.read().decode('utf-8', errors='ignore')
-                stderr_text = stderr.read().decode('utf-8', errors='ignore')
-                
-                self.ultima_atividade = datetime.now()
-                
-                if exit_status == 0:
-                    return True, stdout_text, stderr_text, "Comando executado com sucesso"
-                else:
-                    return False, stdout_text, stderr_text, f"Comando falhou com código {exit_status}"
+            if not self.conectado:
+                return False, "", "", "Não conectado"
+            
+            stdout = SaidaComando("stdout", self.limite_saida_bytes, self.excedente_em_arquivo)
+            stderr = SaidaComando("stderr", self.limite_saida_bytes, self.excedente_em_arquivo)
+            
+            with self.canais:
+                inicio = time.perf_counter()
+                canal = self._abrir_canal()
+                self._medir("canal", time.perf_counter() - inicio)
+                with self.lock_canais:
+                    self.canais_abertos += 1
+                try:
+                    inicio = time.perf_counter()
+                    canal.exec_command(comando)
+                    concluido = self._ler_saida(canal, stdout, stderr, timeout, callback)
+                    exit_status = canal.recv_exit_status() if concluido else None
+                    if concluido:
+                        self._medir("execucao", time.perf_counter() - inicio)
+                finally:
+                    canal.close()
+                    stdout.descartar()
+                    stderr.descartar()
+                    with self.lock_canais:
+                        self.canais_abertos -= 1
+            
+            self.ultima_atividade = datetime.now()
+            
+            if exit_status is None:
+                return False, stdout.texto(), stderr.texto(), f"Tempo limite de {timeout}s excedido"
+            elif exit_status == 0:
+                return True, stdout.texto(), stderr.texto(), "Comando executado com sucesso"
+            else:
+                return False, stdout.texto(), stderr.texto(), f"Comando falhou com código {exit_status}"
                 
         except Exception as e:
             return False, "", "", f"Erro ao executar comando: {str(e)}"
     
+    def _ler_saida(self, canal: paramiko.Channel, stdout: SaidaComando, stderr: SaidaComando,
+                   timeout: Optional[float], callback: Optional[Callable[[str, str], None]]) -> bool:
+        """
+        Lê stdout e stderr em simultâneo até o comando terminar.
+        
+        Returns:
+            True se o comando terminou, False se o tempo limite foi excedido
+        """
+        limite = time.monotonic() + timeout if timeout else None
+        
+        while True:
+            # Verificado a cada volta: um comando que não pára de escrever
+            # (yes, tail -f, docker logs -f) também tem de expirar
+            if limite is not None and time.monotonic() >= limite:
+                canal.close()
+                return False
+            
+            recebido = False
+            
+            if canal.recv_ready():
+                dados = canal.recv(self.TAMANHO_BLOCO)
+                if dados:
+                    recebido = True
+                    texto = stdout.escrever(dados)
+                    if callback and texto:
+                        callback("stdout", texto)
+            
+            if canal.recv_stderr_ready():
+                dados = canal.recv_stderr(self.TAMANHO_BLOCO)
+                if dados:
+                    recebido = True
+                    texto = stderr.escrever(dados)
+                    if callback and texto:
+                        callback("stderr", texto)
+            
+            if recebido:
+                continue
+            
+            # O estado de saída chega depois de todos os dados do canal
+            if canal.exit_status_ready() and not canal.recv_ready() and not canal.recv_stderr_ready():
+                return True
+            
+            # Esperar por mais dados (o fileno do canal fica pronto ao receber stdout, stderr ou o fim)
+            select.select([canal], [], [], 0.1)
+    
     def testar_conexao(self) -> Tuple[bool, str]:
         """
         Testa a conectividade com o servidor.
@@ -242,20 +730,41 @@ class ConexaoSSH:
 class PoolConexoesSSH:
     """
     Pool de conexões SSH para reutilização.
+    
+    As conexões ficam ordenadas da menos para a mais recentemente usada.
+    Cada conexão obtida fica reservada até ser devolvida (usar_conexao ou
+    devolver_conexao); ao atingir o limite só é fechada a menos recentemente
+    usada sem reservas, e se estiverem todas em uso o pedido espera que uma
+    seja devolvida.
     """
     
-    def __init__(self, max_conexoes: int = 5, timeout_idle: int = 300):
+    def __init__(self, max_conexoes: int = 5, timeout_idle: int = 300, max_canais_por_host: int = 8,
+                 limite_saida_bytes: int = 1024 * 1024, excedente_em_arquivo: bool = True,
+                 keepalive: int = 30, timeout_espera: float = 30):
         """
         Inicializa o pool de conexões.
         
         Args:
             max_conexoes: Número máximo de conexões simultâneas
             timeout_idle: Timeout para conexões ociosas (segundos)
+            max_canais_por_host: Comandos simultâneos por servidor (canais na mesma sessão)
+            limite_saida_bytes: Saída de cada fluxo mantida em memória por comando
+            excedente_em_arquivo: Guardar em arquivo a saída que passe o limite
+            keepalive: Intervalo dos keepalives SSH em segundos (0 desativa)
+            timeout_espera: Tempo máximo à espera de uma conexão livre com o pool cheio
         """
         self.max_conexoes = max_conexoes
+        self.timeout_espera = timeout_espera
         self.timeout_idle = timeout_idle
-        self.conexoes = {}  # servidor_id -> ConexaoSSH
+        self.max_canais_por_host = max_canais_por_host
+        self.limite_saida_bytes = limite_saida_bytes
+        self.excedente_em_arquivo = excedente_em_arquivo
+        self.keepalive = keepalive
+        self.latencias = LatenciasSSH()
+        self.conexoes = OrderedDict()  # servidor_id -> ConexaoSSH, da menos para a mais recente
         self.lock = threading.Lock()
+        self.livre = threading.Condition(self.lock)  # Avisada quando uma conexão é devolvida ou fechada
+        self.evento_limpeza = threading.Event()
         self.thread_limpeza = None
         self._iniciar_limpeza_automatica()
     
@@ -264,38 +773,71 @@ class PoolConexoesSSH:
         def limpeza_automatica():
             while True:
                 try:
-                    time.sleep(60)  # Verificar a cada minuto
-                    self._limpar_conexoes_ociosas()
+                    # Dormir até à próxima conexão expirar, em vez de verificar a intervalos fixos
+                    self.evento_limpeza.wait(self._limpar_conexoes_ociosas())
+                    self.evento_limpeza.clear()
                 except Exception as e:
                     print(f"Erro na limpeza automática: {e}")
+                    time.sleep(self.timeout_idle)
         
         self.thread_limpeza = threading.Thread(target=limpeza_automatica, daemon=True)
         self.thread_limpeza.start()
     
-    def _limpar_conexoes_ociosas(self):
-        """Remove conexões que estão ociosas há muito tempo."""
+    def _limpar_conexoes_ociosas(self) -> float:
+        """
+        Remove conexões que estão ociosas há muito tempo.
+        
+        Returns:
+            Segundos até a próxima conexão ficar ociosa
+        """
+        espera = self.timeout_idle
         try:
+            remover = []
             with self.lock:
                 agora = datetime.now()
-                servidores_remover = []
                 
                 for servidor_id, conexao in self.conexoes.items():
-                    if conexao.ultima_atividade:
-                        tempo_ocioso = (agora - conexao.ultima_atividade).total_seconds()
-                        if tempo_ocioso > self.timeout_idle:
-                            servidores_remover.append(servidor_id)
+                    if conexao.reservas or conexao.canais_abertos or not conexao.ultima_atividade:
+                        continue
+                    tempo_ocioso = (agora - conexao.ultima_atividade).total_seconds()
+                    if tempo_ocioso > self.timeout_idle or (conexao.conectado and not conexao.esta_ativa()):
+                        remover.append(conexao)
+                    else:
+                        espera = min(espera, self.timeout_idle - tempo_ocioso)
                 
-                for servidor_id in servidores_remover:
-                    self.conexoes[servidor_id].desconectar()
-                    del self.conexoes[servidor_id]
+                for conexao in remover:
+                    del self.conexoes[conexao.servidor.id]
+                if remover:
+                    self.livre.notify_all()
+            
+            for conexao in remover:
+                conexao.desconectar()
                     
         except Exception as e:
             print(f"Erro ao limpar conexões ociosas: {e}")
+        
+        return max(1.0, espera + 0.5)
+    
+    def _remover_menos_usada(self) -> bool:
+        """
+        Fecha a conexão menos recentemente usada que não esteja em uso (chamar com o lock).
+        
+        Returns:
+            True se alguma conexão foi fechada
+        """
+        for servidor_id, conexao in self.conexoes.items():
+            if not conexao.reservas and not conexao.canais_abertos:
+                self.conexoes.pop(servidor_id).desconectar()
+                return True
+        return False
     
     def obter_conexao(self, servidor: ServidorSSH) -> Tuple[bool, ConexaoSSH, str]:
         """
         Obtém uma conexão do pool ou cria uma nova.
         
+        A conexão devolvida fica reservada e tem de ser devolvida com
+        devolver_conexao depois de usada (ou usar usar_conexao).
+        
         Args:
             servidor: Servidor para conectar
             
@@ -304,38 +846,84 @@ class PoolConexoesSSH:
         """
         try:
             with self.lock:
-                # Verificar se já existe conexão
-                if servidor.id in self.conexoes:
-                    conexao = self.conexoes[servidor.id]
-                    if conexao.conectado:
-                        return True, conexao, "Conexão reutilizada"
-                    else:
-                        # Remover conexão inválida
-                        del self.conexoes[servidor.id]
-                
-                # Verificar limite de conexões
-                if len(self.conexoes) >= self.max_conexoes:
-                    # Remover conexão mais antiga
-                    servidor_mais_antigo = min(
-                        self.conexoes.keys(),
-                        key=lambda x: self.conexoes[x].data_conexao or datetime.min
-                    )
-                    self.conexoes[servidor_mais_antigo].desconectar()
-                    del self.conexoes[servidor_mais_antigo]
-                
-                # Criar nova conexão
-                conexao = ConexaoSSH(servidor)
-                sucesso, mensagem = conexao.conectar()
-                
-                if sucesso:
-                    self.conexoes[servidor.id] = conexao
-                    return True, conexao, mensagem
-                else:
-                    return False, None, mensagem
+                limite = time.monotonic() + self.timeout_espera
+                while True:
+                    # Verificar se já existe conexão
+                    conexao = self.conexoes.get(servidor.id)
+                    if conexao is not None:
+                        self.conexoes.move_to_end(servidor.id)
+                        conexao.reservas += 1
+                        if conexao.esta_ativa():
+                            conexao.ultima_atividade = datetime.now()
+                            self.latencias.registrar_pool(servidor.id, True)
+                            return True, conexao, "Conexão reutilizada"
+                        break
+                    
+                    # Verificar limite de conexões; com todas em uso, esperar por uma livre
+                    if len(self.conexoes) < self.max_conexoes or self._remover_menos_usada():
+                        # Reservar a entrada; pedidos simultâneos esperam pela mesma ligação
+                        conexao = ConexaoSSH(servidor, self.max_canais_por_host,
+                                             self.limite_saida_bytes, self.excedente_em_arquivo,
+                                             self.keepalive, self.latencias)
+                        conexao.reservas = 1
+                        self.conexoes[servidor.id] = conexao
+                        break
+                    
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        return False, None, (f"Pool de conexões cheio ({self.max_conexoes} conexões em uso) "
+                                             f"após {self.timeout_espera}s de espera")
+                    self.livre.wait(restante)
+            
+            self.latencias.registrar_pool(servidor.id, False)
+            
+            # Ligar (ou religar uma sessão morta) fora do lock do pool,
+            # para que servidores diferentes não se bloqueiem
+            sucesso, mensagem = conexao.conectar()
+            
+            if sucesso:
+                return True, conexao, mensagem
+            
+            with self.lock:
+                conexao.reservas -= 1
+                if self.conexoes.get(servidor.id) is conexao and not conexao.reservas:
+                    del self.conexoes[servidor.id]
+                self.livre.notify_all()
+            return False, None, mensagem
                     
         except Exception as e:
             return False, None, f"Erro ao obter conexão: {str(e)}"
     
+    def devolver_conexao(self, conexao: ConexaoSSH):
+        """
+        Devolve ao pool uma conexão obtida com obter_conexao.
+        
+        Args:
+            conexao: Conexão a devolver
+        """
+        with self.lock:
+            conexao.reservas = max(0, conexao.reservas - 1)
+            conexao.ultima_atividade = datetime.now()
+            self.livre.notify_all()
+    
+    @contextmanager
+    def usar_conexao(self, servidor: ServidorSSH):
+        """
+        Obtém uma conexão reservada durante o bloco with e devolve-a no fim.
+        
+        Args:
+            servidor: Servidor para conectar
+            
+        Yields:
+            (sucesso, conexao, mensagem), como obter_conexao
+        """
+        sucesso, conexao, mensagem = self.obter_conexao(servidor)
+        try:
+            yield sucesso, conexao, mensagem
+        finally:
+            if sucesso:
+                self.devolver_conexao(conexao)
+    
     def liberar_conexao(self, servidor_id: int):
         """Libera uma conexão do pool."""
         try:
@@ -343,6 +931,7 @@ class PoolConexoesSSH:
                 if servidor_id in self.conexoes:
                     self.conexoes[servidor_id].desconectar()
                     del self.conexoes[servidor_id]
+                    self.livre.notify_all()
         except Exception as e:
             print(f"Erro ao liberar conexão: {e}")
     
@@ -353,6 +942,7 @@ class PoolConexoesSSH:
                 for conexao in self.conexoes.values():
                     conexao.desconectar()
                 self.conexoes.clear()
+                self.livre.notify_all()
         except Exception as e:
             print(f"Erro ao fechar conexões: {e}")
 
@@ -360,6 +950,10 @@ class PoolConexoesSSH:
 class GerenciadorCredenciais:
     """
     Gerenciador seguro de credenciais SSH.
+    
+    As credenciais são lidas e descriptografadas uma única vez e mantidas em
+    memória (chaves sempre em texto, como no JSON); o arquivo só volta a ser
+    lido quando a data de modificação muda, e as gravações são atómicas.
     """
     
     def __init__(self, config_dir: Path):
@@ -372,6 +966,7 @@ class GerenciadorCredenciais:
         self.config_dir = config_dir
         self.credentials_file = config_dir / "ssh_credentials.json"
         self.key_file = config_dir / "ssh_key.key"
+        self.lock = threading.RLock()
         
         # Criar diretório se não existir
         self.config_dir.mkdir(parents=True, exist_ok=True)
@@ -381,6 +976,11 @@ class GerenciadorCredenciais:
             key = Fernet.generate_key()
             with open(self.key_file, 'wb') as f:
                 f.write(key)
+        
+        self._fernet = Fernet(self._get_encryption_key())
+        self._credenciais = {}  # id (str) -> entrada criptografada, como no arquivo
+        self._cofre = {}        # id (str) -> (senha, chave_privada) já descriptografadas
+        self._mtime = None
     
     def _get_encryption_key(self) -> bytes:
         """Obtém chave de criptografia."""
@@ -392,9 +992,7 @@ class GerenciadorCredenciais:
         if not value:
             return ""
         
-        key = self._get_encryption_key()
-        fernet = Fernet(key)
-        encrypted = fernet.encrypt(value.encode())
+        encrypted = self._fernet.encrypt(value.encode())
         return encrypted.decode()
     
     def _decrypt_value(self, encrypted_value: str) -> str:
@@ -403,32 +1001,59 @@ class GerenciadorCredenciais:
             return ""
         
         try:
-            key = self._get_encryption_key()
-            fernet = Fernet(key)
-            decrypted = fernet.decrypt(encrypted_value.encode())
+            decrypted = self._fernet.decrypt(encrypted_value.encode())
             return decrypted.decode()
         except Exception:
             return ""
     
+    def _mtime_arquivo(self) -> Optional[int]:
+        """Data de modificação do arquivo de credenciais (None se não existir)."""
+        try:
+            return self.credentials_file.stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    def _garantir_carregado(self):
+        """Recarrega o cofre se o arquivo mudou desde a última leitura."""
+        mtime = self._mtime_arquivo()
+        if mtime == self._mtime:
+            return
+        
+        credenciais = self._carregar_credenciais()
+        self._credenciais = credenciais
+        self._cofre = {
+            servidor_id: (self._decrypt_value(dados.get("senha", "")), dados.get("chave_privada", ""))
+            for servidor_id, dados in credenciais.items()
+        }
+        self._mtime = mtime
+    
+    def _gravar(self):
+        """Grava o arquivo de forma atómica (arquivo temporário + rename)."""
+        temporario = self.credentials_file.with_suffix(".tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self._credenciais, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.credentials_file)
+        self._mtime = self._mtime_arquivo()
+    
     def salvar_credenciais(self, servidor: ServidorSSH):
         """Salva credenciais de um servidor de forma criptografada."""
         try:
-            # Carregar credenciais existentes
-            credenciais = self._carregar_credenciais()
-            
-            # Criptografar senha
-            senha_criptografada = self._encrypt_value(servidor.senha)
-            
-            # Atualizar credenciais
-            credenciais[servidor.id] = {
-                "senha": senha_criptografada,
-                "chave_privada": servidor.chave_privada,
-                "data_modificacao": datetime.now().isoformat()
-            }
-            
-            # Salvar arquivo
-            with open(self.credentials_file, 'w', encoding='utf-8') as f:
-                json.dump(credenciais, f, indent=2, ensure_ascii=False)
+            with self.lock:
+                self._garantir_carregado()
+                chave = str(servidor.id)
+                
+                # Atualizar credenciais
+                self._credenciais[chave] = {
+                    "senha": self._encrypt_value(servidor.senha),
+                    "chave_privada": servidor.chave_privada,
+                    "data_modificacao": datetime.now().isoformat()
+                }
+                self._cofre[chave] = (servidor.senha or "", servidor.chave_privada or "")
+                
+                # Salvar arquivo
+                self._gravar()
                 
         except Exception as e:
             print(f"Erro ao salvar credenciais: {e}")
@@ -441,15 +1066,9 @@ class GerenciadorCredenciais:
             (senha_descriptografada, chave_privada)
         """
         try:
-            credenciais = self._carregar_credenciais()
-            
-            if servidor_id in credenciais:
-                dados = credenciais[servidor_id]
-                senha = self._decrypt_value(dados.get("senha", ""))
-                chave_privada = dados.get("chave_privada", "")
-                return senha, chave_privada
-            
-            return "", ""
+            with self.lock:
+                self._garantir_carregado()
+                return self._cofre.get(str(servidor_id), ("", ""))
             
         except Exception as e:
             print(f"Erro ao carregar credenciais: {e}")
@@ -460,7 +1079,7 @@ class GerenciadorCredenciais:
         try:
             if self.credentials_file.exists():
                 with open(self.credentials_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    return {str(chave): valor for chave, valor in json.load(f).items()}
             return {}
         except Exception:
             return {}
@@ -468,13 +1087,14 @@ class GerenciadorCredenciais:
     def remover_credenciais(self, servidor_id: int):
         """Remove credenciais de um servidor."""
         try:
-            credenciais = self._carregar_credenciais()
-            
-            if servidor_id in credenciais:
-                del credenciais[servidor_id]
+            with self.lock:
+                self._garantir_carregado()
+                chave = str(servidor_id)
                 
-                with open(self.credentials_file, 'w', encoding='utf-8') as f:
-                    json.dump(credenciais, f, indent=2, ensure_ascii=False)
+                if chave in self._credenciais:
+                    del self._credenciais[chave]
+                    self._cofre.pop(chave, None)
+                    self._gravar()
                     
         except Exception as e:
             print(f"Erro ao remover credenciais: {e}")
@@ -495,6 +1115,7 @@ class ServidoresManager:
         self.settings = settings
         self.db_file = Path(settings.obter("database", "arquivo"))
         self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.banco = obter_banco(self.db_file)
         
         # Inicializar componentes
         try:
@@ -505,16 +1126,55 @@ class ServidoresManager:
         self.credentials_manager = GerenciadorCredenciais(config_dir)
         self.pool_conexoes = PoolConexoesSSH(
             max_conexoes=settings.obter("servidores", "max_conexoes", 5),
-            timeout_idle=settings.obter("servidores", "timeout_idle", 300)
+            timeout_idle=settings.obter("servidores", "timeout_idle", 300),
+            max_canais_por_host=settings.obter("servidores", "max_canais_por_host", 8),
+            limite_saida_bytes=settings.obter("servidores", "limite_saida_kb", 1024) * 1024,
+            excedente_em_arquivo=settings.obter("servidores", "saida_excedente_em_arquivo", True),
+            keepalive=settings.obter("servidores", "keepalive", 30),
+            timeout_espera=settings.obter("servidores", "timeout_espera_conexao", 30)
         )
         
+        SaidaComando.limpar_excedentes()
+        
+        self.transferencias = None
+        self.coletor_metricas = None
+        self.status_remoto = None
+        
+        # Cache opcional dos comandos só de leitura (uname, df, docker ps, ...)
+        self.cache_comandos = None
+        if settings.obter("servidores", "cache_comandos", False):
+            self.cache_comandos = CacheComandosSSH(
+                settings.obter("servidores", "cache_comandos_ttl", {}),
+                settings.obter("servidores", "cache_comandos_max", 256)
+            )
+        
+        # Histórico de conexões gravado em lotes por uma thread própria
+        self.historico_pendente = []
+        self.historico_em_gravacao = []
+        # Ímpar enquanto um lote está a ser confirmado na base (ver _ler_com_pendentes)
+        self.versao_historico = 0
+        self.lock_historico = threading.Lock()
+        self.lock_gravacao = threading.Lock()
+        self.evento_historico = threading.Event()
+        self.intervalo_historico = settings.obter("servidores", "intervalo_historico", 2)
+        self.lote_historico = 200
+        
         # Inicializar banco de dados
         self._inicializar_banco()
+        
+        threading.Thread(target=self._gravar_historico_periodicamente, daemon=True).start()
+        atexit.register(self._descarregar_historico)
+        
+        if settings.obter("servidores", "pre_aquecer_conexoes", False):
+            self.pre_aquecer_conexoes()
+        
+        if settings.obter("servidores", "coletar_metricas", False):
+            self.iniciar_coleta_metricas()
     
     def _inicializar_banco(self):
         """Inicializa o banco de dados de servidores."""
         try:
-            with sqlite3.connect(self.db_file) as conn:
+            with self.banco.transacao() as conn:
                 cursor = conn.cursor()
                 
                 # Tabela de servidores
@@ -531,10 +1191,16 @@ class ServidoresManager:
                         descricao TEXT,
                         ativo BOOLEAN DEFAULT 1,
                         data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        data_modificacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        data_modificacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        grupos TEXT DEFAULT ''
                     )
                 """)
                 
+                # Bases anteriores sem a coluna de grupos
+                colunas = [coluna[1] for coluna in cursor.execute("PRAGMA table_info(servidores)")]
+                if "grupos" not in colunas:
+                    cursor.execute("ALTER TABLE servidores ADD COLUMN grupos TEXT DEFAULT ''")
+                
                 # Tabela de conexões
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS conexoes (
@@ -545,11 +1211,47 @@ class ServidoresManager:
                         status TEXT,
                         comando_executado TEXT,
                         resultado TEXT,
+                        duracao REAL,
                         FOREIGN KEY (servidor_id) REFERENCES servidores (id)
                     )
                 """)
                 
-                conn.commit()
+                colunas = [coluna[1] for coluna in cursor.execute("PRAGMA table_info(conexoes)")]
+                if "duracao" not in colunas:
+                    cursor.execute("ALTER TABLE conexoes ADD COLUMN duracao REAL")
+                
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_conexoes_servidor_data
+                    ON conexoes (servidor_id, data_conexao)
+                """)
+                
+                # Resumo diário por servidor, mantido a cada lote gravado
+                existia = cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='conexoes_diarias'"
+                ).fetchone()
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS conexoes_diarias (
+                        servidor_id INTEGER NOT NULL,
+                        dia TEXT NOT NULL,
+                        total INTEGER NOT NULL DEFAULT 0,
+                        falhas INTEGER NOT NULL DEFAULT 0,
+                        comandos_medidos INTEGER NOT NULL DEFAULT 0,
+                        duracao_total REAL NOT NULL DEFAULT 0,
+                        PRIMARY KEY (servidor_id, dia)
+                    ) WITHOUT ROWID
+                """)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_conexoes_diarias_dia ON conexoes_diarias (dia)")
+                
+                if not existia:
+                    # Construir o resumo a partir do histórico existente (uma única vez)
+                    cursor.execute("""
+                        INSERT INTO conexoes_diarias (servidor_id, dia, total, falhas, comandos_medidos, duracao_total)
+                        SELECT servidor_id, DATE(data_conexao), COUNT(*),
+                               SUM(status != 'sucesso'), COUNT(duracao), COALESCE(SUM(duracao), 0)
+                        FROM conexoes
+                        WHERE servidor_id IS NOT NULL
+                        GROUP BY servidor_id, DATE(data_conexao)
+                    """)
                 
         except Exception as e:
             print(f"Erro ao inicializar banco de servidores: {e}")
@@ -565,17 +1267,17 @@ class ServidoresManager:
             (sucesso, mensagem)
         """
         try:
-            with sqlite3.connect(self.db_file) as conn:
+            with self.banco.transacao() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
                     INSERT INTO servidores (nome, host, porta, usuario, senha, 
-                                          chave_privada, timeout, descricao, ativo)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                          chave_privada, timeout, descricao, ativo, grupos)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     servidor.nome, servidor.host, servidor.porta, servidor.usuario,
                     servidor.senha, servidor.chave_privada, servidor.timeout,
-                    servidor.descricao, servidor.ativo
+                    servidor.descricao, servidor.ativo, servidor.grupos
                 ))
                 
                 servidor.id = cursor.lastrowid
@@ -583,7 +1285,6 @@ class ServidoresManager:
                 # Salvar credenciais criptografadas
                 self.credentials_manager.salvar_credenciais(servidor)
                 
-                conn.commit()
                 return True, f"Servidor '{servidor.nome}' adicionado com sucesso"
                 
         except Exception as e:
@@ -600,24 +1301,25 @@ class ServidoresManager:
             (sucesso, mensagem)
         """
         try:
-            with sqlite3.connect(self.db_file) as conn:
+            with self.banco.transacao() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
                     UPDATE servidores 
                     SET nome=?, host=?, porta=?, usuario=?, senha=?, chave_privada=?,
-                        timeout=?, descricao=?, ativo=?, data_modificacao=CURRENT_TIMESTAMP
+                        timeout=?, descricao=?, ativo=?, grupos=?, data_modificacao=CURRENT_TIMESTAMP
                     WHERE id=?
                 """, (
                     servidor.nome, servidor.host, servidor.porta, servidor.usuario,
                     servidor.senha, servidor.chave_privada, servidor.timeout,
-                    servidor.descricao, servidor.ativo, servidor.id
+                    servidor.descricao, servidor.ativo, servidor.grupos, servidor.id
                 ))
                 
                 # Atualizar credenciais
                 self.credentials_manager.salvar_credenciais(servidor)
                 
-                conn.commit()
+                self.limpar_cache_comandos(servidor.id)
+                
                 return True, f"Servidor '{servidor.nome}' atualizado com sucesso"
                 
         except Exception as e:
@@ -634,7 +1336,7 @@ class ServidoresManager:
             (sucesso, mensagem)
         """
         try:
-            with sqlite3.connect(self.db_file) as conn:
+            with self.banco.transacao() as conn:
                 cursor = conn.cursor()
                 
                 # Verificar se existe
@@ -654,8 +1356,8 @@ class ServidoresManager:
                 
                 # Fechar conexão se estiver ativa
                 self.pool_conexoes.liberar_conexao(servidor_id)
+                self.limpar_cache_comandos(servidor_id)
                 
-                conn.commit()
                 return True, f"Servidor '{nome_servidor}' removido com sucesso"
                 
         except Exception as e:
@@ -671,12 +1373,12 @@ class ServidoresManager:
         servidores = []
         
         try:
-            with sqlite3.connect(self.db_file) as conn:
+            with self.banco.conexao() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
                     SELECT id, nome, host, porta, usuario, senha, chave_privada,
-                           timeout, descricao, ativo, data_criacao, data_modificacao
+                           timeout, descricao, ativo, data_criacao, data_modificacao, grupos
                     FROM servidores
                     ORDER BY nome
                 """)
@@ -692,7 +1394,8 @@ class ServidoresManager:
                         chave_privada=row[6] or "",
                         timeout=row[7],
                         descricao=row[8] or "",
-                        ativo=bool(row[9])
+                        ativo=bool(row[9]),
+                        grupos=row[12] or ""
                     )
                     
                     # Carregar credenciais criptografadas
@@ -718,12 +1421,12 @@ class ServidoresManager:
             Servidor ou None se não encontrado
         """
         try:
-            with sqlite3.connect(self.db_file) as conn:
+            with self.banco.conexao() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
                     SELECT id, nome, host, porta, usuario, senha, chave_privada,
-                           timeout, descricao, ativo, data_criacao, data_modificacao
+                           timeout, descricao, ativo, data_criacao, data_modificacao, grupos
                     FROM servidores
                     WHERE id=?
                 """, (servidor_id,))
@@ -741,7 +1444,8 @@ class ServidoresManager:
                         chave_privada=row[6] or "",
                         timeout=row[7],
                         descricao=row[8] or "",
-                        ativo=bool(row[9])
+                        ativo=bool(row[9]),
+                        grupos=row[12] or ""
                     )
                     
                     # Carregar credenciais criptografadas
@@ -772,92 +1476,646 @@ class ServidoresManager:
             if not servidor:
                 return False, "Servidor não encontrado"
             
-            conexao = ConexaoSSH(servidor)
+            conexao = ConexaoSSH(servidor, latencias=self.pool_conexoes.latencias)
             return conexao.testar_conexao()
             
         except Exception as e:
             return False, f"Erro ao testar conexão: {str(e)}"
     
-    def executar_comando(self, servidor_id: int, comando: str) -> Tuple[bool, str, str, str]:
+    def executar_comando(self, servidor_id: int, comando: str,
+                         callback: Optional[Callable[[str, str], None]] = None,
+                         timeout: Optional[float] = None,
+                         forcar: bool = False) -> Tuple[bool, str, str, str, bool]:
         """
         Executa um comando em um servidor.
         
+        Com o cache de comandos ativo, os comandos só de leitura configurados
+        devolvem o último resultado enquanto estiver dentro do TTL (em_cache
+        True e a idade do resultado na mensagem).
+        
         Args:
             servidor_id: ID do servidor
             comando: Comando a executar
+            callback: Recebe (fluxo, texto) à medida que a saída chega
+            timeout: Tempo máximo de execução em segundos (None = sem limite)
+            forcar: Ignorar o cache e executar no servidor
             
         Returns:
-            (sucesso, stdout, stderr, mensagem)
+            (sucesso, stdout, stderr, mensagem, em_cache)
         """
         try:
+            if self.cache_comandos is not None and not forcar and self.cache_comandos.ttl(comando) is not None:
+                guardado = self.cache_comandos.obter(servidor_id, comando)
+                if guardado is not None:
+                    (sucesso, stdout, stderr, mensagem), idade = guardado
+                    return sucesso, stdout, stderr, f"{mensagem} (em cache, há {int(idade)}s)", True
+            
             servidor = self.obter_servidor(servidor_id)
             if not servidor:
-                return False, "", "", "Servidor não encontrado"
+                return False, "", "", "Servidor não encontrado", False
             
-            # Obter conexão do pool
-            sucesso, conexao, msg = self.pool_conexoes.obter_conexao(servidor)
-            if not sucesso:
-                return False, "", "", f"Erro ao conectar: {msg}"
+            # Obter conexão do pool e executar comando
+            with self.pool_conexoes.usar_conexao(servidor) as (sucesso, conexao, msg):
+                if not sucesso:
+                    return False, "", "", f"Erro ao conectar: {msg}", False
+                inicio = time.monotonic()
+                resultado = conexao.executar_comando(comando, timeout, callback)
+            self.registrar_conexao(servidor_id, "sucesso" if resultado[0] else "erro",
+                                   comando, resultado[3], time.monotonic() - inicio)
             
-            # Executar comando
-            return conexao.executar_comando(comando)
+            if self.cache_comandos is not None:
+                if self.cache_comandos.ttl(comando) is None:
+                    # Um comando que não é só de leitura pode ter mudado o estado do servidor
+                    self.cache_comandos.invalidar(servidor_id)
+                elif resultado[0]:
+                    self.cache_comandos.guardar(servidor_id, comando, resultado)
+            return (*resultado, False)
             
         except Exception as e:
-            return False, "", "", f"Erro ao executar comando: {str(e)}"
+            return False, "", "", f"Erro ao executar comando: {str(e)}", False
+    
+    def limpar_cache_comandos(self, servidor_id: Optional[int] = None):
+        """
+        Descarta os resultados de comandos em cache.
+        
+        Args:
+            servidor_id: Servidor a descartar (None para todos)
+        """
+        if self.cache_comandos is not None:
+            self.cache_comandos.invalidar(servidor_id)
+    
+    def pre_aquecer_conexoes(self):
+        """
+        Abre em background as conexões dos servidores ativos.
+        
+        O primeiro comando num servidor já aquecido não paga o handshake nem a
+        autenticação. Limitado a max_conexoes servidores.
+        """
+        def aquecer():
+            try:
+                servidores = self.selecionar_servidores()[:self.pool_conexoes.max_conexoes]
+                if not servidores:
+                    return
+                def abrir(servidor):
+                    with self.pool_conexoes.usar_conexao(servidor) as (sucesso, _, mensagem):
+                        return sucesso, mensagem
+                
+                with ThreadPoolExecutor(max_workers=len(servidores), thread_name_prefix="ssh-aquecer") as executor:
+                    for servidor, (sucesso, mensagem) in zip(servidores, executor.map(abrir, servidores)):
+                        if not sucesso:
+                            print(f"Erro ao pré-aquecer conexão com {servidor.nome}: {mensagem}")
+            except Exception as e:
+                print(f"Erro ao pré-aquecer conexões: {e}")
+        
+        threading.Thread(target=aquecer, daemon=True).start()
     
-    def registrar_conexao(self, servidor_id: int, status: str, comando: str = "", resultado: str = ""):
-        """Registra uma conexão no banco de dados."""
+    def iniciar_coleta_metricas(self):
+        """Inicia a coleta periódica de métricas dos servidores ativos."""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
+            if self.coletor_metricas is None:
+                from .metricas_servidores import ColetorMetricas
+                self.coletor_metricas = ColetorMetricas(self, self.settings)
+            self.coletor_metricas.iniciar()
+        except Exception as e:
+            print(f"Erro ao iniciar coleta de métricas: {e}")
+    
+    def obter_metricas(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Últimas métricas coletadas de cada servidor.
+        
+        Returns:
+            Dict servidor_id -> métricas ({} se a coleta não estiver ativa)
+        """
+        if self.coletor_metricas is None:
+            return {}
+        return self.coletor_metricas.obter_ultimas()
+    
+    def obter_status_planka_remoto(self, servidor_id: Optional[int] = None,
+                                   forcar: bool = False) -> List[Dict[str, Any]]:
+        """
+        Obtém o status do Planka nos servidores ativos (um comando por servidor, com cache).
+        
+        Args:
+            servidor_id: Servidor a verificar (None para todos os ativos)
+            forcar: Ignorar o cache e verificar já
+            
+        Returns:
+            Lista de status no mesmo formato do StatusChecker, com servidor_id, servidor e host
+        """
+        try:
+            if self.status_remoto is None:
+                from .status_remoto import StatusRemotoPlanka
+                self.status_remoto = StatusRemotoPlanka(self, self.settings)
+            
+            servidores = self.selecionar_servidores([servidor_id] if servidor_id is not None else None)
+            return self.status_remoto.obter_status(servidores, forcar)
+        except Exception as e:
+            print(f"Erro ao obter status remoto do Planka: {e}")
+            return []
+    
+    def obter_latencias(self, servidor_id: int) -> Dict[str, Any]:
+        """
+        Obtém os tempos de cada etapa SSH de um servidor.
+        
+        Args:
+            servidor_id: ID do servidor
+            
+        Returns:
+            Dict com percentis por etapa e a taxa de acerto do pool
+        """
+        return self.pool_conexoes.latencias.resumo(servidor_id)
+    
+    def exportar_latencias(self, caminho) -> Tuple[bool, str]:
+        """
+        Exporta os tempos de todos os servidores em JSON ou CSV (pela extensão).
+        
+        Args:
+            caminho: Arquivo de destino (.json ou .csv)
+            
+        Returns:
+            (sucesso, mensagem)
+        """
+        try:
+            caminho = Path(caminho)
+            latencias = self.pool_conexoes.latencias
+            nomes = {servidor.id: servidor.nome for servidor in self.listar_servidores()}
+            resumos = {servidor_id: latencias.resumo(servidor_id) for servidor_id in latencias.servidores()}
+            
+            if caminho.suffix.lower() == ".csv":
+                import csv
+                with open(caminho, 'w', encoding='utf-8', newline='') as f:
+                    escritor = csv.writer(f)
+                    escritor.writerow(["servidor_id", "servidor", "etapa", "n", "media_ms",
+                                       "p50_ms", "p90_ms", "p99_ms", "max_ms",
+                                       "pool_acertos", "pool_falhas"])
+                    for servidor_id, resumo in resumos.items():
+                        for etapa, valores in resumo["etapas"].items():
+                            escritor.writerow([servidor_id, nomes.get(servidor_id, ""), etapa,
+                                               valores["n"], valores["media_ms"], valores["p50_ms"],
+                                               valores["p90_ms"], valores["p99_ms"], valores["max_ms"],
+                                               resumo["pool"]["acertos"], resumo["pool"]["falhas"]])
+            else:
+                dados = {
+                    "gerado_em": datetime.now().isoformat(),
+                    "servidores": [
+                        dict(resumo, servidor_id=servidor_id, servidor=nomes.get(servidor_id, ""))
+                        for servidor_id, resumo in resumos.items()
+                    ]
+                }
+                with open(caminho, 'w', encoding='utf-8') as f:
+                    json.dump(dados, f, indent=2, ensure_ascii=False)
+            
+            return True, f"Latências exportadas para {caminho}"
+            
+        except Exception as e:
+            return False, f"Erro ao exportar latências: {str(e)}"
+    
+    def listar_grupos(self) -> List[str]:
+        """
+        Lista os grupos usados pelos servidores.
+        
+        Returns:
+            Nomes dos grupos, ordenados
+        """
+        grupos = set()
+        try:
+            with self.banco.conexao() as conn:
+                for (valor,) in conn.execute("SELECT grupos FROM servidores WHERE grupos != ''"):
+                    grupos.update(g.strip().lower() for g in valor.split(",") if g.strip())
+        except Exception as e:
+            print(f"Erro ao listar grupos: {e}")
+        return sorted(grupos)
+    
+    def selecionar_servidores(self, servidores_ids: Optional[List[int]] = None,
+                              grupo: Optional[str] = None, apenas_ativos: bool = True) -> List[ServidorSSH]:
+        """
+        Seleciona os servidores alvo de uma execução em lote.
+        
+        Args:
+            servidores_ids: IDs dos servidores (None = todos)
+            grupo: Restringir aos servidores deste grupo
+            apenas_ativos: Ignorar servidores marcados como inativos
+            
+        Returns:
+            Lista de servidores
+        """
+        servidores = self.listar_servidores()
+        if servidores_ids is not None:
+            ids = set(servidores_ids)
+            servidores = [s for s in servidores if s.id in ids]
+        if grupo:
+            grupo = grupo.strip().lower()
+            servidores = [s for s in servidores if grupo in s.obter_grupos()]
+        if apenas_ativos:
+            servidores = [s for s in servidores if s.ativo]
+        return servidores
+    
+    def executar_em_lote(self, comando: str, servidores_ids: Optional[List[int]] = None,
+                         grupo: Optional[str] = None, max_paralelo: Optional[int] = None,
+                         timeout: Optional[float] = None, parar_na_falha: bool = False,
+                         callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Executa o mesmo comando em vários servidores em paralelo.
+        
+        O tempo total fica próximo do servidor mais lento em vez da soma de
+        todos. Com parar_na_falha, os servidores ainda não iniciados são
+        cancelados à primeira falha (os que já correm terminam normalmente).
+        
+        Args:
+            comando: Comando a executar
+            servidores_ids: IDs dos servidores alvo (None = todos os ativos)
+            grupo: Restringir aos servidores deste grupo
+            max_paralelo: Servidores em simultâneo (padrão: servidores.max_paralelo_lote;
+                limitado a servidores.max_conexoes)
+            timeout: Tempo máximo do comando em cada servidor (padrão: servidores.timeout_comando_lote)
+            parar_na_falha: Cancelar os restantes servidores à primeira falha
+            callback: Chamada com o resultado de cada servidor assim que termina
+            
+        Returns:
+            Dict com comando, totais (sucessos, falhas, cancelados), duração e
+            a lista de resultados por servidor
+        """
+        if max_paralelo is None:
+            max_paralelo = self.settings.obter("servidores", "max_paralelo_lote", 5)
+        # Mais trabalhadores do que conexões no pool só os deixaria à espera de uma conexão livre
+        max_paralelo = min(max_paralelo, self.pool_conexoes.max_conexoes)
+        if timeout is None:
+            timeout = self.settings.obter("servidores", "timeout_comando_lote", 300)
+        
+        servidores = self.selecionar_servidores(servidores_ids, grupo)
+        parar = threading.Event()
+        inicio = time.monotonic()
+        
+        def executar(servidor: ServidorSSH) -> Dict[str, Any]:
+            resultado = {
+                "servidor_id": servidor.id,
+                "nome": servidor.nome,
+                "host": servidor.host,
+                "sucesso": False,
+                "cancelado": False,
+                "stdout": "",
+                "stderr": "",
+                "mensagem": "",
+                "duracao": 0.0
+            }
+            if parar.is_set():
+                resultado["cancelado"] = True
+                resultado["mensagem"] = "Cancelado após falha noutro servidor"
+                return resultado
+            
+            inicio_servidor = time.monotonic()
+            with self.pool_conexoes.usar_conexao(servidor) as (sucesso, conexao, mensagem):
+                if sucesso:
+                    sucesso, stdout, stderr, mensagem = conexao.executar_comando(comando, timeout)
+                    resultado.update(stdout=stdout, stderr=stderr)
+                else:
+                    mensagem = f"Erro ao conectar: {mensagem}"
+            resultado.update(sucesso=sucesso, mensagem=mensagem,
+                             duracao=round(time.monotonic() - inicio_servidor, 3))
+            self.registrar_conexao(servidor.id, "sucesso" if sucesso else "erro",
+                                   comando, mensagem, resultado["duracao"])
+            if self.cache_comandos is not None and self.cache_comandos.ttl(comando) is None:
+                # Um comando que não é só de leitura pode ter mudado o estado do servidor
+                self.limpar_cache_comandos(servidor.id)
+            return resultado
+        
+        resultados = {}
+        if servidores:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_paralelo, len(servidores))),
+                                    thread_name_prefix="ssh-lote") as executor:
+                futuros = {executor.submit(executar, servidor): servidor for servidor in servidores}
+                for futuro in as_completed(futuros):
+                    servidor = futuros[futuro]
+                    try:
+                        resultado = futuro.result()
+                    except Exception as e:
+                        resultado = {
+                            "servidor_id": servidor.id, "nome": servidor.nome, "host": servidor.host,
+                            "sucesso": False, "cancelado": False, "stdout": "", "stderr": "",
+                            "mensagem": f"Erro ao executar comando: {str(e)}", "duracao": 0.0
+                        }
+                    resultados[servidor.id] = resultado
+                    
+                    if parar_na_falha and not resultado["sucesso"] and not resultado["cancelado"]:
+                        parar.set()
+                    
+                    if callback:
+                        try:
+                            callback(resultado)
+                        except Exception as e:
+                            print(f"Erro no callback de execução em lote: {e}")
+        
+        lista = [resultados[servidor.id] for servidor in servidores]
+        return {
+            "comando": comando,
+            "total": len(lista),
+            "sucessos": sum(1 for r in lista if r["sucesso"]),
+            "falhas": sum(1 for r in lista if not r["sucesso"] and not r["cancelado"]),
+            "cancelados": sum(1 for r in lista if r["cancelado"]),
+            "duracao": round(time.monotonic() - inicio, 3),
+            "resultados": lista
+        }
+    
+    def enviar_arquivo(self, servidor_id: int, origem, destino: str,
+                       callback: Optional[Callable[[int, int], None]] = None,
+                       cancelar: Optional[threading.Event] = None) -> Tuple[bool, str, Dict[str, Any]]:
+        """
+        Envia um arquivo para um servidor por SFTP em blocos paralelos.
+        
+        Args:
+            servidor_id: ID do servidor
+            origem: Arquivo local
+            destino: Caminho completo no servidor
+            callback: Recebe (bytes enviados, total) durante o envio
+            cancelar: Evento para interromper (a transferência pode ser retomada)
+            
+        Returns:
+            (sucesso, mensagem, dados da transferência)
+        """
+        try:
+            servidor = self.obter_servidor(servidor_id)
+            if not servidor:
+                return False, "Servidor não encontrado", {}
+            
+            if self.transferencias is None:
+                from .transferencias import TransferenciaSFTP
+                self.transferencias = TransferenciaSFTP(
+                    self.pool_conexoes,
+                    self.db_file.parent / "transferencias",
+                    tamanho_bloco=self.settings.obter("servidores", "bloco_transferencia_mb", 8) * 1024 * 1024,
+                    canais=self.settings.obter("servidores", "canais_transferencia", 4)
+                )
+            
+            sucesso, mensagem, dados = self.transferencias.enviar(servidor, origem, destino, callback, cancelar)
+            # O arquivo enviado (mesmo que só em parte) pode mudar o que os comandos em cache mostram
+            self.limpar_cache_comandos(servidor_id)
+            self.registrar_conexao(servidor_id, "sucesso" if sucesso else "erro",
+                                   f"sftp {origem} -> {destino}", mensagem, dados.get("duracao"))
+            return sucesso, mensagem, dados
+            
+        except Exception as e:
+            return False, f"Erro ao enviar arquivo: {str(e)}", {}
+    
+    def registrar_conexao(self, servidor_id: int, status: str, comando: str = "", resultado: str = "",
+                          duracao: Optional[float] = None):
+        """
+        Regista uma conexão/comando no histórico.
+        
+        O registo fica em memória e é gravado no próximo lote (a cada
+        servidores.intervalo_historico segundos ou ao juntar lote_historico
+        registos), juntamente com o resumo diário do servidor.
+        
+        Args:
+            servidor_id: ID do servidor
+            status: "sucesso" ou outro estado (conta como falha)
+            comando: Comando executado
+            resultado: Mensagem do resultado
+            duracao: Duração em segundos (opcional)
+        """
+        # Mesmo formato e fuso (UTC) do CURRENT_TIMESTAMP do SQLite
+        instante = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        with self.lock_historico:
+            self.historico_pendente.append((servidor_id, instante, status, comando, resultado, duracao))
+            cheio = len(self.historico_pendente) >= self.lote_historico
+        if cheio:
+            self.evento_historico.set()
+    
+    def _gravar_historico_periodicamente(self):
+        """Grava os registos pendentes em lotes (corre numa thread própria)."""
+        while True:
+            self.evento_historico.wait(self.intervalo_historico)
+            self.evento_historico.clear()
+            self._descarregar_historico()
+    
+    def _descarregar_historico(self):
+        """Grava numa única transação os registos pendentes e atualiza o resumo diário."""
+        with self.lock_gravacao:
+            with self.lock_historico:
+                pendentes, self.historico_pendente = self.historico_pendente, []
+                self.historico_em_gravacao = pendentes
+            if not pendentes:
+                return
+            
+            try:
+                self._gravar_historico(pendentes)
+            finally:
+                with self.lock_historico:
+                    self.historico_em_gravacao = []
+                    self.versao_historico += 1 if self.versao_historico % 2 else 2
+    
+    def _gravar_historico(self, pendentes: List[tuple]):
+        """Insere um lote de registos no histórico e no resumo diário."""
+        try:
+            with self.banco.transacao() as conn:
+                conn.executemany("""
+                    INSERT INTO conexoes (servidor_id, data_conexao, status, comando_executado, resultado, duracao)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, pendentes)
                 
-                cursor.execute("""
-                    INSERT INTO conexoes (servidor_id, status, comando_executado, resultado)
-                    VALUES (?, ?, ?, ?)
-                """, (servidor_id, status, comando, resultado))
+                conn.executemany("""
+                    INSERT INTO conexoes_diarias (servidor_id, dia, total, falhas, comandos_medidos, duracao_total)
+                    VALUES (?, ?, 1, ?, ?, ?)
+                    ON CONFLICT (servidor_id, dia) DO UPDATE SET
+                        total = total + 1,
+                        falhas = falhas + excluded.falhas,
+                        comandos_medidos = comandos_medidos + excluded.comandos_medidos,
+                        duracao_total = duracao_total + excluded.duracao_total
+                """, [
+                    (servidor_id, instante[:10], int(status != "sucesso"),
+                     int(duracao is not None), duracao or 0.0)
+                    for servidor_id, instante, status, _, _, duracao in pendentes
+                ])
                 
-                conn.commit()
+                # O commit vem a seguir: os leitores esperam que termine
+                with self.lock_historico:
+                    self.versao_historico += 1
                 
         except Exception as e:
             print(f"Erro ao registrar conexão: {e}")
     
+    def _ler_com_pendentes(self, ler: Callable[[], Any]) -> Tuple[Any, List[tuple]]:
+        """
+        Lê da base sem forçar a gravação dos registos ainda em memória.
+        
+        Devolve também esses registos, para o leitor os juntar ao resultado. Se
+        um lote for confirmado durante a leitura, esta é repetida, para nenhum
+        registo ficar contado duas vezes ou nenhuma.
+        
+        Args:
+            ler: Consulta à base
+            
+        Returns:
+            (resultado da consulta, registos por gravar)
+        """
+        for _ in range(50):
+            with self.lock_historico:
+                versao = self.versao_historico
+                memoria = self.historico_em_gravacao + self.historico_pendente
+            if versao % 2 == 0:
+                resultado = ler()
+                with self.lock_historico:
+                    if self.versao_historico == versao:
+                        return resultado, memoria
+            time.sleep(0.01)
+        return ler(), []
+    
+    def obter_historico_conexoes(self, servidor_id: Optional[int] = None, inicio: Optional[datetime] = None,
+                                 fim: Optional[datetime] = None, limite: int = 100) -> List[Dict[str, Any]]:
+        """
+        Obtém o histórico de conexões num intervalo de datas.
+        
+        Args:
+            servidor_id: Restringir a um servidor (opcional)
+            inicio: Início do intervalo em UTC (inclusive)
+            fim: Fim do intervalo em UTC (exclusive)
+            limite: Número máximo de registos
+            
+        Returns:
+            Registos do mais recente para o mais antigo
+        """
+        # Comparações diretas com a coluna, para usar o índice (servidor_id, data_conexao)
+        desde = inicio.strftime("%Y-%m-%d %H:%M:%S") if inicio is not None else None
+        ate = fim.strftime("%Y-%m-%d %H:%M:%S") if fim is not None else None
+        condicoes, parametros = [], []
+        if servidor_id is not None:
+            condicoes.append("servidor_id = ?")
+            parametros.append(servidor_id)
+        if desde is not None:
+            condicoes.append("data_conexao >= ?")
+            parametros.append(desde)
+        if ate is not None:
+            condicoes.append("data_conexao < ?")
+            parametros.append(ate)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        
+        def ler():
+            with self.banco.conexao() as conn:
+                return conn.execute(f"""
+                    SELECT servidor_id, data_conexao, status, comando_executado, resultado, duracao
+                    FROM conexoes {where}
+                    ORDER BY data_conexao DESC
+                    LIMIT ?
+                """, parametros + [limite]).fetchall()
+        
+        try:
+            linhas, memoria = self._ler_com_pendentes(ler)
+            # Registos ainda por gravar, com os mesmos filtros
+            memoria = [r for r in memoria
+                       if (servidor_id is None or r[0] == servidor_id)
+                       and (desde is None or r[1] >= desde)
+                       and (ate is None or r[1] < ate)]
+            # Os registos em memória são os mais recentes (do último para o primeiro)
+            linhas = sorted(memoria[::-1] + linhas, key=lambda l: l[1], reverse=True)[:limite]
+            return [
+                {"servidor_id": l[0], "data_conexao": l[1], "status": l[2],
+                 "comando": l[3], "resultado": l[4], "duracao": l[5]}
+                for l in linhas
+            ]
+        except Exception as e:
+            print(f"Erro ao obter histórico de conexões: {e}")
+            return []
+    
+    def obter_resumo_diario(self, servidor_id: Optional[int] = None, dias: int = 7) -> List[Dict[str, Any]]:
+        """
+        Obtém o resumo diário (conexões, falhas, tempo médio dos comandos).
+        
+        Args:
+            servidor_id: Restringir a um servidor (opcional)
+            dias: Número de dias a incluir, contando com hoje (UTC)
+            
+        Returns:
+            Um dicionário por servidor e dia, do mais recente para o mais antigo
+        """
+        desde = (datetime.utcnow() - timedelta(days=dias - 1)).strftime("%Y-%m-%d")
+        
+        def ler():
+            with self.banco.conexao() as conn:
+                if servidor_id is None:
+                    return conn.execute("""
+                        SELECT servidor_id, dia, total, falhas, comandos_medidos, duracao_total
+                        FROM conexoes_diarias WHERE dia >= ?
+                        ORDER BY dia DESC, servidor_id
+                    """, (desde,)).fetchall()
+                return conn.execute("""
+                    SELECT servidor_id, dia, total, falhas, comandos_medidos, duracao_total
+                    FROM conexoes_diarias WHERE servidor_id = ? AND dia >= ?
+                    ORDER BY dia DESC
+                """, (servidor_id, desde)).fetchall()
+        
+        try:
+            linhas, memoria = self._ler_com_pendentes(ler)
+            
+            # Somar os registos ainda por gravar ao resumo de cada servidor e dia
+            resumo = {(l[0], l[1]): list(l[2:]) for l in linhas}
+            for id_servidor, instante, status, _, _, duracao in memoria:
+                if (servidor_id is not None and id_servidor != servidor_id) or instante[:10] < desde:
+                    continue
+                valores = resumo.setdefault((id_servidor, instante[:10]), [0, 0, 0, 0.0])
+                valores[0] += 1
+                valores[1] += int(status != "sucesso")
+                valores[2] += int(duracao is not None)
+                valores[3] += duracao or 0.0
+            
+            return [
+                {"servidor_id": id_servidor, "dia": dia, "total": total, "falhas": falhas,
+                 "duracao_media": round(duracao_total / medidos, 3) if medidos else None}
+                for (id_servidor, dia), (total, falhas, medidos, duracao_total)
+                in sorted(resumo.items(), key=lambda item: (item[0][1], -item[0][0]), reverse=True)
+            ]
+        except Exception as e:
+            print(f"Erro ao obter resumo diário: {e}")
+            return []
+    
     def obter_estatisticas(self) -> Dict[str, Any]:
         """
         Obtém estatísticas dos servidores.
         
+        As contagens de conexões vêm do resumo diário (uma linha por servidor e
+        dia), pelo que não dependem do tamanho do histórico.
+        
         Returns:
             Dict com estatísticas
         """
-        try:
-            with sqlite3.connect(self.db_file) as conn:
+        hoje = datetime.utcnow().strftime("%Y-%m-%d")
+        
+        def ler():
+            with self.banco.conexao() as conn:
                 cursor = conn.cursor()
                 
-                # Total de servidores
-                cursor.execute("SELECT COUNT(*) FROM servidores")
-                total_servidores = cursor.fetchone()[0]
-                
-                # Servidores ativos
-                cursor.execute("SELECT COUNT(*) FROM servidores WHERE ativo=1")
-                servidores_ativos = cursor.fetchone()[0]
+                # Total de servidores e servidores ativos
+                cursor.execute("SELECT COUNT(*), COALESCE(SUM(ativo=1), 0) FROM servidores")
+                total_servidores, servidores_ativos = cursor.fetchone()
                 
                 # Total de conexões
-                cursor.execute("SELECT COUNT(*) FROM conexoes")
+                cursor.execute("SELECT COALESCE(SUM(total), 0) FROM conexoes_diarias")
                 total_conexoes = cursor.fetchone()[0]
                 
                 # Conexões hoje
                 cursor.execute("""
-                    SELECT COUNT(*) FROM conexoes 
-                    WHERE DATE(data_conexao) = DATE('now')
-                """)
-                conexoes_hoje = cursor.fetchone()[0]
-                
-                return {
-                    "total_servidores": total_servidores,
-                    "servidores_ativos": servidores_ativos,
-                    "total_conexoes": total_conexoes,
-                    "conexoes_hoje": conexoes_hoje,
-                    "conexoes_ativas": len(self.pool_conexoes.conexoes)
-                }
+                    SELECT COALESCE(SUM(total), 0), COALESCE(SUM(falhas), 0)
+                    FROM conexoes_diarias WHERE dia = ?
+                """, (hoje,))
+                return (total_servidores, servidores_ativos, total_conexoes) + cursor.fetchone()
+        
+        try:
+            (total_servidores, servidores_ativos, total_conexoes,
+             conexoes_hoje, falhas_hoje), memoria = self._ler_com_pendentes(ler)
+            
+            # Registos ainda por gravar
+            de_hoje = [r for r in memoria if r[1][:10] == hoje]
+            total_conexoes += len(memoria)
+            conexoes_hoje += len(de_hoje)
+            falhas_hoje += sum(1 for r in de_hoje if r[2] != "sucesso")
+            
+            return {
+                "total_servidores": total_servidores,
+                "servidores_ativos": servidores_ativos,
+                "total_conexoes": total_conexoes,
+                "conexoes_hoje": conexoes_hoje,
+                "falhas_hoje": falhas_hoje,
+                "conexoes_ativas": len(self.pool_conexoes.conexoes),
+                "cache_comandos": self.cache_comandos.estatisticas() if self.cache_comandos else None
+            }
                 
         except Exception as e:
             print(f"Erro ao obter estatísticas: {e}")
@@ -8,6 +8,51 @@ from typing import Dict, List, Optional, Callable
 from datetime import datetime
 
 
+def montar_status_planka(status: str, modo_ativo: str) -> Dict:
+    """
+    Monta a informação de status exibida na interface.
+    
+    Usada tanto para o Planka local como para os servidores remotos.
+    
+    Args:
+        status: "online", "offline" ou "erro"
+        modo_ativo: "producao", "desenvolvimento" ou "nenhum"
+        
+    Returns:
+        Dict com status, texto, cor e ícone de exibição
+    """
+    if status == "online":
+        if modo_ativo == "desenvolvimento":
+            status_exibicao = "Desenvolvimento"
+            cor = "blue"
+            icone = "🚀"
+        elif modo_ativo == "producao":
+            status_exibicao = "Produção"
+            cor = "green"
+            icone = "🏭"
+        else:
+            status_exibicao = "Rodando"
+            cor = "green"
+            icone = "🟢"
+    elif status == "offline":
+        status_exibicao = "Parado"
+        cor = "red"
+        icone = "🔴"
+    else:
+        status_exibicao = "Erro"
+        cor = "orange"
+        icone = "⚠️"
+    
+    return {
+        "status": status,
+        "status_exibicao": status_exibicao,
+        "modo_ativo": modo_ativo,
+        "cor": cor,
+        "icone": icone,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 class StatusChecker:
     """
     Verificador de status para o sistema Planka.
@@ -28,6 +73,7 @@ class StatusChecker:
         self.modo_ativo = "desconhecido"
         self.callbacks_atualizacao = []
         self.monitoramento_ativo = False
+        self.servidores_manager = None
     
     def verificar_status_inicial(self) -> Dict:
         """
@@ -75,37 +121,7 @@ class StatusChecker:
             self.status_atual = status
             self.modo_ativo = modo_ativo
             
-            # Determinar status de exibição
-            if status == "online":
-                if modo_ativo == "desenvolvimento":
-                    status_exibicao = "Desenvolvimento"
-                    cor = "blue"
-                    icone = "🚀"
-                elif modo_ativo == "producao":
-                    status_exibicao = "Produção"
-                    cor = "green"
-                    icone = "🏭"
-                else:
-                    status_exibicao = "Rodando"
-                    cor = "green"
-                    icone = "🟢"
-            elif status == "offline":
-                status_exibicao = "Parado"
-                cor = "red"
-                icone = "🔴"
-            else:
-                status_exibicao = "Erro"
-                cor = "orange"
-                icone = "⚠️"
-            
-            return {
-                "status": status,
-                "status_exibicao": status_exibicao,
-                "modo_ativo": modo_ativo,
-                "cor": cor,
-                "icone": icone,
-                "timestamp": datetime.now().isoformat()
-            }
+            return montar_status_planka(status, modo_ativo)
             
         except Exception as e:
             self.status_atual = "Erro"
@@ -119,6 +135,33 @@ class StatusChecker:
                 "timestamp": datetime.now().isoformat()
             }
     
+    def definir_servidores_manager(self, servidores_manager):
+        """
+        Define o gerenciador de servidores usado para o status remoto.
+        
+        Args:
+            servidores_manager: Instância do ServidoresManager
+        """
+        self.servidores_manager = servidores_manager
+    
+    def verificar_status_remotos(self, forcar: bool = False) -> List[Dict]:
+        """
+        Verifica o Planka nos servidores remotos ativos.
+        
+        Args:
+            forcar: Ignorar o cache e consultar todos os servidores
+            
+        Returns:
+            List[Dict] no mesmo formato de verificar_status_planka, com os dados do servidor
+        """
+        if self.servidores_manager is None:
+            return []
+        try:
+            return self.servidores_manager.obter_status_planka_remoto(forcar=forcar)
+        except Exception as e:
+            print(f"Erro ao verificar status remoto: {e}")
+            return []
+    
     def obter_estado_botoes(self) -> Dict[str, str]:
         """
         Obtém o estado dos botões baseado no status atual.
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Status do Planka nos servidores remotos.
+Executa nos servidores a mesma verificação feita localmente (estado dos
+containers e resposta HTTP) num único comando por servidor, sobre as conexões
+do pool SSH, e guarda o resultado em cache por servidor durante um TTL.
+"""
+
+import time
+import shlex
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from .status_checker import montar_status_planka
+from .planka.status_monitor import modos_ativos
+
+
+# Containers do Planka numa linha cada ("container=nome|estado|portas") e o
+# código HTTP devolvido pela URL do Planka ("http=200")
+SCRIPT_STATUS = r"""
+command -v docker >/dev/null 2>&1 && docker ps -a --filter name=planka --format '{{.Names}}|{{.Status}}|{{.Ports}}' 2>/dev/null | sed 's/^/container=/'
+if command -v curl >/dev/null 2>&1; then
+    echo "http=$(curl -s -o /dev/null -w '%{http_code}' --max-time __TIMEOUT__ __URL__)"
+elif command -v wget >/dev/null 2>&1; then
+    echo "http=$(wget -S -O /dev/null -T __TIMEOUT__ __URL__ 2>&1 | awk '/^  HTTP\//{c=$2} END{print c}')"
+fi
+true
+"""
+
+
+def analisar_status(saida: str) -> Dict[str, Any]:
+    """
+    Converte a saída do SCRIPT_STATUS no status do Planka.
+
+    Args:
+        saida: stdout do SCRIPT_STATUS
+
+    Returns:
+        Dict com status, modo_ativo, codigo_http e processos_docker
+    """
+    processos = []
+    codigo_http = None
+    for linha in saida.splitlines():
+        chave, _, valor = linha.partition("=")
+        if chave == "container" and valor:
+            partes = valor.split("|")
+            processos.append({
+                "nome": partes[0],
+                "status": partes[1] if len(partes) > 1 else "",
+                "portas": partes[2] if len(partes) > 2 else ""
+            })
+        elif chave == "http":
+            codigo_http = valor.strip() or None
+
+    modos = modos_ativos([f"{p['nome']} {p['status']}" for p in processos])
+    # Priorizar modo desenvolvimento se ambos estiverem ativos, como no local
+    if modos["desenvolvimento"]:
+        modo_ativo = "desenvolvimento"
+    elif modos["producao"]:
+        modo_ativo = "producao"
+    else:
+        modo_ativo = "nenhum"
+
+    status = "online" if modo_ativo != "nenhum" and codigo_http == "200" else "offline"
+    return {
+        "status": status,
+        "modo_ativo": modo_ativo,
+        "codigo_http": codigo_http,
+        "processos_docker": [p for p in processos if p["status"].startswith("Up")]
+    }
+
+
+class StatusRemotoPlanka:
+    """
+    Verificador do status do Planka nos servidores do ServidoresManager.
+    """
+
+    def __init__(self, servidores_manager, settings):
+        """
+        Inicializa o verificador.
+
+        Args:
+            servidores_manager: Instância de ServidoresManager
+            settings: Configurações do sistema
+        """
+        self.servidores_manager = servidores_manager
+        self.ttl = settings.obter("servidores", "ttl_status_remoto", 30)
+        self.timeout = settings.obter("servidores", "timeout_status_remoto", 15)
+        self.timeout_http = settings.obter("servidores", "timeout_http_status_remoto", 3)
+        self.url = settings.obter("servidores", "url_planka_remoto", "http://127.0.0.1:3000")
+
+        self.cache = {}          # servidor_id -> (instante monotónico, status)
+        self.em_atualizacao = {}  # servidor_id -> Future da verificação em curso
+        self.lock = threading.Lock()
+        # Limitado às conexões do pool, para reutilizar as sessões em vez de forçar novos logins
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, min(settings.obter("servidores", "max_paralelo_status_remoto", 5),
+                                   servidores_manager.pool_conexoes.max_conexoes)),
+            thread_name_prefix="ssh-status"
+        )
+
+    def _script(self) -> str:
+        """Script de verificação com a URL e o timeout configurados."""
+        return (SCRIPT_STATUS
+                .replace("__URL__", shlex.quote(self.url))
+                .replace("__TIMEOUT__", str(int(self.timeout_http))))
+
+    def _verificar_servidor(self, servidor) -> Dict[str, Any]:
+        """Executa a verificação num servidor (um único comando na conexão do pool)."""
+        inicio = time.monotonic()
+        try:
+            with self.servidores_manager.pool_conexoes.usar_conexao(servidor) as (sucesso, conexao, mensagem):
+                if sucesso:
+                    sucesso, stdout, _, mensagem = conexao.executar_comando(self._script(), self.timeout)
+        except Exception as e:
+            sucesso, mensagem = False, str(e)
+
+        if sucesso:
+            dados = analisar_status(stdout)
+            resultado = montar_status_planka(dados["status"], dados["modo_ativo"])
+            resultado.update(codigo_http=dados["codigo_http"], processos_docker=dados["processos_docker"])
+        else:
+            resultado = montar_status_planka("erro", "desconhecido")
+            resultado.update(codigo_http=None, processos_docker=[], erro=mensagem)
+
+        resultado.update(
+            servidor_id=servidor.id,
+            servidor=servidor.nome,
+            host=servidor.host,
+            duracao_ms=round((time.monotonic() - inicio) * 1000, 1),
+            em_cache=False
+        )
+
+        with self.lock:
+            self.cache[servidor.id] = (time.monotonic(), resultado)
+            self.em_atualizacao.pop(servidor.id, None)
+        return resultado
+
+    def _agendar(self, servidor):
+        """Agenda a verificação de um servidor, reaproveitando a que já estiver em curso."""
+        with self.lock:
+            futuro = self.em_atualizacao.get(servidor.id)
+            if futuro is None:
+                futuro = self.em_atualizacao[servidor.id] = self.executor.submit(self._verificar_servidor, servidor)
+            return futuro
+
+    def _em_cache(self, servidor_id: int) -> Optional[Dict[str, Any]]:
+        """Status em cache do servidor, se ainda estiver dentro do TTL."""
+        with self.lock:
+            entrada = self.cache.get(servidor_id)
+        if entrada and time.monotonic() - entrada[0] < self.ttl:
+            return dict(entrada[1], em_cache=True)
+        return None
+
+    def obter_status(self, servidores: List, forcar: bool = False) -> List[Dict[str, Any]]:
+        """
+        Obtém o status do Planka de vários servidores.
+
+        Os servidores sem status válido em cache são verificados em paralelo.
+
+        Args:
+            servidores: Servidores a verificar (ServidorSSH)
+            forcar: Ignorar o cache
+
+        Returns:
+            Status de cada servidor, pela ordem recebida
+        """
+        resultados = {}
+        futuros = {}
+        for servidor in servidores:
+            status = None if forcar else self._em_cache(servidor.id)
+            if status is not None:
+                resultados[servidor.id] = status
+            else:
+                futuros[servidor.id] = self._agendar(servidor)
+
+        if futuros:
+            wait(futuros.values(), timeout=self.timeout + 5)
+        for servidor in servidores:
+            futuro = futuros.get(servidor.id)
+            if futuro is None:
+                continue
+            try:
+                resultados[servidor.id] = futuro.result(timeout=0)
+            except Exception as e:
+                # A verificação continua em curso e fica em cache quando terminar
+                status = montar_status_planka("erro", "desconhecido")
+                status.update(servidor_id=servidor.id, servidor=servidor.nome, host=servidor.host,
+                              processos_docker=[], erro=str(e) or "Tempo esgotado")
+                resultados[servidor.id] = status
+
+        return [resultados[servidor.id] for servidor in servidores]
+
+    def invalidar(self, servidor_id: Optional[int] = None):
+        """
+        Descarta o status em cache.
+
+        Args:
+            servidor_id: Servidor a descartar (None para todos)
+        """
+        with self.lock:
+            if servidor_id is None:
+                self.cache.clear()
+            else:
+                self.cache.pop(servidor_id, None)
+
+    def fechar(self):
+        """Termina as threads de verificação."""
+        self.executor.shutdown(wait=False)
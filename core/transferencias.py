@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Transferência de arquivos por SFTP sobre as conexões do pool SSH.
+Os arquivos grandes são divididos em blocos enviados por várias sessões SFTP
+em simultâneo (cada uma num canal da mesma conexão), com retoma a partir de um
+diário local dos blocos já enviados, verificação do hash no servidor e medição
+do débito de cada transferência.
+"""
+
+import json
+import time
+import queue
+import shlex
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import paramiko
+
+
+class TransferenciaSFTP:
+    """
+    Envio de arquivos em blocos paralelos por SFTP.
+
+    Cada sessão SFTP ocupa um canal da conexão e conta para o limite de
+    canais por servidor, tal como os comandos. Os testes substituem
+    _abrir_sftp e _hash_remoto numa subclasse (ver tests/test_transferencias.py).
+    """
+
+    def __init__(self, pool_conexoes, diretorio_estado: Path, tamanho_bloco: int = 8 * 1024 * 1024,
+                 canais: int = 4, algoritmo_hash: str = "sha256"):
+        """
+        Inicializa o serviço de transferências.
+
+        Args:
+            pool_conexoes: Pool de conexões SSH (PoolConexoesSSH)
+            diretorio_estado: Onde guardar o diário das transferências (para retoma)
+            tamanho_bloco: Tamanho de cada bloco em bytes
+            canais: Sessões SFTP simultâneas por transferência
+            algoritmo_hash: Algoritmo de verificação (sha256, sha1 ou md5)
+        """
+        self.pool_conexoes = pool_conexoes
+        self.diretorio_estado = Path(diretorio_estado)
+        self.diretorio_estado.mkdir(parents=True, exist_ok=True)
+        self.tamanho_bloco = tamanho_bloco
+        self.canais = canais
+        self.algoritmo_hash = algoritmo_hash
+
+    def _abrir_sftp(self, conexao) -> paramiko.SFTPClient:
+        """Abre uma sessão SFTP num canal novo da conexão partilhada."""
+        return paramiko.SFTPClient.from_transport(conexao.transport)
+
+    @contextmanager
+    def _sessao_sftp(self, conexao):
+        """
+        Sessão SFTP que ocupa um dos canais da conexão enquanto está aberta.
+
+        Usa o mesmo semáforo e a mesma contagem de canais abertos dos comandos,
+        para não passar de max_canais_por_host (nem do MaxSessions do sshd) e
+        para o pool não fechar a conexão com transferências em curso.
+        """
+        with conexao.canais:
+            with conexao.lock_canais:
+                conexao.canais_abertos += 1
+            try:
+                sftp = self._abrir_sftp(conexao)
+                try:
+                    yield sftp
+                finally:
+                    sftp.close()
+            finally:
+                with conexao.lock_canais:
+                    conexao.canais_abertos -= 1
+
+    def _arquivo_diario(self, servidor, origem: Path, destino: str) -> Path:
+        """Caminho do diário de uma transferência (servidor, origem e destino)."""
+        chave = hashlib.sha1(f"{servidor.id}|{origem.resolve()}|{destino}".encode('utf-8')).hexdigest()[:16]
+        return self.diretorio_estado / f"{chave}.json"
+
+    def _carregar_diario(self, arquivo: Path, assinatura: Dict[str, Any]) -> set:
+        """Blocos já enviados, se o diário corresponder à mesma versão da origem."""
+        try:
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                diario = json.load(f)
+            if diario.get("assinatura") == assinatura:
+                return set(diario.get("blocos", []))
+        except (OSError, ValueError):
+            pass
+        return set()
+
+    def _gravar_diario(self, arquivo: Path, assinatura: Dict[str, Any], blocos: set):
+        """Grava o diário de forma atómica."""
+        temporario = arquivo.with_suffix(".tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({"assinatura": assinatura, "blocos": sorted(blocos)}, f)
+        temporario.replace(arquivo)
+
+    def _hash_local(self, origem: Path, resultado: Dict[str, Any]):
+        """Calcula o hash da origem (corre em paralelo com o envio)."""
+        h = hashlib.new(self.algoritmo_hash)
+        with open(origem, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(bloco)
+        resultado["hash"] = h.hexdigest()
+
+    def _hash_remoto(self, conexao, caminho: str) -> Optional[str]:
+        """
+        Calcula o hash do arquivo no servidor.
+
+        Returns:
+            Hash em hexadecimal ou None se o servidor não tiver a ferramenta
+        """
+        bits = {"sha256": "256", "sha1": "1"}.get(self.algoritmo_hash)
+        comandos = [f"{self.algoritmo_hash}sum -- {shlex.quote(caminho)}"]
+        if bits:
+            comandos.append(f"shasum -a {bits} -- {shlex.quote(caminho)}")
+        for comando in comandos:
+            sucesso, stdout, _, _ = conexao.executar_comando(comando)
+            if sucesso and stdout.strip():
+                return stdout.split()[0].lower()
+        return None
+
+    def enviar(self, servidor, origem, destino: str,
+               callback: Optional[Callable[[int, int], None]] = None,
+               cancelar: Optional[threading.Event] = None) -> Tuple[bool, str, Dict[str, Any]]:
+        """
+        Envia um arquivo local para o servidor.
+
+        O arquivo é escrito em "<destino>.parcial" e só substitui o destino
+        depois de verificado o hash. Se uma transferência anterior da mesma
+        origem tiver sido interrompida, só os blocos em falta são enviados.
+
+        Args:
+            servidor: Servidor de destino (ServidorSSH)
+            origem: Caminho do arquivo local
+            destino: Caminho completo no servidor
+            callback: Chamado com (bytes enviados, total) à medida que os blocos terminam
+            cancelar: Evento para interromper a transferência (pode ser retomada)
+
+        Returns:
+            (sucesso, mensagem, dados) com bytes, blocos, retomados, duração,
+            débito em MB/s, hash e se foi verificado no servidor
+        """
+        origem = Path(origem)
+        inicio = time.monotonic()
+        dados = {
+            "origem": str(origem),
+            "destino": destino,
+            "bytes": 0,
+            "bytes_enviados": 0,
+            "blocos": 0,
+            "blocos_retomados": 0,
+            "duracao": 0.0,
+            "mb_por_segundo": 0.0,
+            "hash": None,
+            "verificado": None
+        }
+
+        try:
+            if not origem.is_file():
+                return False, f"Arquivo não encontrado: {origem}", dados
+
+            estado = origem.stat()
+            total = estado.st_size
+            total_blocos = max(1, -(-total // self.tamanho_bloco))
+            dados.update(bytes=total, blocos=total_blocos)
+
+            sucesso, conexao, mensagem = self.pool_conexoes.obter_conexao(servidor)
+            if not sucesso:
+                return False, f"Erro ao conectar: {mensagem}", dados
+
+            parcial = f"{destino}.parcial"
+            assinatura = {"tamanho": total, "mtime": estado.st_mtime_ns, "bloco": self.tamanho_bloco}
+            arquivo_diario = self._arquivo_diario(servidor, origem, destino)
+
+            try:
+                feitos = self._carregar_diario(arquivo_diario, assinatura)
+                with self._sessao_sftp(conexao) as sftp:
+                    if feitos:
+                        try:
+                            sftp.stat(parcial)
+                        except IOError:
+                            # O arquivo parcial desapareceu do servidor: recomeçar
+                            feitos = set()
+                    if not feitos:
+                        sftp.open(parcial, 'wb').close()
+                dados["blocos_retomados"] = len(feitos)
+
+                # Hash da origem calculado em paralelo com o envio
+                hash_local = {}
+                thread_hash = threading.Thread(target=self._hash_local, args=(origem, hash_local), daemon=True)
+                thread_hash.start()
+
+                pendentes = queue.Queue()
+                for indice in range(total_blocos):
+                    if indice not in feitos:
+                        pendentes.put(indice)
+
+                lock = threading.Lock()
+                enviados = [sum(min(self.tamanho_bloco, total - i * self.tamanho_bloco) for i in feitos)]
+                erros = []
+
+                def trabalhador():
+                    try:
+                        with self._sessao_sftp(conexao) as sftp_canal, open(origem, 'rb') as local, \
+                                sftp_canal.open(parcial, 'r+b') as remoto:
+                            remoto.set_pipelined(True)
+                            while not erros and not (cancelar and cancelar.is_set()):
+                                try:
+                                    indice = pendentes.get_nowait()
+                                except queue.Empty:
+                                    return
+                                deslocamento = indice * self.tamanho_bloco
+                                local.seek(deslocamento)
+                                bloco = local.read(self.tamanho_bloco)
+                                remoto.seek(deslocamento)
+                                remoto.write(bloco)
+                                remoto.flush()
+
+                                with lock:
+                                    feitos.add(indice)
+                                    enviados[0] += len(bloco)
+                                    dados["bytes_enviados"] += len(bloco)
+                                    self._gravar_diario(arquivo_diario, assinatura, feitos)
+                                    progresso = enviados[0]
+                                if callback:
+                                    callback(progresso, total)
+                    except Exception as e:
+                        erros.append(str(e))
+
+                canais = max(1, min(self.canais, pendentes.qsize(), conexao.max_canais))
+                threads = [threading.Thread(target=trabalhador, daemon=True) for _ in range(canais)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                thread_hash.join()
+
+                dados["hash"] = hash_local.get("hash")
+                if erros:
+                    return False, f"Erro ao enviar blocos (pode ser retomado): {erros[0]}", dados
+                if len(feitos) < total_blocos:
+                    return False, "Transferência interrompida (pode ser retomada)", dados
+
+                # Verificar no servidor antes de substituir o destino
+                hash_remoto = self._hash_remoto(conexao, parcial)
+                with self._sessao_sftp(conexao) as sftp:
+                    if hash_remoto is not None:
+                        dados["verificado"] = hash_remoto == dados["hash"]
+                        if not dados["verificado"]:
+                            sftp.remove(parcial)
+                            arquivo_diario.unlink(missing_ok=True)
+                            return False, "Hash do arquivo no servidor não corresponde à origem", dados
+
+                    try:
+                        sftp.posix_rename(parcial, destino)
+                    except IOError:
+                        # Servidor sem a extensão posix-rename
+                        try:
+                            sftp.remove(destino)
+                        except IOError:
+                            pass
+                        sftp.rename(parcial, destino)
+
+                arquivo_diario.unlink(missing_ok=True)
+            finally:
+                self.pool_conexoes.devolver_conexao(conexao)
+
+            duracao = time.monotonic() - inicio
+            dados["duracao"] = round(duracao, 3)
+            dados["mb_por_segundo"] = round(dados["bytes_enviados"] / 1024 / 1024 / duracao, 2) if duracao else 0.0
+
+            mensagem = f"{total} bytes enviados em {duracao:.1f}s ({dados['mb_por_segundo']} MB/s)"
+            if dados["verificado"] is None:
+                mensagem += "; hash não verificado no servidor"
+            return True, mensagem, dados
+
+        except Exception as e:
+            dados["duracao"] = round(time.monotonic() - inicio, 3)
+            return False, f"Erro na transferência: {str(e)}", dados
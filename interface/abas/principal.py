@@ -51,6 +51,10 @@ class AbaPrincipal(ttk.Frame):
         except Exception as e:
             self.log_manager.log_sistema("ERROR", f"Erro ao atualizar aba principal: {str(e)}")
     
+    def definir_servidores_manager(self, servidores_manager):
+        """Inclui os servidores remotos no status da aba principal."""
+        self.controller.definir_servidores_manager(servidores_manager)
+    
     def parar_monitoramento(self):
         """Para o monitoramento automático."""
         try:
@@ -121,9 +121,14 @@ class AbaServidores(ttk.Frame):
         self.entry_descricao = ttk.Entry(form_frame, width=70)
         self.entry_descricao.grid(row=4, column=1, columnspan=3, sticky=tk.EW, pady=2)
         
+        # Grupos
+        ttk.Label(form_frame, text="Grupos:").grid(row=5, column=0, sticky=tk.W, padx=(0, 5), pady=2)
+        self.entry_grupos = ttk.Entry(form_frame, width=70)
+        self.entry_grupos.grid(row=5, column=1, columnspan=3, sticky=tk.EW, pady=2)
+        
         # Frame de botões
         btn_frame = ttk.Frame(form_frame)
-        btn_frame.grid(row=5, column=0, columnspan=4, pady=(10, 0))
+        btn_frame.grid(row=6, column=0, columnspan=4, pady=(10, 0))
         
         # Botões
         self.btn_adicionar = ttk.Button(btn_frame, text="➕ Adicionar", command=self._adicionar_servidor)
@@ -157,10 +162,11 @@ class AbaServidores(ttk.Frame):
         
         ttk.Button(btn_frame, text="🔄 Atualizar", command=self._carregar_servidores).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(btn_frame, text="🗑️ Remover", command=self._remover_servidor).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(btn_frame, text="🔌 Testar Conexão", command=self._testar_conexao).pack(side=tk.LEFT)
+        ttk.Button(btn_frame, text="🔌 Testar Conexão", command=self._testar_conexao).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btn_frame, text="⏱️ Latências", command=self._mostrar_latencias).pack(side=tk.LEFT)
         
         # TreeView para lista de servidores
-        columns = ("ID", "Nome", "Host", "Porta", "Usuário", "Status", "Descrição")
+        columns = ("ID", "Nome", "Host", "Porta", "Usuário", "Status", "Saúde", "Grupos", "Descrição")
         self.tree_servidores = ttk.Treeview(lista_frame, columns=columns, show="headings", height=8)
         
         # Configurar colunas
@@ -170,6 +176,8 @@ class AbaServidores(ttk.Frame):
         self.tree_servidores.heading("Porta", text="Porta")
         self.tree_servidores.heading("Usuário", text="Usuário")
         self.tree_servidores.heading("Status", text="Status")
+        self.tree_servidores.heading("Saúde", text="Saúde")
+        self.tree_servidores.heading("Grupos", text="Grupos")
         self.tree_servidores.heading("Descrição", text="Descrição")
         
         # Configurar larguras
@@ -179,6 +187,8 @@ class AbaServidores(ttk.Frame):
         self.tree_servidores.column("Porta", width=60)
         self.tree_servidores.column("Usuário", width=100)
         self.tree_servidores.column("Status", width=80)
+        self.tree_servidores.column("Saúde", width=200)
+        self.tree_servidores.column("Grupos", width=120)
         self.tree_servidores.column("Descrição", width=200)
         
         # Scrollbar
@@ -210,6 +220,42 @@ class AbaServidores(ttk.Frame):
         self.btn_executar = ttk.Button(cmd_input_frame, text="▶️ Executar", command=self._executar_comando, state=tk.DISABLED)
         self.btn_executar.pack(side=tk.RIGHT)
         
+        # Forçar a execução de comandos que estariam em cache
+        self.var_ignorar_cache = tk.BooleanVar(value=False)
+        if self.servidores_manager.cache_comandos is not None:
+            ttk.Checkbutton(cmd_input_frame, text="Ignorar cache",
+                            variable=self.var_ignorar_cache).pack(side=tk.RIGHT, padx=(0, 5))
+        
+        # Frame de execução em lote
+        lote_frame = ttk.Frame(cmd_frame)
+        lote_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(lote_frame, text="Grupo:").pack(side=tk.LEFT, padx=(0, 5))
+        self.combo_grupo = ttk.Combobox(lote_frame, width=20, values=[""])
+        self.combo_grupo.pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(lote_frame, text="Timeout (s):").pack(side=tk.LEFT, padx=(0, 5))
+        self.entry_timeout_lote = ttk.Entry(lote_frame, width=6)
+        self.entry_timeout_lote.insert(0, str(self.settings.obter("servidores", "timeout_comando_lote", 300)))
+        self.entry_timeout_lote.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.var_parar_na_falha = tk.BooleanVar(value=False)
+        ttk.Checkbutton(lote_frame, text="Parar na primeira falha",
+                        variable=self.var_parar_na_falha).pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.btn_executar_lote = ttk.Button(lote_frame, text="⏩ Executar em Lote", command=self._executar_comando_lote)
+        self.btn_executar_lote.pack(side=tk.RIGHT)
+        
+        # Tabela de resumo da execução em lote
+        colunas_lote = ("Servidor", "Host", "Estado", "Duração", "Mensagem")
+        self.tree_lote = ttk.Treeview(cmd_frame, columns=colunas_lote, show="headings", height=4)
+        for coluna, largura in zip(colunas_lote, (150, 120, 90, 70, 300)):
+            self.tree_lote.heading(coluna, text=coluna)
+            self.tree_lote.column(coluna, width=largura)
+        self.tree_lote.pack(fill=tk.X, pady=(0, 10))
+        self.tree_lote.bind("<<TreeviewSelect>>", self._on_resultado_lote_selecionado)
+        self.resultados_lote = {}
+        
         # Frame de resultado
         resultado_frame = ttk.Frame(cmd_frame)
         resultado_frame.pack(fill=tk.BOTH, expand=True)
@@ -218,6 +264,7 @@ class AbaServidores(ttk.Frame):
         
         # Text widget para resultado
         self.text_resultado = tk.Text(resultado_frame, height=8, wrap=tk.WORD)
+        self.text_resultado.tag_configure("stderr", foreground="red")
         scrollbar_resultado = ttk.Scrollbar(resultado_frame, orient=tk.VERTICAL, command=self.text_resultado.yview)
         self.text_resultado.configure(yscrollcommand=scrollbar_resultado.set)
         
@@ -260,7 +307,8 @@ class AbaServidores(ttk.Frame):
                 chave_privada=self.entry_chave.get().strip(),
                 timeout=int(self.entry_timeout.get() or "30"),
                 descricao=self.entry_descricao.get().strip(),
-                ativo=self.var_ativo.get()
+                ativo=self.var_ativo.get(),
+                grupos=self.entry_grupos.get().strip()
             )
             
             # Adicionar ao banco
@@ -306,6 +354,7 @@ class AbaServidores(ttk.Frame):
             self.servidor_selecionado.timeout = int(self.entry_timeout.get() or "30")
             self.servidor_selecionado.descricao = self.entry_descricao.get().strip()
             self.servidor_selecionado.ativo = self.var_ativo.get()
+            self.servidor_selecionado.grupos = self.entry_grupos.get().strip()
             
             # Salvar no banco
             sucesso, mensagem = self.servidores_manager.atualizar_servidor(self.servidor_selecionado)
@@ -348,6 +397,7 @@ class AbaServidores(ttk.Frame):
         self.entry_timeout.delete(0, tk.END)
         self.entry_timeout.insert(0, "30")
         self.entry_descricao.delete(0, tk.END)
+        self.entry_grupos.delete(0, tk.END)
         self.var_ativo.set(True)
     
     def _carregar_servidores(self):
@@ -359,6 +409,7 @@ class AbaServidores(ttk.Frame):
             
             # Carregar servidores
             servidores = self.servidores_manager.listar_servidores()
+            metricas = self.servidores_manager.obter_metricas()
             
             for servidor in servidores:
                 status = "🟢 Ativo" if servidor.ativo else "🔴 Inativo"
@@ -370,9 +421,14 @@ class AbaServidores(ttk.Frame):
                     servidor.porta,
                     servidor.usuario,
                     status,
+                    self._formatar_saude(metricas.get(servidor.id)),
+                    servidor.grupos,
                     servidor.descricao
                 ))
             
+            # Atualizar grupos disponíveis para execução em lote
+            self.combo_grupo.config(values=[""] + self.servidores_manager.listar_grupos())
+            
             # Atualizar estatísticas
             self._atualizar_estatisticas()
             
@@ -380,6 +436,25 @@ class AbaServidores(ttk.Frame):
             self.log_manager.log_sistema("ERROR", f"Erro ao carregar servidores: {e}")
             messagebox.showerror("Erro", f"Erro ao carregar servidores: {e}")
     
+    def _formatar_saude(self, metricas: Optional[dict]) -> str:
+        """Resume as últimas métricas coletadas de um servidor."""
+        if not metricas:
+            return ""
+        if metricas.get("erro"):
+            return f"⚠️ {metricas['erro']}"
+        
+        partes = []
+        for rotulo, chave in (("CPU", "cpu"), ("Mem", "memoria"), ("Disco", "disco")):
+            if metricas.get(chave) is not None:
+                partes.append(f"{rotulo} {metricas[chave]:.0f}%")
+        if metricas.get("load1") is not None:
+            partes.append(f"Load {metricas['load1']:.2f}")
+        containers = metricas.get("containers") or {}
+        if containers:
+            execucao = sum(1 for estado in containers.values() if estado == "running")
+            partes.append(f"🐳 {execucao}/{len(containers)}")
+        return " | ".join(partes)
+    
     def _atualizar_estatisticas(self):
         """Atualiza as estatísticas dos servidores."""
         try:
@@ -388,7 +463,8 @@ class AbaServidores(ttk.Frame):
             texto = (f"📊 Total: {stats.get('total_servidores', 0)} | "
                     f"🟢 Ativos: {stats.get('servidores_ativos', 0)} | "
                     f"🔌 Conexões: {stats.get('conexoes_ativas', 0)} | "
-                    f"📈 Hoje: {stats.get('conexoes_hoje', 0)}")
+                    f"📈 Hoje: {stats.get('conexoes_hoje', 0)} | "
+                    f"❌ Falhas hoje: {stats.get('falhas_hoje', 0)}")
             
             self.lbl_stats.config(text=texto)
             
@@ -447,6 +523,9 @@ class AbaServidores(ttk.Frame):
         self.entry_descricao.delete(0, tk.END)
         self.entry_descricao.insert(0, servidor.descricao)
         
+        self.entry_grupos.delete(0, tk.END)
+        self.entry_grupos.insert(0, servidor.grupos)
+        
         self.var_ativo.set(servidor.ativo)
         
         # Atualizar botões
@@ -520,6 +599,55 @@ class AbaServidores(ttk.Frame):
         thread = threading.Thread(target=executar_teste, daemon=True)
         thread.start()
     
+    def _mostrar_latencias(self):
+        """Mostra os tempos de cada etapa SSH do servidor selecionado."""
+        selection = self.tree_servidores.selection()
+        if not selection:
+            messagebox.showwarning("Aviso", "Selecione um servidor para ver as latências")
+            return
+        
+        item = self.tree_servidores.item(selection[0])
+        servidor_id = item['values'][0]
+        nome_servidor = item['values'][1]
+        resumo = self.servidores_manager.obter_latencias(servidor_id)
+        
+        janela = tk.Toplevel(self)
+        janela.title(f"Latências SSH - {nome_servidor}")
+        janela.geometry("620x320")
+        
+        pool = resumo["pool"]
+        taxa = f"{pool['taxa_acerto']}%" if pool["taxa_acerto"] is not None else "-"
+        ttk.Label(janela, text=f"Pool: {pool['acertos']} reutilizadas | {pool['falhas']} novas | "
+                               f"taxa de acerto {taxa}").pack(anchor=tk.W, padx=10, pady=(10, 5))
+        
+        colunas = ("Etapa", "N", "Média (ms)", "p50", "p90", "p99", "Máx")
+        tree = ttk.Treeview(janela, columns=colunas, show="headings", height=8)
+        for coluna, largura in zip(colunas, (110, 60, 90, 80, 80, 80, 80)):
+            tree.heading(coluna, text=coluna)
+            tree.column(coluna, width=largura)
+        for etapa, valores in resumo["etapas"].items():
+            tree.insert("", tk.END, values=(etapa, valores["n"], valores["media_ms"], valores["p50_ms"],
+                                            valores["p90_ms"], valores["p99_ms"], valores["max_ms"]))
+        tree.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        if not resumo["etapas"]:
+            ttk.Label(janela, text="Sem medições para este servidor").pack(pady=5)
+        
+        def exportar():
+            arquivo = filedialog.asksaveasfilename(
+                title="Exportar Latências",
+                defaultextension=".json",
+                filetypes=[("JSON", "*.json"), ("CSV", "*.csv")]
+            )
+            if arquivo:
+                sucesso, mensagem = self.servidores_manager.exportar_latencias(arquivo)
+                if sucesso:
+                    messagebox.showinfo("Sucesso", mensagem, parent=janela)
+                else:
+                    messagebox.showerror("Erro", mensagem, parent=janela)
+        
+        ttk.Button(janela, text="💾 Exportar", command=exportar).pack(pady=10)
+    
     def _executar_comando(self):
         """Executa um comando no servidor selecionado."""
         selection = self.tree_servidores.selection()
@@ -540,29 +668,43 @@ class AbaServidores(ttk.Frame):
         self.text_resultado.delete(1.0, tk.END)
         self.text_resultado.insert(tk.END, f"Executando comando em {nome_servidor}...\n")
         self.text_resultado.see(tk.END)
+        forcar = self.var_ignorar_cache.get()
         
         # Executar comando em thread separada
         def executar_comando():
             try:
                 self.log_manager.log_sistema("INFO", f"Executando comando em {nome_servidor}: {comando}")
                 
-                sucesso, stdout, stderr, mensagem = self.servidores_manager.executar_comando(servidor_id, comando)
+                sucesso, stdout, stderr, mensagem, em_cache = self.servidores_manager.executar_comando(
+                    servidor_id, comando,
+                    callback=lambda fluxo, texto: self.after(0, lambda: self._mostrar_saida_parcial(fluxo, texto)),
+                    forcar=forcar
+                )
                 
                 # Atualizar resultado na interface principal
-                self.after(0, lambda: self._mostrar_resultado_comando(sucesso, stdout, stderr, mensagem))
+                self.after(0, lambda: self._mostrar_resultado_comando(sucesso, stdout, stderr, mensagem, em_cache))
                 
             except Exception as e:
                 self.log_manager.log_sistema("ERROR", f"Erro ao executar comando: {e}")
-                self.after(0, lambda: self._mostrar_resultado_comando(False, "", "", f"Erro: {e}"))
+                mensagem = f"Erro: {e}"
+                self.after(0, lambda m=mensagem: self._mostrar_resultado_comando(False, "", "", m))
         
         thread = threading.Thread(target=executar_comando, daemon=True)
         thread.start()
     
-    def _mostrar_resultado_comando(self, sucesso: bool, stdout: str, stderr: str, mensagem: str):
+    def _mostrar_saida_parcial(self, fluxo: str, texto: str):
+        """Acrescenta a saída recebida enquanto o comando ainda está a correr."""
+        self.text_resultado.insert(tk.END, texto, ("stderr",) if fluxo == "stderr" else ())
+        self.text_resultado.see(tk.END)
+    
+    def _mostrar_resultado_comando(self, sucesso: bool, stdout: str, stderr: str, mensagem: str,
+                                   em_cache: bool = False):
         """Mostra o resultado do comando executado."""
         self.text_resultado.delete(1.0, tk.END)
         
-        if sucesso:
+        if sucesso and em_cache:
+            self.text_resultado.insert(tk.END, f"📦 {mensagem} — marque \"Ignorar cache\" para atualizar\n\n")
+        elif sucesso:
             self.text_resultado.insert(tk.END, f"✅ {mensagem}\n\n")
             self.log_manager.log_sistema("SUCCESS", f"Comando executado com sucesso")
         else:
@@ -581,6 +723,110 @@ class AbaServidores(ttk.Frame):
         
         self.text_resultado.see(tk.END)
     
+    def _executar_comando_lote(self):
+        """Executa o comando em vários servidores (grupo, seleção ou todos os ativos)."""
+        comando = self.entry_comando.get().strip()
+        if not comando:
+            messagebox.showwarning("Aviso", "Digite um comando para executar")
+            return
+        
+        try:
+            timeout = float(self.entry_timeout_lote.get() or "0") or None
+        except ValueError:
+            messagebox.showerror("Erro", "Timeout inválido")
+            return
+        
+        grupo = self.combo_grupo.get().strip() or None
+        selecao = self.tree_servidores.selection()
+        if grupo:
+            servidores_ids = None
+            alvo = f"grupo '{grupo}'"
+        elif len(selecao) > 1:
+            servidores_ids = [self.tree_servidores.item(item)['values'][0] for item in selecao]
+            alvo = f"{len(servidores_ids)} servidores selecionados"
+        else:
+            servidores_ids = None
+            alvo = "todos os servidores ativos"
+        
+        if not messagebox.askyesno("Confirmar", f"Executar '{comando}' em {alvo}?"):
+            return
+        
+        parar_na_falha = self.var_parar_na_falha.get()
+        
+        # Limpar resultados anteriores
+        for item in self.tree_lote.get_children():
+            self.tree_lote.delete(item)
+        self.resultados_lote = {}
+        self.text_resultado.delete(1.0, tk.END)
+        self.text_resultado.insert(tk.END, f"Executando comando em {alvo}...\n")
+        self.btn_executar_lote.config(state=tk.DISABLED)
+        
+        def executar_lote():
+            try:
+                self.log_manager.log_sistema("INFO", f"Executando comando em lote ({alvo}): {comando}")
+                
+                resumo = self.servidores_manager.executar_em_lote(
+                    comando,
+                    servidores_ids=servidores_ids,
+                    grupo=grupo,
+                    timeout=timeout,
+                    parar_na_falha=parar_na_falha,
+                    callback=lambda resultado: self.after(0, lambda: self._adicionar_resultado_lote(resultado))
+                )
+                
+                self.after(0, lambda: self._mostrar_resumo_lote(resumo))
+                
+            except Exception as e:
+                self.log_manager.log_sistema("ERROR", f"Erro ao executar comando em lote: {e}")
+                mensagem = f"Erro: {e}"
+                self.after(0, lambda m=mensagem: self._mostrar_resultado_comando(False, "", "", m))
+            finally:
+                self.after(0, lambda: self.btn_executar_lote.config(state=tk.NORMAL))
+        
+        thread = threading.Thread(target=executar_lote, daemon=True)
+        thread.start()
+    
+    def _adicionar_resultado_lote(self, resultado: dict):
+        """Acrescenta à tabela de resumo o resultado de um servidor."""
+        if resultado["cancelado"]:
+            estado = "⏹️ Cancelado"
+        elif resultado["sucesso"]:
+            estado = "✅ OK"
+        else:
+            estado = "❌ Falhou"
+        
+        item = self.tree_lote.insert("", tk.END, values=(
+            resultado["nome"],
+            resultado["host"],
+            estado,
+            f"{resultado['duracao']:.1f}s",
+            resultado["mensagem"]
+        ))
+        self.resultados_lote[item] = resultado
+        
+        if not resultado["cancelado"]:
+            self.text_resultado.insert(tk.END, f"{estado} {resultado['nome']} ({resultado['duracao']:.1f}s)\n")
+            self.text_resultado.see(tk.END)
+    
+    def _mostrar_resumo_lote(self, resumo: dict):
+        """Mostra os totais de uma execução em lote."""
+        texto = (f"\n📊 {resumo['total']} servidores em {resumo['duracao']:.1f}s | "
+                 f"✅ {resumo['sucessos']} | ❌ {resumo['falhas']} | ⏹️ {resumo['cancelados']}\n"
+                 "Selecione um servidor na tabela para ver a saída.\n")
+        self.text_resultado.insert(tk.END, texto)
+        self.text_resultado.see(tk.END)
+        
+        nivel = "SUCCESS" if resumo["falhas"] == 0 and resumo["cancelados"] == 0 else "WARNING"
+        self.log_manager.log_sistema(nivel, f"Comando em lote: {resumo['sucessos']}/{resumo['total']} com sucesso")
+    
+    def _on_resultado_lote_selecionado(self, event):
+        """Mostra a saída do servidor selecionado na tabela de resumo."""
+        selection = self.tree_lote.selection()
+        if selection and selection[0] in self.resultados_lote:
+            resultado = self.resultados_lote[selection[0]]
+            self._mostrar_resultado_comando(resultado["sucesso"], resultado["stdout"],
+                                            resultado["stderr"], f"{resultado['nome']}: {resultado['mensagem']}")
+    
     def atualizar(self):
         """Atualiza a aba de servidores."""
         self._carregar_servidores() 
\ No newline at end of file
@@ -160,10 +160,10 @@ class DiagnosticPanel:
             self._adicionar_log("\n📝 ANÁLISE DE LOGS:", "info")
             logs = diagnostico["logs"]
             if logs.get("disponivel", False):
-                self._adicionar_log(f"  📊 Logs disponíveis ({logs['tamanho']} caracteres)", "info")
+                self._adicionar_log(f"  📊 Logs analisados ({logs.get('linhas', 0)} linhas, {logs['tamanho']} caracteres)", "info")
                 
                 if logs.get("erros"):
-                    self._adicionar_log("  ⚠️ Erros encontrados nos logs:", "warning")
+                    self._adicionar_log(f"  ⚠️ {logs.get('total_erros', 0)} erros encontrados nos logs ({len(logs.get('assinaturas', []))} distintos):", "warning")
                     for erro in logs["erros"]:
                         self._adicionar_log(f"    • {erro}", "error")
                 else:
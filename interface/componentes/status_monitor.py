@@ -2,9 +2,10 @@
 """
 Componente de Monitoramento de Status - Exibição de status do Planka.
 """
+import threading
 import tkinter as tk
 from tkinter import ttk
-from typing import Dict, Callable, Optional
+from typing import Dict, Callable, List, Optional
 
 class StatusMonitor:
     """
@@ -55,6 +56,14 @@ class StatusMonitor:
         self.label_docker = ttk.Label(self.frame_info, text="Verificando...", font=("Arial", 9))
         self.label_docker.grid(row=7, column=0, sticky="w", pady=(0, 10))
         
+        # Planka nos servidores remotos
+        self.label_remotos_titulo = ttk.Label(self.frame_info, text="Servidores Remotos:", font=("Arial", 9, "bold"))
+        self.label_remotos_titulo.grid(row=8, column=0, sticky="w", pady=(0, 5))
+        
+        self.label_remotos = ttk.Label(self.frame_info, text="Nenhum servidor configurado", font=("Arial", 9),
+                                       foreground="gray", justify=tk.LEFT)
+        self.label_remotos.grid(row=9, column=0, sticky="w", pady=(0, 10))
+        
         # Frame de controles
         self.frame_controles = ttk.Frame(self.frame)
         self.frame_controles.grid(row=1, column=0, sticky="ew")
@@ -86,6 +95,10 @@ class StatusMonitor:
             
             # Atualizar UI
             self._atualizar_ui(status_info)
+            
+            # Servidores remotos em background (usa o cache do status remoto)
+            if self.status_checker.servidores_manager is not None:
+                threading.Thread(target=self._atualizar_remotos, daemon=True).start()
                 
         except Exception as e:
             print(f"Erro ao atualizar status manual: {str(e)}")
@@ -145,6 +158,28 @@ class StatusMonitor:
         else:
             self.label_docker.config(text="Nenhum processo ativo", foreground="gray")
     
+    def _atualizar_remotos(self):
+        """Obtém o status dos servidores remotos e atualiza o label na thread da interface."""
+        try:
+            status_remotos = self.status_checker.verificar_status_remotos()
+            self.frame.after(0, lambda: self._atualizar_label_remotos(status_remotos))
+        except Exception as e:
+            print(f"Erro ao atualizar servidores remotos: {str(e)}")
+    
+    def _atualizar_label_remotos(self, status_remotos: List[Dict]):
+        """Atualiza o label dos servidores remotos."""
+        if not status_remotos:
+            self.label_remotos.config(text="Nenhum servidor configurado", foreground="gray")
+            return
+        
+        linhas = [
+            f"{s.get('icone', '')} {s.get('servidor', s.get('servidor_id'))}: {s.get('status_exibicao', 'Desconhecido')}"
+            for s in status_remotos
+        ]
+        online = sum(1 for s in status_remotos if s.get('status') == 'online')
+        cor = "green" if online == len(status_remotos) else ("orange" if online else "red")
+        self.label_remotos.config(text="\n".join(linhas), foreground=cor)
+    
     def definir_callback_atualizar_status(self, callback: Callable):
         """Define o callback para atualização de status."""
         self.callback_atualizar_status = callback
@@ -133,6 +133,11 @@ class SyncManager(ttk.LabelFrame):
                 status_color = "red"
                 info_text = f"Produção usa imagem oficial\nModo atual: {modo_atual}\nBackup: {'Sim' if backup_existe else 'Não'}"
             
+            # Alterações no código desde o último build (índice de arquivos)
+            alteracoes = status_info.get("alteracoes_desde_build")
+            if alteracoes is not None:
+                info_text += f"\nAlterações desde o último build: {alteracoes} arquivo(s)"
+            
             self._atualizar_status(status_text, info_text, status_color)
             
         except Exception as e:
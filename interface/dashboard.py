@@ -202,6 +202,7 @@ class Dashboard(ttk.Frame):
                     print("Inicializando aba Servidores...")
                     self.abas["servidores"] = AbaServidores(self.notebook, self.log_manager, self.settings)
                     self.notebook.add(self.abas["servidores"], text="🖥️ Servidores")
+                    self.abas["principal"].definir_servidores_manager(self.abas["servidores"].servidores_manager)
                     print("✅ Aba Servidores inicializada")
                 except Exception as e:
                     print(f"❌ Erro ao inicializar aba Servidores: {e}")
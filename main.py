@@ -18,6 +18,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
     from interface.dashboard import Dashboard
     from core.logs import LogManager
+    from core.logs_avancado import LogsAvancadoManager
     from config.settings import Settings
 except ImportError as e:
     print(f"Erro ao importar módulos: {e}")
@@ -46,6 +47,12 @@ def main():
         try:
             log_manager = LogManager(settings)
             if settings:
+                # Base de logs estruturados: recebe os logs da thread de escrita e
+                # é partilhada com a ingestão dos logs dos containers
+                try:
+                    log_manager.conectar_logs_avancado(LogsAvancadoManager(settings))
+                except Exception as e:
+                    print(f"Erro ao inicializar logs avançados: {e}")
                 log_manager.registrar_log("INFO", "Iniciando Dashboard de Tarefas Python")
             print("Sistema de logs inicializado")
         except Exception as e:
@@ -98,6 +105,8 @@ def main():
                     log_manager.registrar_log("INFO", "Fechando Dashboard de Tarefas")
                 if hasattr(dashboard, 'salvar_configuracoes'):
                     dashboard.salvar_configuracoes()
+                if log_manager:
+                    log_manager.parar()
                 root.destroy()
             except Exception as e:
                 if log_manager:
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da transferência SFTP em blocos (core/transferencias.py).
+O servidor é substituído por um sistema de arquivos em memória: a subclasse
+de TransferenciaSFTP troca _abrir_sftp e _hash_remoto, pelo que não é
+preciso um sshd.
+"""
+
+import sys
+import types
+import hashlib
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    import paramiko  # noqa: F401
+except ImportError:
+    # Só as anotações do módulo usam o paramiko; o cliente SFTP é o falso abaixo
+    paramiko = types.ModuleType("paramiko")
+    paramiko.SFTPClient = object
+    sys.modules["paramiko"] = paramiko
+
+from core.transferencias import TransferenciaSFTP
+
+
+class ArquivoRemoto:
+    """Arquivo aberto no servidor falso."""
+
+    def __init__(self, servidor, caminho):
+        self.servidor = servidor
+        self.caminho = caminho
+        self.posicao = 0
+
+    def set_pipelined(self, ativo):
+        pass
+
+    def seek(self, posicao):
+        self.posicao = posicao
+
+    def write(self, dados):
+        with self.servidor.lock:
+            conteudo = self.servidor.arquivos[self.caminho]
+            fim = self.posicao + len(dados)
+            if len(conteudo) < fim:
+                conteudo.extend(b"\0" * (fim - len(conteudo)))
+            conteudo[self.posicao:fim] = dados
+        self.posicao += len(dados)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ServidorFalso:
+    """Sistema de arquivos em memória com a interface do SFTPClient usada."""
+
+    def __init__(self):
+        self.arquivos = {}
+        self.lock = threading.Lock()
+
+    def stat(self, caminho):
+        if caminho not in self.arquivos:
+            raise IOError(caminho)
+
+    def open(self, caminho, modo):
+        with self.lock:
+            if modo == 'wb':
+                self.arquivos[caminho] = bytearray()
+            elif caminho not in self.arquivos:
+                raise IOError(caminho)
+        return ArquivoRemoto(self, caminho)
+
+    def remove(self, caminho):
+        with self.lock:
+            if caminho not in self.arquivos:
+                raise IOError(caminho)
+            del self.arquivos[caminho]
+
+    def posix_rename(self, origem, destino):
+        with self.lock:
+            self.arquivos[destino] = self.arquivos.pop(origem)
+
+    rename = posix_rename
+
+
+class ConexaoFalsa:
+    """Os campos de ConexaoSSH que a transferência usa."""
+
+    def __init__(self, max_canais):
+        self.max_canais = max_canais
+        self.canais = threading.BoundedSemaphore(max_canais)
+        self.lock_canais = threading.Lock()
+        self.canais_abertos = 0
+        self.pico_canais = 0
+
+
+class PoolFalso:
+    """Pool com uma única conexão, que conta as devoluções."""
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.obtidas = 0
+        self.devolvidas = 0
+
+    def obter_conexao(self, servidor):
+        self.obtidas += 1
+        return True, self.conexao, "OK"
+
+    def devolver_conexao(self, conexao):
+        self.devolvidas += 1
+
+
+class SessaoFalsa:
+    """Sessão SFTP sobre o servidor falso."""
+
+    def __init__(self, servidor):
+        self.servidor = servidor
+
+    def __getattr__(self, nome):
+        return getattr(self.servidor, nome)
+
+    def close(self):
+        pass
+
+
+class TransferenciaTeste(TransferenciaSFTP):
+    """TransferenciaSFTP ligada ao servidor falso."""
+
+    def __init__(self, servidor_falso, *args, hash_remoto=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.servidor_falso = servidor_falso
+        self.hash_remoto_fixo = hash_remoto
+
+    def _abrir_sftp(self, conexao):
+        with conexao.lock_canais:
+            conexao.pico_canais = max(conexao.pico_canais, conexao.canais_abertos)
+        return SessaoFalsa(self.servidor_falso)
+
+    def _hash_remoto(self, conexao, caminho):
+        if self.hash_remoto_fixo is not None:
+            return self.hash_remoto_fixo
+        return hashlib.sha256(bytes(self.servidor_falso.arquivos[caminho])).hexdigest()
+
+
+BLOCO = 1024
+
+
+@pytest.fixture
+def origem(tmp_path):
+    caminho = tmp_path / "origem.bin"
+    caminho.write_bytes(bytes(range(256)) * 40 + b"fim")  # 10 blocos e um resto
+    return caminho
+
+
+def criar(tmp_path, max_canais=8, canais=4, hash_remoto=None):
+    servidor = ServidorFalso()
+    conexao = ConexaoFalsa(max_canais)
+    pool = PoolFalso(conexao)
+    transferencia = TransferenciaTeste(servidor, pool, tmp_path / "estado", tamanho_bloco=BLOCO,
+                                       canais=canais, hash_remoto=hash_remoto)
+    return transferencia, servidor, conexao, pool
+
+
+def servidor_id(id=1):
+    return types.SimpleNamespace(id=id)
+
+
+def test_envio_completo_verificado(tmp_path, origem):
+    transferencia, servidor, conexao, pool = criar(tmp_path)
+
+    sucesso, mensagem, dados = transferencia.enviar(servidor_id(), origem, "/srv/destino.bin")
+
+    assert sucesso, mensagem
+    assert bytes(servidor.arquivos["/srv/destino.bin"]) == origem.read_bytes()
+    assert "/srv/destino.bin.parcial" not in servidor.arquivos
+    assert dados["verificado"] is True
+    assert dados["blocos"] == 11
+    assert dados["bytes_enviados"] == origem.stat().st_size
+    assert list((tmp_path / "estado").glob("*.json")) == []
+
+
+def test_sessoes_sftp_respeitam_canais_da_conexao(tmp_path, origem):
+    transferencia, servidor, conexao, pool = criar(tmp_path, max_canais=2, canais=4)
+
+    sucesso, mensagem, dados = transferencia.enviar(servidor_id(), origem, "/srv/destino.bin")
+
+    assert sucesso, mensagem
+    assert 1 <= conexao.pico_canais <= 2
+    assert conexao.canais_abertos == 0
+    assert pool.obtidas == pool.devolvidas == 1
+
+
+def test_cancelamento_e_retoma_pelo_diario(tmp_path, origem):
+    transferencia, servidor, conexao, pool = criar(tmp_path, canais=1)
+    cancelar = threading.Event()
+
+    def parar_a_meio(enviados, total):
+        if enviados >= 4 * BLOCO:
+            cancelar.set()
+
+    sucesso, mensagem, dados = transferencia.enviar(servidor_id(), origem, "/srv/destino.bin",
+                                                    parar_a_meio, cancelar)
+
+    assert not sucesso
+    assert "retomada" in mensagem
+    assert dados["bytes_enviados"] == 4 * BLOCO
+    assert "/srv/destino.bin" not in servidor.arquivos
+    assert "/srv/destino.bin.parcial" in servidor.arquivos
+    assert len(list((tmp_path / "estado").glob("*.json"))) == 1
+    assert conexao.canais_abertos == 0
+    assert pool.obtidas == pool.devolvidas
+
+    sucesso, mensagem, dados = transferencia.enviar(servidor_id(), origem, "/srv/destino.bin")
+
+    assert sucesso, mensagem
+    assert dados["blocos_retomados"] == 4
+    assert dados["bytes_enviados"] == origem.stat().st_size - 4 * BLOCO
+    assert bytes(servidor.arquivos["/srv/destino.bin"]) == origem.read_bytes()
+    assert list((tmp_path / "estado").glob("*.json")) == []
+
+
+def test_retoma_recomeca_se_o_parcial_desapareceu(tmp_path, origem):
+    transferencia, servidor, conexao, pool = criar(tmp_path, canais=1)
+    cancelar = threading.Event()
+    transferencia.enviar(servidor_id(), origem, "/srv/destino.bin",
+                         lambda enviados, total: cancelar.set(), cancelar)
+    del servidor.arquivos["/srv/destino.bin.parcial"]
+
+    sucesso, mensagem, dados = transferencia.enviar(servidor_id(), origem, "/srv/destino.bin")
+
+    assert sucesso, mensagem
+    assert dados["blocos_retomados"] == 0
+    assert bytes(servidor.arquivos["/srv/destino.bin"]) == origem.read_bytes()
+
+
+def test_hash_diferente_descarta_o_parcial(tmp_path, origem):
+    transferencia, servidor, conexao, pool = criar(tmp_path, hash_remoto="0" * 64)
+    servidor.arquivos["/srv/destino.bin"] = bytearray(b"versao anterior")
+
+    sucesso, mensagem, dados = transferencia.enviar(servidor_id(), origem, "/srv/destino.bin")
+
+    assert not sucesso
+    assert "Hash" in mensagem
+    assert dados["verificado"] is False
+    assert bytes(servidor.arquivos["/srv/destino.bin"]) == b"versao anterior"
+    assert "/srv/destino.bin.parcial" not in servidor.arquivos
+    assert list((tmp_path / "estado").glob("*.json")) == []
+    assert conexao.canais_abertos == 0
+    assert pool.obtidas == pool.devolvidas == 1